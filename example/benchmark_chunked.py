@@ -0,0 +1,31 @@
+""" Benchmark of the chunked multi-threaded evaluation of sky irradiances
+against the pandas path, on 40 years of 10-minute dates
+"""
+import resource
+import sys
+import time
+
+import pandas
+
+from alinea.astk.meteorology import chunked
+from alinea.astk.meteorology.sky_irradiance_astk import sky_irradiances
+
+dates = pandas.date_range('1980', '2020', freq='10min', closed='left',
+                          tz='UTC')
+
+# run one mode per process to measure its own peak memory:
+#   python benchmark_chunked.py pandas
+#   python benchmark_chunked.py chunked [threads]
+if __name__ == '__main__':
+    mode = sys.argv[1] if len(sys.argv) > 1 else 'chunked'
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t = time.time()
+    if mode == 'pandas':
+        sky_irradiances(dates=dates)
+    else:
+        threads = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        chunked.sky_irradiances(dates=dates, threads=threads)
+    t = time.time() - t
+    rss = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss) / 1024.
+    print('{0}: {1} dates in {2:.2f} s, peak memory +{3:.0f} MB'.format(
+        mode, len(dates), t, rss))
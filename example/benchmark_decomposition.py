@@ -0,0 +1,42 @@
+""" Benchmark of the numpy decomposition models of astk against pvlib, on
+several years of hourly global irradiance
+"""
+import timeit
+
+import numpy
+import pandas
+import pvlib
+
+from alinea.astk.meteorology.decomposition import decompose, solar_constant
+
+dates = pandas.date_range('2000', '2010', freq='H', closed='left', tz='UTC')
+zenith = pvlib.solarposition.get_solarposition(dates, 43.36, 3.52)[
+    'zenith'].values
+ghi = numpy.clip(900 * numpy.cos(numpy.radians(zenith)), 0, None)
+ghi *= numpy.random.RandomState(0).uniform(0.2, 1, len(ghi))
+
+references = {
+    'erbs': lambda: pvlib.irradiance.erbs(ghi, zenith, dates)['dni'],
+    'disc': lambda: pvlib.irradiance.disc(ghi, zenith, dates)['dni'],
+    'dirint': lambda: pvlib.irradiance.dirint(ghi, zenith, dates)}
+
+
+if __name__ == '__main__':
+    print('{0} dates'.format(len(dates)))
+    for model in ('spitters', 'orgill_hollands', 'erbs', 'disc', 'dirint'):
+        dni_extra = pvlib.irradiance.get_extra_radiation(
+            dates, solar_constant=solar_constant(model)).values
+
+        def astk():
+            return decompose(ghi, zenith, dni_extra, model=model)
+
+        t_astk = min(timeit.repeat(astk, number=1, repeat=3))
+        line = '{0}: astk {1:.2e} s'.format(model, t_astk)
+        if model in references:
+            dni, _ = astk()
+            expected = numpy.asarray(references[model](), dtype=float)
+            t_ref = min(timeit.repeat(references[model], number=1, repeat=3))
+            line += ', pvlib {0:.2e} s (x{1:.1f}), max dni difference ' \
+                    '{2:.1e} W.m-2'.format(t_ref, t_ref / t_astk,
+                                           numpy.nanmax(abs(dni - expected)))
+        print(line)
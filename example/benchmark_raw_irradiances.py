@@ -0,0 +1,33 @@
+""" Benchmark of the raw ndarray mode of sky_irradiance_astk against the
+pandas path, for the small date ranges typical of inner simulation loops
+"""
+import timeit
+
+import numpy
+import pandas
+
+from alinea.astk.meteorology.sky_irradiance_astk import sky_irradiances, \
+    sky_irradiances_raw
+
+dates = pandas.date_range('2000-06-21', periods=24, freq='H',
+                          tz='Europe/Paris')
+times = dates.asi8
+
+
+def with_pandas():
+    return sky_irradiances(dates=dates)
+
+
+def raw():
+    return sky_irradiances_raw(times)
+
+
+if __name__ == '__main__':
+    df, res = with_pandas(), raw()
+    for k in df.columns:
+        numpy.testing.assert_allclose(df[k], res[k])
+    t_ref = min(timeit.repeat(with_pandas, number=100, repeat=5)) / 100
+    t_raw = min(timeit.repeat(raw, number=100, repeat=5)) / 100
+    print('{0} dates'.format(len(dates)))
+    print('pandas path: {0:.2e} s'.format(t_ref))
+    print('raw mode: {0:.2e} s (x{1:.0f})'.format(t_raw, t_ref / t_raw))
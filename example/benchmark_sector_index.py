@@ -0,0 +1,38 @@
+""" Benchmark of the hierarchical SectorIndex of turtle domes against a brute
+force search over all sectors
+"""
+import timeit
+
+import numpy
+
+from alinea.astk.icosphere import turtle_dome, SectorIndex
+
+directions = numpy.random.RandomState(0).normal(size=(100000, 3))
+directions /= numpy.linalg.norm(directions, axis=1)[:, numpy.newaxis]
+
+
+def brute_force(index, directions, chunk_size=1000):
+    res = []
+    for start in range(0, len(directions), chunk_size):
+        d = directions[start:start + chunk_size]
+        score = numpy.einsum('sej,nj->nse', index.sector_normals,
+                             d).min(axis=2)
+        res.append(numpy.where(score.max(axis=1) >= -index.tolerance,
+                               score.argmax(axis=1), -1))
+    return numpy.concatenate(res)
+
+
+if __name__ == '__main__':
+    for refine_level in (3, 10, 16):
+        vertices, faces = turtle_dome(refine_level)
+        index = SectorIndex(vertices, faces)
+        numpy.testing.assert_array_equal(index.locate(directions),
+                                         brute_force(index, directions))
+        t_ref = min(timeit.repeat(lambda: brute_force(index, directions),
+                                  number=1, repeat=3))
+        t_index = min(timeit.repeat(lambda: index.locate(directions),
+                                    number=1, repeat=3))
+        print('{0} sectors, {1} directions'.format(len(faces),
+                                                   len(directions)))
+        print('brute force: {0:.2e} s'.format(t_ref))
+        print('index: {0:.2e} s (x{1:.0f})'.format(t_index, t_ref / t_index))
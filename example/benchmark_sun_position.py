@@ -0,0 +1,40 @@
+""" Benchmark of the fused sun ephemeris kernel of sun_position_astk against
+the per-function evaluation path
+"""
+import timeit
+
+import numpy
+import pandas
+
+from alinea.astk.meteorology.sun_position_astk import sun_elevation, \
+    sun_azimuth, eot, sun_ephemeris
+
+latitude = 43.36
+longitude = 3.52
+dates = pandas.date_range('2000-01-01', '2009-12-31 23:00', freq='H',
+                          tz='UTC')
+hUTC = dates.hour + dates.minute / 60.
+dayofyear = dates.dayofyear
+year = dates.year
+
+
+def per_function():
+    el = sun_elevation(hUTC, dayofyear, year, latitude, longitude)
+    az = sun_azimuth(hUTC, dayofyear, year, latitude, longitude)
+    return el, az, eot(hUTC, dayofyear, year)
+
+
+def fused():
+    ephem = sun_ephemeris(hUTC, dayofyear, year, latitude, longitude)
+    return ephem['elevation'], ephem['azimuth'], ephem['eot']
+
+
+if __name__ == '__main__':
+    for a, b in zip(per_function(), fused()):
+        numpy.testing.assert_allclose(a, b, atol=1e-8)
+    t_ref = min(timeit.repeat(per_function, number=1, repeat=5))
+    t_fused = min(timeit.repeat(fused, number=1, repeat=5))
+    print('{0} dates'.format(len(dates)))
+    print('per function path: {0:.3f} s'.format(t_ref))
+    print('fused kernel: {0:.3f} s (x{1:.1f})'.format(t_fused,
+                                                       t_ref / t_fused))
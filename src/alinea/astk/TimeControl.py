@@ -269,47 +269,13 @@ def filter_or(filters):
 def filter_and(filters):
     return reduce(lambda x,y: numpy.array(x) & numpy.array(y), filters)
  
-from openalea.core.system.systemnodes import IterNode    
-    
-class IterWithDelaysNode(IterNode):
-    """ Iteration Node """
-
-    def eval(self):
-        """
-        Return True if the node need a reevaluation
-        """
-        try:
-            if self.iterable == "Empty":
-                self.iterable = iter(self.inputs[0])
-                self.iterdelay = iter(self.inputs[1])
-                self.wait = self.inputs[1][-1]
-
-            if(hasattr(self, "nextval")):
-                self.outputs[0] = self.nextval
-            else:
-                self.outputs[0] = self.iterable.next()
-                
-            self.nextval = self.iterable.next()
-            delay = self.iterdelay.next()
-            self.outputs[1] = delay
-            self.outputs[2] = numpy.random.random() #used to trigger lazy nodes every delay
-            return delay
-
-        except TypeError, e:
-            self.outputs[0] = self.inputs[0]
-            self.outputs[1] = self.inputs[1]
-            return False
-
-        except StopIteration, e:
-            if self.wait > 1:
-                self.wait -= 1
-                return True
-            else:
-                self.iterable = "Empty"
-                if(hasattr(self, "nextval")):
-                    del self.nextval
 
-                return False
+def IterWithDelaysNode(*args, **kwds):
+    """ Create an iteration node with delays (see
+    alinea.astk_wralea.flow_control). openalea.core is only imported at first
+    call, so that importing TimeControl stays cheap."""
+    from alinea.astk_wralea.flow_control import IterWithDelaysNode as node
+    return node(*args, **kwds)
 
 
 #from datetime import datetime, timedelta
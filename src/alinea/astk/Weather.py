@@ -12,6 +12,7 @@ from datetime import datetime, timedelta
 
 from alinea.astk.TimeControl import *
 from alinea.astk.meteorology.sun_position import sun_position
+from alinea.astk.meteorology.sun_position_astk import sun_times
 import alinea.astk.sun_and_sky as sunsky
 
 
@@ -223,9 +224,21 @@ class Weather(object):
         return sun, sky
 
     def daylength(self, seq):
+        """ Return daylength (hour) of the days of a sequence of dates
+
+        Args:
+            seq: a pandas.DatetimeIndex (considered as UTC if not localised)
+
+        Returns:
+            a pandas.Series of daylength (hour) with one value per date of seq,
+            indexed by seq
         """
-        """
-        return sunsky.day_length(self.localisation['latitude'], seq.dayofyear)
+        times = seq if seq.tz is not None else seq.tz_localize('utc')
+        daylength = sun_times(times, latitude=self.localisation['latitude'],
+                              longitude=self.localisation['longitude'])[
+            'daylength']
+        return pandas.Series(daylength.reindex(times.normalize()).values,
+                             index=seq)
 
 
 def weather_node(weather_path):
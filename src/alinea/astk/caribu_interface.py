@@ -1,8 +1,11 @@
-from openalea.plantgl import all as pgl
-from alinea.caribu.CaribuScene import CaribuScene
-import alinea.caribu.sky_tools.turtle as turtle
 from math import radians, degrees, sin , cos
 
+from alinea.astk.lazy_import import lazy_import
+
+pgl = lazy_import('openalea.plantgl.all')
+caribu_scene = lazy_import('alinea.caribu.CaribuScene')
+turtle = lazy_import('alinea.caribu.sky_tools.turtle')
+
 
 
 def vecteur_direction(elevation,azimuth):
@@ -43,7 +46,7 @@ def run_caribu(sources, scene_geometry, output_by_triangle = False):
     - 'out_tri' (dict) only if output_by_triangle = True, return a tuple (out_moy, out_tri)
         A dict of intercepted variable (energy) per triangle
     """
-    c_scene = CaribuScene()
+    c_scene = caribu_scene.CaribuScene()
     shapes=[geom2shape(k,v) for k,v in scene_geometry.iteritems()]
     idmap = c_scene.add_Shapes(shapes)    
     c_scene.addSources(sources)
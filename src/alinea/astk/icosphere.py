@@ -23,15 +23,20 @@ hexagonal/pentagonal duals.
 """
 
 import math
+import os
 import numpy
 import warnings
 
+from alinea.astk.lazy_import import lazy_import
+
 display_enable = True
-try:
-    import openalea.plantgl.all as pgl
-except ImportError:
-    warnings.warn('PlantGL not installed: display is not enable!')
-    display_enable = False
+pgl = lazy_import('openalea.plantgl.all')
+
+# in-process cache of generated meshes, as (vertices, sizes, indices) arrays
+# indexed by (kind, parameters) keys
+_meshes = {}
+# directory where meshes are persisted, if cache_dir is not given
+_cache_environment_variable = 'ASTK_MESH_CACHE'
 
 
 def display(vertices, faces, color=None, view=True):
@@ -48,6 +53,11 @@ def display(vertices, faces, color=None, view=True):
         a pgl shape
     """
     global display_enable
+    if display_enable:
+        try:
+            pgl.Shape
+        except ImportError:
+            display_enable = False
     if display_enable:
         if color is None:
             shape = pgl.Shape(pgl.FaceSet(pointList=vertices, indexList=faces))
@@ -64,23 +74,30 @@ def display(vertices, faces, color=None, view=True):
 
 
 def normed(point):
-    """ normalised coordinates of (0,point) vector
+    """ normalised coordinates of (0,point) vector, or of the rows of a (n, 3)
+    array of points
     """
+    if isinstance(point, numpy.ndarray) and point.ndim > 1:
+        return _normed_rows(point)
     x, y, z = point
     radius = math.sqrt(x ** 2 + y ** 2 + z ** 2)
     return x / radius, y / radius, z / radius
 
 
 def norm(vector):
-    """ norm of a vector
+    """ norm of a vector, or of the rows of a (n, 3) array of vectors
     """
+    if isinstance(vector, numpy.ndarray) and vector.ndim > 1:
+        x, y, z = vector.T
+        return numpy.sqrt(x ** 2 + y ** 2 + z ** 2)
     x, y, z = vector
     return math.sqrt(x ** 2 + y ** 2 + z ** 2)
 
 
 def spherical(points):
-    """ zenital and azimutal coordinate of a list of points"""
-    x, y, z = zip(*points)
+    """ zenital and azimutal coordinate of a list of points (or of a (n, 3)
+    array)"""
+    x, y, z = numpy.asarray(points, dtype=float).reshape(-1, 3).T
     return numpy.arccos(z), numpy.arctan2(y, x)
 
 
@@ -101,7 +118,20 @@ def rotation_matrix(axis, theta):
 
 
 def rotate(points, rotation_matrix):
-    return [numpy.dot(rotation_matrix, p) for p in points]
+    """ rotate points with a single matrix product
+
+    Args:
+        points: a list of 3D points or a (n, 3) array
+        rotation_matrix: a (3, 3) rotation matrix
+
+    Returns:
+        a (n, 3) array if points is an array, a list of points otherwise
+    """
+    rotated = numpy.dot(numpy.asarray(points, dtype=float).reshape(-1, 3),
+                        rotation_matrix.T)
+    if isinstance(points, numpy.ndarray):
+        return rotated
+    return list(rotated)
 
 
 def inverse_rotation(points, theta, phi):
@@ -112,20 +142,35 @@ def inverse_rotation(points, theta, phi):
     return rotate(rotate(points, rotz), roty)
 
 
+def direct_rotation(points, theta, phi):
+    """rotate points theta around y, then phi around z (brings Z+ to the
+    direction of zenith theta and azimuth phi, eg a dome to a slope normal)"""
+
+    roty = rotation_matrix([0, 1, 0], theta)
+    rotz = rotation_matrix([0, 0, 1], phi)
+    return rotate(rotate(points, roty), rotz)
+
+
 def middle_point(p1, p2):
-    """ coordinates of the middle point between p1 and p2
+    """ coordinates of the middle point between p1 and p2 (or of the rows of
+    two (n, 3) arrays)
     """
+    if isinstance(p1, numpy.ndarray) and p1.ndim > 1:
+        return (p1 + p2) / 2.
     x1, y1, z1 = p1
     x2, y2, z2 = p2
     return (x1 + x2) / 2., (y1 + y2) / 2., (z1 + z2) / 2.,
 
 
 def centroid(points):
+    """ centroid of a list of points, or of the last but one axis of an
+    array (eg (n, m, 3) vertices of n faces)"""
+    if isinstance(points, numpy.ndarray) and points.ndim > 2:
+        return points.mean(axis=-2)
     x, y, z = zip(*points)
     return numpy.mean(x), numpy.mean(y), numpy.mean(z)
 
 
-
 def icosahedron():
     """ Creates the vertices and faces of an icosahedron inscribed in the
     unit_sphere and with one vertex aligned on Z+ axis
@@ -190,6 +235,57 @@ def icosahedron():
     return vertices, faces
 
 
+def _normed_rows(points):
+    """ normalised coordinates of an (n, 3) array of points"""
+    x, y, z = points.T
+    return points / numpy.sqrt(x ** 2 + y ** 2 + z ** 2)[:, numpy.newaxis]
+
+
+def _flat_faces(faces):
+    """ concatenated vertex indices, sizes and start offsets of faces"""
+    if isinstance(faces, numpy.ndarray):
+        sizes = numpy.full(len(faces), faces.shape[1], dtype=int)
+        flat = faces.ravel()
+    else:
+        sizes = numpy.array([len(face) for face in faces], dtype=int)
+        flat = numpy.fromiter((p for face in faces for p in face), dtype=int,
+                              count=sizes.sum())
+    return flat, sizes, numpy.cumsum(sizes) - sizes
+
+
+def _centroids(vertices, faces):
+    """ (F, 3) array of the centroids of faces of (V, 3) vertices, with the
+    same summation order as centroid"""
+    flat, sizes, starts = _flat_faces(faces)
+    sums = numpy.add.reduceat(vertices[flat], starts, axis=0)
+    return sums / sizes[:, numpy.newaxis]
+
+
+def _split_triangles(vertices, faces):
+    """ triangle split of (V, 3) vertices and (F, 3) faces arrays"""
+    nv = len(vertices)
+    # edges (v1, v2), (v2, v3), (v1, v3) of faces, as sorted pair keys
+    edges = faces[:, [0, 1, 1, 2, 0, 2]].reshape(-1, 3, 2)
+    edges.sort(axis=2)
+    keys = edges[:, :, 0] * nv + edges[:, :, 1]
+    unique_keys, first, inverse = numpy.unique(keys.ravel(),
+                                               return_index=True,
+                                               return_inverse=True)
+    # middle points are numbered by order of first occurrence
+    order = numpy.argsort(first)
+    rank = numpy.empty_like(order)
+    rank[order] = numpy.arange(len(order))
+    va, vb, vc = (nv + rank[inverse]).reshape(-1, 3).T
+    ends = unique_keys[order]
+    p1, p2 = vertices[ends // nv], vertices[ends % nv]
+    middles = _normed_rows((p1 + p2) / 2.)
+
+    v1, v2, v3 = faces.T
+    children = numpy.stack([numpy.column_stack(child) for child in (
+        (v1, va, vc), (v2, vb, va), (v3, vc, vb), (va, vb, vc))], axis=1)
+    return numpy.concatenate((vertices, middles)), children.reshape(-1, 3)
+
+
 def split_triangles(vertices, faces, tags=None):
     """ Iterate an icosphere by sub-dividing each triangle into 4.
 
@@ -200,50 +296,24 @@ def split_triangles(vertices, faces, tags=None):
         no tags are returned
     Returns:
         a list of vertices and a list of faces and, if tags is not None, a list
-        of tags referencing the tag of the parent face
+        of tags referencing the tag of the parent face. Children of face j are
+        faces 4j to 4j + 3. If faces are given as a (F, 3) array, arrays are
+        returned.
 
-    This is a python implementation of the C code found here:
+    This is a vectorised version of the C code found here:
     http://blog.andreaskahler.com/2009/06/creating-icosphere-mesh-in-code.html
 """
-    # cache is a (index_p1, index_p2): middle_point_index dict refering
-    # to vertices
-    cache = {}
-    for i in range(len(faces)):
-        face = faces.pop(0)
-        v1, v2, v3 = face
-        p1 = vertices[v1]
-        p2 = vertices[v2]
-        p3 = vertices[v3]
-        ka = tuple(sorted((v1, v2)))
-        kb = tuple(sorted((v2, v3)))
-        kc = tuple(sorted((v1, v3)))
-        if ka in cache:
-            va = cache[ka]
-        else:
-            vertices.append(normed(middle_point(p1, p2)))
-            va = len(vertices) - 1
-            cache.update({ka: va})
-        if kb in cache:
-            vb = cache[kb]
-        else:
-            vertices.append(normed(middle_point(p2, p3)))
-            vb = len(vertices) - 1
-            cache.update({kb: vb})
-        if kc in cache:
-            vc = cache[kc]
-        else:
-            vertices.append(normed(middle_point(p1, p3)))
-            vc = len(vertices) - 1
-            cache.update({kc: vc})
-
-        faces.append((v1, va, vc))
-        faces.append((v2, vb, va))
-        faces.append((v3, vc, vb))
-        faces.append((va, vb, vc))
-
+    as_array = isinstance(faces, numpy.ndarray)
+    vertices, faces = _split_triangles(
+        numpy.asarray(vertices, dtype=float).reshape(-1, 3),
+        numpy.asarray(faces, dtype=int).reshape(-1, 3))
+    if tags is not None:
+        tags = numpy.repeat(numpy.asarray(tags), 4)
+    if not as_array:
+        vertices = [tuple(v) for v in vertices.tolist()]
+        faces = [tuple(f) for f in faces.tolist()]
         if tags is not None:
-            tag = tags.pop(0)
-            tags.extend([tag] * 4)
+            tags = tags.tolist()
 
     if tags is None:
         return vertices, faces
@@ -264,6 +334,35 @@ def sorted_faces(center, face_indices, faces):
     return sorted_indices
 
 
+def incidence(faces, nvertices=None):
+    """ Sparse vertex-face incidence of a polyhedron
+
+    Args:
+        faces (list of tuple): list of vertex indices defining the faces (or
+        a (F, n) array)
+        nvertices (int): the number of vertices. If None, it is deduced from
+        faces
+
+    Returns:
+        a (indptr, indices) tuple of arrays (CSR layout): faces incident to
+        vertex v are indices[indptr[v]:indptr[v + 1]], in increasing order
+    """
+    if isinstance(faces, numpy.ndarray):
+        flat = faces.ravel()
+        sizes = numpy.full(len(faces), faces.shape[1], dtype=int)
+    else:
+        sizes = numpy.array([len(face) for face in faces], dtype=int)
+        flat = numpy.fromiter((p for face in faces for p in face), dtype=int,
+                              count=sizes.sum())
+    if nvertices is None:
+        nvertices = flat.max() + 1 if len(flat) > 0 else 0
+    owner = numpy.repeat(numpy.arange(len(faces)), sizes)
+    order = numpy.argsort(flat, kind='mergesort')
+    indptr = numpy.concatenate(
+        ([0], numpy.cumsum(numpy.bincount(flat, minlength=nvertices))))
+    return indptr, owner[order]
+
+
 def dual(vertices, faces):
     """Generate the dual polyhedron associated to an icosphere.
 
@@ -273,26 +372,37 @@ def dual(vertices, faces):
     Returns:
         a list of vertices and a list of faces
     """
-
-    # centers = []
-    dual_vertices = []
-    dual_faces = []
-    cache = {}
-    for icenter, center in enumerate(vertices):
-        new_face = []
-        # centers.append(center)
-        ifaces = [i for i, f in enumerate(faces) if icenter in f]
-        for iface in sorted_faces(icenter, ifaces, faces):
-            if iface in cache:
-                new_face.append(cache[iface])
-            else:
-                cache[iface] = len(dual_vertices)
-                new_face.append(len(dual_vertices))
-                points = [vertices[i] for i in faces[iface]]
-                dual_vertices.append(normed(centroid(points)))
-        dual_faces.append(new_face)
-
-    return dual_vertices, dual_faces
+    points = numpy.asarray(vertices, dtype=float).reshape(-1, 3)
+    triangles = numpy.asarray(faces, dtype=int).reshape(-1, 3)
+    indptr, indices = incidence(triangles, len(points))
+    counts = numpy.diff(indptr)
+    center = numpy.repeat(numpy.arange(len(points)), counts)
+
+    # sort faces incident to a vertex counterclockwise (seen from outside),
+    # starting from the face of lowest index
+    centroids = points[triangles].sum(axis=1) / 3.
+    normals = points[center]
+    d = centroids[indices] - points[center]
+    first = d[indptr[:-1][counts > 0]]
+    first = numpy.repeat(first, counts[counts > 0], axis=0)
+    e1 = first - normals * (numpy.sum(first * normals, axis=1) / numpy.sum(
+        normals * normals, axis=1))[:, numpy.newaxis]
+    e2 = numpy.cross(normals, e1)
+    angle = numpy.mod(numpy.arctan2(numpy.sum(d * e2, axis=1),
+                                    numpy.sum(d * e1, axis=1)), 2 * numpy.pi)
+    angle[indptr[:-1][counts > 0]] = -1
+    sorted_indices = indices[numpy.lexsort((angle, center))]
+
+    # dual vertices are numbered by order of first occurrence
+    _, first_occurrence = numpy.unique(sorted_indices, return_index=True)
+    order = numpy.argsort(first_occurrence)
+    rank = numpy.empty_like(order)
+    rank[order] = numpy.arange(len(order))
+    dual_vertices = _normed_rows(centroids[order])
+    dual_faces = numpy.split(rank[sorted_indices], indptr[1:-1])
+
+    return ([tuple(v) for v in dual_vertices.tolist()],
+            [f.tolist() for f in dual_faces])
 
 
 def star_split(vertices, faces, tags=None):
@@ -307,42 +417,109 @@ def star_split(vertices, faces, tags=None):
         a list of vertices and a list of faces and, if tags is not None, a list
         of tags referencing the tag of the parent face
     """
-
-    for i in range(len(faces)):
-        face = faces.pop(0)
-        center = normed(centroid([vertices[p] for p in face]))
-        icenter = len(vertices)
-        vertices.append(center)
-        for j in range(len(face) - 1):
-            faces.append((face[j], face[j + 1], icenter))
-        faces.append((face[-1], face[0], icenter))
-        if tags is not None:
-            tag = tags.pop(0)
-            tags.extend([tag] * len(face))
+    vertices = numpy.asarray(vertices, dtype=float).reshape(-1, 3)
+    flat, sizes, starts = _flat_faces(faces)
+    centers = _normed_rows(_centroids(vertices, faces))
+    icenters = len(vertices) + numpy.arange(len(faces))
+    # each edge of a face, closed by (last, first), with the face center
+    following = numpy.arange(1, len(flat) + 1)
+    following[starts + sizes - 1] = starts
+    new_faces = numpy.column_stack((flat, flat[following],
+                                    numpy.repeat(icenters, sizes)))
+
+    vertices = [tuple(v) for v in
+                numpy.concatenate((vertices, centers)).tolist()]
+    faces = [tuple(f) for f in new_faces.tolist()]
     if tags is None:
         return vertices, faces
     else:
-        return vertices, faces, tags
+        return vertices, faces, numpy.repeat(numpy.asarray(tags),
+                                             sizes).tolist()
+
+
+def _pack(vertices, faces):
+    """ vertices, face sizes and flat face indices arrays of a mesh"""
+    sizes = numpy.array([len(face) for face in faces], dtype=int)
+    indices = numpy.fromiter((p for face in faces for p in face), dtype=int,
+                             count=sizes.sum())
+    return numpy.asarray(vertices, dtype=float).reshape(-1, 3), sizes, indices
+
+
+def _unpack(vertices, sizes, indices, face_type=list):
+    """ list of vertices and list of faces of a packed mesh"""
+    flat = indices.tolist()
+    bounds = numpy.cumsum(sizes).tolist()
+    faces = [face_type(flat[start:stop]) for start, stop in
+             zip([0] + bounds[:-1], bounds)]
+    return [tuple(v) for v in vertices.tolist()], faces
+
+
+def _cache_path(key, cache_dir=None):
+    if cache_dir is None:
+        cache_dir = os.environ.get(_cache_environment_variable)
+    if cache_dir is None:
+        return None
+    return os.path.join(cache_dir, '_'.join(str(k) for k in key) + '.npz')
+
+
+def _cached(key, build, cache_dir=None):
+    """ packed arrays of key, built with build() if neither in process cache
+    nor persisted"""
+    if key not in _meshes:
+        path = _cache_path(key, cache_dir)
+        if path is not None and os.path.exists(path):
+            data = numpy.load(path)
+            arrays = tuple(data[k] for k in ('vertices', 'sizes', 'indices'))
+        else:
+            arrays = build()
+            if path is not None:
+                if not os.path.isdir(os.path.dirname(path)):
+                    os.makedirs(os.path.dirname(path))
+                numpy.savez_compressed(path, vertices=arrays[0],
+                                       sizes=arrays[1], indices=arrays[2])
+        for a in arrays:
+            a.setflags(write=False)
+        _meshes[key] = arrays
+    return _meshes[key]
+
 
+def clear_mesh_cache():
+    """ Free meshes cached in memory (persisted meshes are kept)"""
+    _meshes.clear()
 
-def icosphere(iter_triangle=0, iter_star=0):
+
+def icosphere(iter_triangle=0, iter_star=0, cache_dir=None):
     """Generate an icosphere from a icosahedron by iterating n times the
     triangle-split of its faces and m time the star-split of the faces of
     its dual.
 
+    Meshes are cached in memory and, if cache_dir (or the ASTK_MESH_CACHE
+    environment variable) is set, persisted there as numpy files.
+
     Args:
         iter_triangle (int): the number of iteration of the triangle split
         iter_star (int): the number of iteration of the star-split
+        cache_dir (str): a directory where meshes are persisted
 
     Returns:
         a list of vertices and a list of faces
     """
+    arrays = _cached(('icosphere', iter_triangle, iter_star),
+                     lambda: _pack(*_icosphere(iter_triangle, iter_star)),
+                     cache_dir)
+    return _unpack(*arrays, face_type=tuple)
+
 
+def _icosphere(iter_triangle=0, iter_star=0):
     vertices, faces = icosahedron()
     for i in range(iter_star):
         vertices, faces = star_split(*dual(vertices, faces))
-    for i in range(iter_triangle):
-        vertices, faces = split_triangles(vertices, faces)
+    if iter_triangle > 0:
+        vertices, faces = numpy.array(vertices), numpy.array(faces)
+        for i in range(iter_triangle):
+            vertices, faces = split_triangles(vertices, faces)
+        vertices = [tuple(v) for v in vertices.tolist()]
+        faces = [tuple(f) for f in faces.tolist()]
 
     return vertices, faces
 
@@ -376,9 +553,12 @@ def refine(level=0):
     return iter_triangle, iter_star
 
 
-def turtle_dome(refine_level=3):
+def turtle_dome(refine_level=3, cache_dir=None):
     """Generate faces of a dual icosphere polyhedron mapping the Z+ hemisphere
 
+    Domes are cached in memory and, if cache_dir (or the ASTK_MESH_CACHE
+    environment variable) is set, persisted there as numpy files.
+
     Args:
         refine_level (int): the level of refinement of the dual icosphere. By
         default 46 ^polygons are returned (refine_level=3).
@@ -386,20 +566,26 @@ def turtle_dome(refine_level=3):
         For information, here are the number of faces obtained for the first ten
         refinement level: 0: 6, 1: 16, 2: 26, 3: 46, 4: 66, 5: 91, 6: 136,
         7: 196, 8: 251, 9: 341, 10: 406
+        cache_dir (str): a directory where domes are persisted
 
     Returns:
         a list of vertices and a list of faces
     """
+    arrays = _cached(('turtle_dome', refine_level),
+                     lambda: _pack(*_turtle_dome(refine_level)), cache_dir)
+    return _unpack(*arrays)
+
 
-    vertices, faces = dual(*icosphere(*refine(refine_level)))
+def _turtle_dome(refine_level=3):
+    vertices, faces = dual(*_icosphere(*refine(refine_level)))
     # filter faces with centroids below horizontal plane
-    centers = [centroid([vertices[p] for p in face]) for face in faces]
-    median_height = numpy.median([c[2] for c in centers])
+    heights = _centroids(numpy.array(vertices), faces)[:, 2]
+    median_height = numpy.median(heights)
     edge = [vertices[v] for v in faces[0]]
     t = norm(numpy.array(edge[1]) - numpy.array(edge[0]))
     median_height -= (t / 4.)
-    new_faces = [f for c, f in zip(centers, faces) if c[2] > median_height]
-    filtered = sum(new_faces, [])
+    new_faces = [f for h, f in zip(heights, faces) if h > median_height]
+    filtered = set(v for face in new_faces for v in face)
     mapping = {}
     new_vertices = []
     for v, pt in enumerate(vertices):
@@ -411,7 +597,7 @@ def turtle_dome(refine_level=3):
     return new_vertices, new_faces
 
 
-def sample_faces(vertices, faces, iter=2, spheric=False):
+def sample_faces(vertices, faces, iter=2, spheric=False, flat=False):
     """Generate a set of points that regularly sample the faces of a polyhedron
     the number of sampling points is 6 * 4**iter or 5 * 4**iter
 
@@ -422,26 +608,304 @@ def sample_faces(vertices, faces, iter=2, spheric=False):
         of the polyhedron. If None, face centers are returned
         speric (bool): if True, zenital and azimuth are returnd
         instead of points
+        flat (bool): if True, points are returned as arrays, with the array of
+         the indices of the faces they sample
 
     Returns:
-        a {face_index: [points]} dict
+        a {face_index: [points]} dict or, if flat is True, a (N, 3) array of
+        points (a (zenith, azimuth) tuple of (N,) arrays if spheric is True)
+        sorted by face and the (N,) array of their face indices
     """
-
+    vertices = numpy.asarray(vertices, dtype=float).reshape(-1, 3)
     if iter is None:
-        points = {i: [centroid([vertices[p] for p in face])] for i, face in
-                enumerate(faces)}
+        points = _centroids(vertices, faces)
+        tags = numpy.arange(len(faces))
     else:
         tags = range(len(faces))
         vertices, faces, tags = star_split(vertices, faces, tags)
+        vertices, faces = numpy.array(vertices), numpy.array(faces)
         for i in range(iter):
             vertices, faces, tags = split_triangles(vertices, faces, tags)
+        points = _centroids(vertices, faces)
+        order = numpy.argsort(tags, kind='mergesort')
+        points, tags = points[order], numpy.asarray(tags)[order]
+
+    if flat:
+        if spheric:
+            points = spherical(points)
+        return points, tags
+
+    bounds = numpy.flatnonzero(numpy.diff(tags)) + 1
+    points = dict((tag, [tuple(p) for p in chunk.tolist()]) for tag, chunk in
+                  zip(tags[numpy.concatenate(([0], bounds))].tolist(),
+                      numpy.split(points, bounds)))
+    if spheric:
+        points = {k: spherical(v) for k, v in points.iteritems()}
+
+    return points
+
 
-        points = {tag: [] for tag in set(tags)}
-        for i, face in enumerate(faces):
-            points[tags[i]].append(centroid([vertices[p] for p in face]))
+def sample_dome(refine_level=3, iter=2, spheric=False, cache_dir=None,
+                flat=False):
+    """Sampling points of the faces of a turtle dome (see sample_faces and
+    turtle_dome), cached in memory and persisted as turtle domes
+
+    Args:
+        refine_level (int): the level of refinement of the turtle dome
+        iter: the number of triangular interation to apply on the satr-split
+        of the polyhedron. If None, face centers are returned
+        speric (bool): if True, zenital and azimuth are returnd
+        instead of points
+        cache_dir (str): a directory where samples are persisted
+        flat (bool): if True, points are returned as arrays, with the array of
+         the indices of the faces they sample
+
+    Returns:
+        a {face_index: [points]} dict or, if flat is True, a (N, 3) array of
+        points (a (zenith, azimuth) tuple of (N,) arrays if spheric is True)
+        sorted by face and the (N,) array of their face indices
+    """
+
+    def _build():
+        samples, face_index = sample_faces(
+            *turtle_dome(refine_level, cache_dir), iter=iter, flat=True)
+        tags, sizes = numpy.unique(face_index, return_counts=True)
+        return samples, sizes, tags
+
+    samples, sizes, tags = _cached(('sample_dome', refine_level, iter),
+                                   _build, cache_dir)
+    if flat:
+        face_index = numpy.repeat(tags, sizes)
+        if spheric:
+            samples = spherical(samples)
+        return samples, face_index
+
+    bounds = numpy.cumsum(sizes).tolist()
+    samples = [tuple(p) for p in samples.tolist()]
+    points = dict((tag, samples[start:stop]) for tag, start, stop in
+                  zip(tags.tolist(), [0] + bounds[:-1], bounds))
 
     if spheric:
-        points = {k:spherical(v) for k, v in points.iteritems()}
+        points = {k: spherical(v) for k, v in points.iteritems()}
 
     return points
 
+
+def _polygons(faces):
+    """ (F, m) array of faces padded by repeating their last vertex"""
+    if isinstance(faces, numpy.ndarray):
+        return faces
+    size = max(len(face) for face in faces)
+    return numpy.array([list(face) + [face[-1]] * (size - len(face))
+                        for face in faces], dtype=int)
+
+
+def solid_angle(vertices, faces):
+    """ Solid angle of the spherical polygons defined by the faces of a
+    polyhedron projected on the unit sphere
+
+    Faces are triangulated in fans and the exact solid angles of the spherical
+    triangles are summed (Van Oosterom and Strackee, 1983).
+
+    Args:
+        vertices (list of tuples): list of 3D coordinates of polyhedron vertices
+        faces (list of tuple): list of vertex indices defining the faces
+
+    Returns:
+        a (F,) array of solid angles (steradians)
+    """
+    points = _normed_rows(numpy.asarray(vertices, dtype=float).reshape(-1, 3))
+    polygons = _polygons(faces)
+    a = points[polygons[:, :1]]
+    b = points[polygons[:, 1:-1]]
+    c = points[polygons[:, 2:]]
+    # padding triangles (repeated vertices) have null solid angles
+    det = numpy.einsum('fij,fij->fi', a, numpy.cross(b, c))
+    denominator = 1 + numpy.einsum('fij,fij->fi', a, b) + numpy.einsum(
+        'fij,fij->fi', b, c) + numpy.einsum('fij,fij->fi', c, a)
+    return numpy.abs(2 * numpy.arctan2(det, denominator).sum(axis=1))
+
+
+def _edge_normals(points, polygons, centers):
+    """ (n, m, 3) inward normals of the great circles supporting the edges
+    of polygons given as a (n, m) array of vertex indices"""
+    a = points[polygons]
+    b = points[numpy.roll(polygons, -1, axis=1)]
+    normals = numpy.cross(a, b)
+    norm = numpy.linalg.norm(normals, axis=2)
+    # degenerated edges (repeated vertices) get null normals
+    norm[norm == 0] = 1
+    normals /= norm[:, :, numpy.newaxis]
+    inward = numpy.sum(normals * centers[:, numpy.newaxis, :], axis=2)
+    return normals * numpy.where(inward < 0, -1, 1)[:, :, numpy.newaxis]
+
+
+def _angular_radius(points, polygons, centers):
+    """ maximal angle (radians) between polygon centers and their vertices"""
+    cosangle = numpy.sum(points[polygons] * centers[:, numpy.newaxis, :],
+                         axis=2)
+    return numpy.arccos(numpy.clip(cosangle.min(axis=1), -1, 1))
+
+
+def _min_edge(scores):
+    """ minimum over the (short) last axis of scores, faster than min(axis=-1)
+    """
+    res = scores[..., 0].copy()
+    for i in range(1, scores.shape[-1]):
+        numpy.minimum(res, scores[..., i], out=res)
+    return res
+
+
+class SectorIndex(object):
+    """ Spatial index of the faces (sectors) of a spherical polyhedron
+
+    Directions are located by descending the triangle-split hierarchy of the
+    icosahedron down to buckets of about the size of the sectors (O(log n)
+    per direction), then testing the few sectors overlapping their bucket.
+    Sectors should be convex spherical polygons (eg faces of icosphere or
+    turtle_dome).
+    """
+
+    def __init__(self, vertices, faces, depth=None, tolerance=1e-9):
+        """ Index the faces of a polyhedron
+
+        Args:
+            vertices (list of tuples): list of 3D coordinates of polyhedron
+             vertices
+            faces (list of tuple): list of vertex indices defining the faces
+            depth (int): the number of triangle splits of the bucket
+             hierarchy. If None, buckets are about four times smaller than
+             sectors.
+            tolerance (float): directions out of all sectors by less than
+             tolerance (in sine of angle) are assigned to the closest sector
+        """
+        points = _normed_rows(numpy.asarray(vertices, dtype=float).reshape(
+            -1, 3))
+        polygons = _polygons(faces)
+        centers = _normed_rows(_centroids(points, faces))
+        self.sector_normals = _edge_normals(points, polygons, centers)
+        radius = _angular_radius(points, polygons, centers)
+        self.tolerance = tolerance
+
+        if depth is None:
+            depth = max(0, int(numpy.ceil(numpy.log(len(faces) * 4 / 20.) /
+                                          numpy.log(4))))
+        self.depth = depth
+
+        # bucket hierarchy: children of bucket j are 4j..4j+3. At each split,
+        # a direction is in the middle child if it is inside its three edges,
+        # or else in the corner child beyond the edge it is most outside of.
+        bucket_points, buckets = icosahedron()
+        bucket_points = numpy.array(bucket_points)
+        buckets = numpy.array(buckets)
+        bucket_centers = _normed_rows(bucket_points[buckets].mean(axis=1))
+        self.root_normals = _edge_normals(bucket_points, buckets,
+                                          bucket_centers)
+        self.middle_normals = []
+        self.children = []
+        # candidate (bucket, sector) pairs, refined level by level
+        pairs_bucket = numpy.repeat(numpy.arange(len(buckets)), len(faces))
+        pairs_sector = numpy.tile(numpy.arange(len(faces)), len(buckets))
+        for level in range(depth + 1):
+            if level > 0:
+                nparents = len(buckets)
+                bucket_points, buckets = split_triangles(bucket_points,
+                                                         buckets)
+                bucket_centers = _normed_rows(
+                    bucket_points[buckets].mean(axis=1))
+                children = numpy.arange(4 * nparents).reshape(-1, 4)
+                # the middle child only has new (midpoint) vertices
+                middle = children[numpy.arange(nparents), numpy.argmax(
+                    buckets.reshape(-1, 4, 3).min(axis=2), axis=1)]
+                normals = _edge_normals(bucket_points, buckets[middle],
+                                        bucket_centers[middle])
+                side = numpy.einsum('pej,pkj->pek', normals,
+                                    bucket_centers[children])
+                table = numpy.empty((nparents, 4), dtype=int)
+                table[:, :3] = children[numpy.arange(nparents)[:, numpy.newaxis],
+                                        numpy.argmin(side, axis=2)]
+                table[:, 3] = middle
+                self.middle_normals.append(normals)
+                self.children.append(table)
+                pairs_bucket = (4 * pairs_bucket[:, numpy.newaxis] +
+                                numpy.arange(4)).ravel()
+                pairs_sector = numpy.repeat(pairs_sector, 4)
+            bucket_radius = _angular_radius(bucket_points, buckets,
+                                            bucket_centers)
+            cosangle = numpy.sum(bucket_centers[pairs_bucket] *
+                                 centers[pairs_sector], axis=1)
+            angle = numpy.arccos(numpy.clip(cosangle, -1, 1))
+            overlap = angle <= (bucket_radius[pairs_bucket] +
+                                radius[pairs_sector]) * (1 + 1e-6) + 1e-9
+            pairs_bucket = pairs_bucket[overlap]
+            pairs_sector = pairs_sector[overlap]
+        # candidate sectors of leaf buckets, padded with -1
+        counts = numpy.bincount(pairs_bucket, minlength=len(buckets))
+        order = numpy.argsort(pairs_bucket, kind='mergesort')
+        rank = numpy.arange(len(order)) - numpy.repeat(
+            numpy.cumsum(counts) - counts, counts)
+        self.candidates = numpy.full((len(buckets), max(1, counts.max())), -1,
+                                     dtype=int)
+        self.candidates[pairs_bucket[order], rank] = pairs_sector[order]
+
+    def buckets(self, directions):
+        """ leaf buckets of directions given as a (n, 3) array"""
+        normals = self.root_normals
+        # edge-major layout keeps the minimum over edges on contiguous rows
+        score = numpy.dot(directions, normals.transpose(1, 0, 2).reshape(
+            -1, 3).T).reshape(len(directions), 3, -1)
+        score = numpy.minimum(numpy.minimum(score[:, 0], score[:, 1]),
+                              score[:, 2])
+        bucket = numpy.argmax(score, axis=1)
+        for normals, children in zip(self.middle_normals, self.children):
+            score = numpy.einsum('nej,nj->ne', normals[bucket], directions)
+            edge = numpy.argmin(score, axis=1)
+            edge[score[numpy.arange(len(edge)), edge] >= 0] = 3
+            bucket = children[bucket, edge]
+        return bucket
+
+    def locate(self, directions, chunk_size=65536):
+        """ Sectors containing directions
+
+        Args:
+            directions: a (n, 3) array of cartesian coordinates of directions
+            chunk_size: (int) the number of directions processed at once
+
+        Returns:
+            a (n,) array of sector indices (-1 for directions out of all
+            sectors)
+        """
+        directions = numpy.asarray(directions, dtype=float).reshape(-1, 3)
+        sectors = numpy.empty(len(directions), dtype=int)
+        for start in range(0, len(directions), chunk_size):
+            d = _normed_rows(directions[start:start + chunk_size])
+            candidates = self.candidates[self.buckets(d)]
+            score = _min_edge(numpy.einsum('nkej,nj->nke',
+                                           self.sector_normals[candidates],
+                                           d))
+            score[candidates < 0] = -numpy.inf
+            best = numpy.argmax(score, axis=1)
+            rows = numpy.arange(len(d))
+            sectors[start:start + chunk_size] = numpy.where(
+                score[rows, best] >= -self.tolerance, candidates[rows, best],
+                -1)
+        return sectors
+
+    def locate_spherical(self, zenith, azimuth):
+        """ Sectors containing directions given by their zenital and azimutal
+        coordinates (radians, as returned by spherical)"""
+        zenith, azimuth = numpy.broadcast_arrays(zenith, azimuth)
+        sin_z = numpy.sin(zenith)
+        directions = numpy.stack((sin_z * numpy.cos(azimuth),
+                                  sin_z * numpy.sin(azimuth),
+                                  numpy.cos(zenith)), axis=-1)
+        return self.locate(directions.reshape(-1, 3)).reshape(zenith.shape)
+
+
+def dome_index(refine_level=3):
+    """ SectorIndex of the faces of turtle_dome(refine_level), kept in memory
+    with the meshes"""
+    key = 'dome_index_{0}'.format(refine_level)
+    if key not in _meshes:
+        _meshes[key] = SectorIndex(*turtle_dome(refine_level))
+    return _meshes[key]
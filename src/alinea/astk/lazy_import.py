@@ -0,0 +1,66 @@
+# -*- python -*-
+#
+#       Copyright 2016 INRIA - CIRAD - INRA
+#
+#       Distributed under the Cecill-C License.
+#       See accompanying file LICENSE.txt or copy at
+#           http://www.cecill.info/licences/Licence_CeCILL-C_V1-en.html
+#
+#       WebSite : https://github.com/openalea-incubator/astk
+#
+#       File author(s): Christian Fournier <Christian.Fournier@supagro.inra.fr>
+#
+# ==============================================================================
+
+""" Deferred import of heavy optional dependencies (pvlib, ephem, PlantGL,
+caribu...), so that importing astk modules stays cheap
+"""
+
+import importlib
+
+
+class LazyModule(object):
+    """ A module proxy, importing the module on first attribute access"""
+
+    def __init__(self, name, message=None):
+        """ Create a proxy of a module
+
+        Args:
+            name: (str) the full name of the module (eg 'pvlib.irradiance')
+            message: (str) a hint appended to the ImportError raised at first
+             use if the module is missing
+        """
+        self.__dict__['_name'] = name
+        self.__dict__['_message'] = message
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        if self._module is None:
+            try:
+                module = importlib.import_module(self._name)
+            except ImportError as e:
+                if self._message is None:
+                    raise
+                raise ImportError('{0}\n{1}'.format(e, self._message))
+            self.__dict__['_module'] = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        return "<lazy module '{0}'>".format(self._name)
+
+
+def lazy_import(name, message=None):
+    """ A proxy of module name, imported on first attribute access
+
+    Args:
+        name: (str) the full name of the module (eg 'pvlib.irradiance')
+        message: (str) a hint appended to the ImportError raised at first use
+         if the module is missing
+
+    Returns:
+        a LazyModule
+    """
+    return LazyModule(name, message)
@@ -0,0 +1,245 @@
+# -*- python -*-
+#
+#       Copyright 2016 INRIA - CIRAD - INRA
+#
+#       Distributed under the Cecill-C License.
+#       See accompanying file LICENSE.txt or copy at
+#           http://www.cecill.info/licences/Licence_CeCILL-C_V1-en.html
+#
+#       WebSite : https://github.com/openalea-incubator/astk
+#
+#       File author(s): Christian Fournier <Christian.Fournier@supagro.inra.fr>
+#
+# ==============================================================================
+
+""" Chunked multi-threaded evaluation of long ephemeris and irradiance series
+
+Dates are split into blocks evaluated on a pool of threads (numpy releases the
+GIL in array operations). Results are written into preallocated output
+arrays, so that temporaries never span more than one block.
+"""
+
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+
+import numpy
+import pandas
+
+from alinea.astk.meteorology.decomposition import is_pointwise
+from alinea.astk.meteorology.sun_position_astk import sun_position_raw
+from alinea.astk.meteorology.sky_irradiance_astk import sky_irradiances_raw
+
+# default location and dates
+_daydate = '2000-06-21'
+_timezone = 'Europe/Paris'
+_longitude = 3.52
+_latitude = 43.36
+_altitude = 56
+
+# dates per block: keeps the few tens of float temporaries of the ephemeris
+# within a L2/L3 cache
+_chunk_size = 16384
+
+
+def chunks(n, chunk_size=_chunk_size):
+    """ (start, stop) bounds of consecutive blocks of chunk_size items
+    covering range(n)"""
+    return [(start, min(start + chunk_size, n)) for start in
+            range(0, n, chunk_size)]
+
+
+def _overlapped(evaluate, start, stop, n):
+    """ evaluate a block extended on each side until it includes a daylight
+    date (or the end of the series), and trim the result to the block"""
+    before = after = 1
+    while True:
+        lo, hi = max(0, start - before), min(n, stop + after)
+        res = evaluate(lo, hi)
+        day = res['elevation'] > 0
+        complete = True
+        if lo > 0 and not day[:start - lo].any():
+            before *= 2
+            complete = False
+        if hi < n and not day[stop - lo:].any():
+            after *= 2
+            complete = False
+        if complete:
+            return dict((k, v[start - lo:stop - lo]) for k, v in res.items())
+
+
+def evaluate_chunked(func, times, columns, arrays=None,
+                     chunk_size=_chunk_size, threads=None, overlap=False,
+                     **kwds):
+    """ Evaluate a raw function by blocks of dates on a thread pool
+
+    Args:
+        func: a function taking an array of times as first argument and
+         returning a dict of arrays with one value per time (eg
+         sun_position_raw with filter_night=False)
+        times: (array of int64) UTC dates as nanoseconds since epoch (eg
+         DatetimeIndex.asi8)
+        columns: (list of str) the outputs of func to collect
+        arrays: (dict) arrays with one value per time, passed to func as
+         keyword arguments after being sliced as times. None values are
+         passed as is.
+        chunk_size: (int) the number of dates per block
+        threads: (int) the number of threads. If None, the number of cpus is
+         used.
+        overlap: (bool) for functions using the neighbouring daylight dates of
+         each date (eg the dirint decomposition), blocks are evaluated with
+         their neighbouring daylight dates and trimmed, so that results do not
+         depend on chunk_size. func outputs should then include 'elevation'.
+        **kwds: other arguments passed to func
+
+    Returns:
+        a dict of float arrays with one value per time
+    """
+    times = numpy.asarray(times, dtype='int64')
+    if arrays is None:
+        arrays = {}
+    for k, v in arrays.items():
+        if v is None:
+            kwds[k] = None
+    arrays = dict((k, numpy.asarray(v, dtype=float)) for k, v in
+                  arrays.items() if v is not None)
+    out = dict((k, numpy.empty(len(times))) for k in columns)
+
+    def _func(start, stop):
+        args = dict((k, v[start:stop]) for k, v in arrays.items())
+        args.update(kwds)
+        return func(times[start:stop], **args)
+
+    def _evaluate(bounds):
+        start, stop = bounds
+        if overlap:
+            res = _overlapped(_func, start, stop, len(times))
+        else:
+            res = _func(start, stop)
+        for k in columns:
+            out[k][start:stop] = res[k]
+
+    blocks = chunks(len(times), chunk_size)
+    if threads is None:
+        threads = multiprocessing.cpu_count()
+    threads = min(threads, len(blocks))
+    if threads <= 1:
+        for bounds in blocks:
+            _evaluate(bounds)
+    else:
+        pool = ThreadPool(threads)
+        try:
+            pool.map(_evaluate, blocks)
+        finally:
+            pool.close()
+            pool.join()
+    return out
+
+
+def _localised(dates, daydate, timezone):
+    if dates is None:
+        dates = pandas.date_range(daydate, periods=24, freq='H')
+    if dates.tz is None:
+        dates = dates.tz_localize(timezone)
+    return dates
+
+
+def sun_position(dates=None, daydate=_daydate, latitude=_latitude,
+                 longitude=_longitude, altitude=_altitude, timezone=_timezone,
+                 filter_night=True, chunk_size=_chunk_size, threads=None):
+    """ Sun position (see sun_position_astk.sun_position), evaluated by blocks
+    of dates on a thread pool
+
+    Args:
+        dates: a pandas.DatetimeIndex specifying the dates at which sun position
+        is required.If None, daydate is used and one position per hour is generated
+        daydate: (str) yyyy-mm-dd (not used if dates is not None).
+        latitude: float
+        longitude: float
+        altitude: (float) altitude in m
+        timezone: a string identifying the timezone to be associated to dates if
+        dates is not already localised.
+        filter_night (bool) : Should positions of sun during night be filtered ?
+        chunk_size: (int) the number of dates per block
+        threads: (int) the number of threads. If None, the number of cpus is
+         used.
+
+    Returns:
+        a pandas dataframe with sun position at requested dates indexed by
+        localised dates. Sun azimtuth is given from North, positive clockwise.
+    """
+    dates = _localised(dates, daydate, timezone)
+    res = evaluate_chunked(sun_position_raw, dates.asi8,
+                           ['elevation', 'zenith', 'azimuth'],
+                           chunk_size=chunk_size, threads=threads,
+                           latitude=latitude, longitude=longitude,
+                           altitude=altitude, filter_night=False)
+    if filter_night:
+        day = res['elevation'] > 0
+        res = dict((k, v[day]) for k, v in res.items())
+        dates = dates[day]
+    return pandas.DataFrame(res, index=dates)
+
+
+def sky_irradiances(dates=None, daydate=_daydate, ghi=None, dhi=None,
+                    attenuation=None, pressure=101325, temp_dew=None,
+                    longitude=_longitude, latitude=_latitude,
+                    altitude=_altitude, timezone=_timezone, model='spitters',
+                    filter_night=True, chunk_size=_chunk_size, threads=None):
+    """ Estimate variables related to sky irradiance (see
+    sky_irradiance_astk.sky_irradiances), evaluated by blocks of dates on a
+    thread pool
+
+    Blocks of models using neighbouring dates (dirint) overlap, so that
+    results do not depend on chunk_size.
+
+    Args:
+        dates: A pandas datetime index (as generated by pandas.date_range). If
+            None, daydate is used.
+        daydate: (str) yyyy-mm-dd (not used if dates is not None).
+        ghi: (array_like) : global horizontal irradiance (W. m-2) at dates.If
+         None (default) clear_sky irradiance are used
+        dhi: (array-like): diffuse horizontal irradiance at dates
+        attenuation: (float) a attenuation factor for ghi (actual_ghi =
+         attenuation * ghi). If None (default), no attenuation is applied. If
+         dhi is not None, this parameter is not taken into account.
+        pressure: the site pressure (Pa) (for disc and dirint models), a
+         scalar or an array with one value per date
+        temp_dew: the dew point temperature (dirint model), a scalar or an
+         array with one value per date
+        longitude: (float) in degrees
+        latitude: (float) in degrees
+        altitude: (float) in meter
+        timezone:(str) the time zone (not used if dates are already localised)
+        model: (str) the decomposition model (see decomposition.decompose)
+        filter_night (bool) : Should night dates be filtered ? If False,
+         irradiances are 0 and indices are nan at night.
+        chunk_size: (int) the number of dates per block
+        threads: (int) the number of threads. If None, the number of cpus is
+         used.
+
+    Returns:
+        a pandas dataframe with azimuth, zenital and elevation angle of the sun,
+        clearness and brightness indices, global horizontal irradiance, direct
+        normal irradiance and diffuse horizontal irradiance of the sky.
+    """
+    dates = _localised(dates, daydate, timezone)
+    columns = ['azimuth', 'zenith', 'elevation', 'clearness', 'brightness',
+               'ghi', 'dni', 'dhi']
+    arrays = {'ghi': ghi, 'dhi': dhi}
+    kwds = {}
+    for k, v in (('pressure', pressure), ('temp_dew', temp_dew)):
+        if numpy.ndim(v) > 0:
+            arrays[k] = v
+        else:
+            kwds[k] = v
+    res = evaluate_chunked(sky_irradiances_raw, dates.asi8, columns,
+                           arrays=arrays, chunk_size=chunk_size,
+                           threads=threads, overlap=not is_pointwise(model),
+                           attenuation=attenuation, longitude=longitude,
+                           latitude=latitude, altitude=altitude, model=model,
+                           filter_night=False, **kwds)
+    if filter_night:
+        day = res['elevation'] > 0
+        res = dict((k, v[day]) for k, v in res.items())
+        dates = dates[day]
+    return pandas.DataFrame(res, index=dates, columns=columns)
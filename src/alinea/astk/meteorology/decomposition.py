@@ -0,0 +1,280 @@
+# -*- python -*-
+#
+#       Copyright 2016 INRIA - CIRAD - INRA
+#
+#       Distributed under the Cecill-C License.
+#       See accompanying file LICENSE.txt or copy at
+#           http://www.cecill.info/licences/Licence_CeCILL-C_V1-en.html
+#
+#       WebSite : https://github.com/openalea-incubator/astk
+#
+#       File author(s): Christian Fournier <Christian.Fournier@supagro.inra.fr>
+#
+# ==============================================================================
+
+""" Decomposition of global horizontal irradiance (GHI) into direct normal
+irradiance (DNI) and diffuse horizontal irradiance (DHI)
+
+Models are pure numpy kernels sharing the same signature:
+model(ghi, zenith, dni_extra, **kwds) -> (dni, dhi), with array-like ghi (W.m-2),
+sun zenith (degrees) and extraterrestrial radiation (W.m-2). They are selected
+by name with decompose.
+"""
+
+import numpy
+
+from alinea.astk.data_access import get_path
+
+_dirint_coefficients = {}
+
+
+def clearness_index(ghi, zenith, dni_extra, min_cos_zenith=0.065,
+                    max_clearness_index=1):
+    """ Ratio of global to extraterrestrial irradiance on an horizontal plane
+
+    Args:
+        ghi: (array-like) global horizontal irradiance (W.m-2)
+        zenith: (array-like) sun zenith (degrees)
+        dni_extra: (array-like) extraterrestrial radiation (W.m-2)
+        min_cos_zenith: (float) minimal cosine of zenith used in the ratio
+        max_clearness_index: (float) maximal value of the index
+    """
+    cosz = numpy.maximum(numpy.cos(numpy.radians(zenith)), min_cos_zenith)
+    return numpy.clip(ghi / (dni_extra * cosz), 0, max_clearness_index)
+
+
+def relative_air_mass(zenith):
+    """ Relative optical air mass (Kasten 1966), nan below the horizon"""
+    z = numpy.where(zenith > 90, numpy.nan, zenith)
+    return 1.0 / (numpy.cos(numpy.radians(z)) + 0.15 * (93.885 - z) ** -1.253)
+
+
+def _from_diffuse_fraction(ghi, zenith, fraction, max_zenith=None):
+    """ dni and dhi from the diffuse fraction of ghi"""
+    dhi = fraction * ghi
+    dni = (ghi - dhi) / numpy.cos(numpy.radians(zenith))
+    if max_zenith is not None:
+        bad_values = (zenith > max_zenith) | (ghi < 0) | (dni < 0)
+        dni = numpy.where(bad_values, 0, dni)
+        dhi = numpy.where(bad_values, ghi, dhi)
+    return dni, dhi
+
+
+def spitters(ghi, zenith, dni_extra, **kwds):
+    """ Spitters hourly decomposition model
+
+    Details:
+        Spitters CJT, Toussaint HAJM, Goudriaan J (1986) Separating the diffuse
+        and direct component of global radiation and its implications for
+        modeling canopy photosynthesis.Part I.
+        Components of incoming radiation.
+        Agricultural and Forest Meteorology 38: 217-229.
+    """
+    ghi = numpy.asarray(ghi, dtype=float)
+    costheta = numpy.cos(numpy.radians(zenith))
+    RsRso = ghi / (dni_extra * costheta)
+    R = 0.847 - 1.61 * costheta + 1.04 * costheta * costheta
+    K = (1.47 - R) / 1.66
+    fraction = numpy.where(RsRso <= 0.22, 1,
+                           numpy.where(RsRso <= 0.35,
+                                       1 - 6.4 * (RsRso - 0.22) ** 2,
+                                       numpy.where(RsRso <= K,
+                                                   1.47 - 1.66 * RsRso,
+                                                   R)))
+    return _from_diffuse_fraction(ghi, zenith, fraction)
+
+
+def erbs(ghi, zenith, dni_extra, min_cos_zenith=0.065, max_zenith=87,
+         **kwds):
+    """ Erbs decomposition model
+
+    Details:
+        D. G. Erbs, S. A. Klein and J. A. Duffie, Estimation of the
+        diffuse radiation fraction for hourly, daily and monthly-average
+        global radiation, Solar Energy 28(4), pp 293-302, 1982. Eq. 1
+    """
+    ghi = numpy.asarray(ghi, dtype=float)
+    kt = clearness_index(ghi, zenith, dni_extra, min_cos_zenith)
+    fraction = numpy.where(kt <= 0.22, 1 - 0.09 * kt,
+                           numpy.where(kt <= 0.8,
+                                       0.9511 - 0.1604 * kt + 4.388 * kt ** 2 -
+                                       16.638 * kt ** 3 + 12.336 * kt ** 4,
+                                       0.165))
+    return _from_diffuse_fraction(ghi, zenith, fraction, max_zenith)
+
+
+def orgill_hollands(ghi, zenith, dni_extra, min_cos_zenith=0.065,
+                    max_zenith=87, **kwds):
+    """ Orgill and Hollands decomposition model
+
+    Details:
+        J. F. Orgill and K. G. T. Hollands, Correlation equation for hourly
+        diffuse radiation on a horizontal surface, Solar Energy 19(4),
+        pp 357-359, 1977
+    """
+    ghi = numpy.asarray(ghi, dtype=float)
+    kt = clearness_index(ghi, zenith, dni_extra, min_cos_zenith)
+    fraction = numpy.where(kt < 0.35, 1 - 0.249 * kt,
+                           numpy.where(kt <= 0.75, 1.557 - 1.84 * kt, 0.177))
+    return _from_diffuse_fraction(ghi, zenith, fraction, max_zenith)
+
+
+def _disc(ghi, zenith, dni_extra, pressure=101325., min_cos_zenith=0.065,
+          max_zenith=87, max_air_mass=12):
+    """ DISC dni, clearness index and air mass"""
+    kt = clearness_index(ghi, zenith, dni_extra, min_cos_zenith)
+    am = relative_air_mass(zenith)
+    if pressure is not None:
+        am = am * pressure / 101325.
+    am = numpy.minimum(am, max_air_mass)
+    kt2 = kt * kt
+    kt3 = kt2 * kt
+    low = kt <= 0.6
+    a = numpy.where(low, 0.512 - 1.56 * kt + 2.286 * kt2 - 2.222 * kt3,
+                    -5.743 + 21.77 * kt - 27.49 * kt2 + 11.56 * kt3)
+    b = numpy.where(low, 0.37 + 0.962 * kt,
+                    41.4 - 118.5 * kt + 66.05 * kt2 + 31.9 * kt3)
+    c = numpy.where(low, -0.28 + 0.932 * kt - 2.048 * kt2,
+                    -47.01 + 184.2 * kt - 222.0 * kt2 + 73.81 * kt3)
+    knc = 0.866 - 0.122 * am + 0.0121 * am ** 2 - 0.000653 * am ** 3 + \
+        1.4e-05 * am ** 4
+    dni = (knc - a - b * numpy.exp(c * am)) * dni_extra
+    with numpy.errstate(invalid='ignore'):
+        bad_values = (zenith > max_zenith) | (ghi < 0) | (dni < 0)
+    return numpy.where(bad_values, 0, dni), kt, am
+
+
+def disc(ghi, zenith, dni_extra, pressure=101325., min_cos_zenith=0.065,
+         max_zenith=87, max_air_mass=12, **kwds):
+    """ DISC decomposition model
+
+    Reference implementations use extraterrestrial radiation computed with
+    a solar constant of 1370 W.m-2. If pressure is None, relative air mass is
+    used instead of absolute air mass.
+
+    Details:
+        Maxwell, E. L., "A Quasi-Physical Model for Converting Hourly
+        Global Horizontal to Direct Normal Insolation", Technical
+        Report No. SERI/TR-215-3087, Golden, CO: Solar Energy Research
+        Institute, 1987.
+    """
+    ghi = numpy.asarray(ghi, dtype=float)
+    dni, _, _ = _disc(ghi, zenith, dni_extra, pressure, min_cos_zenith,
+                      max_zenith, max_air_mass)
+    return dni, ghi - dni * numpy.cos(numpy.radians(zenith))
+
+
+def dirint_coefficients():
+    """ DIRINT coefficients, as a (kt_prime, zenith, delta_kt_prime, w) bins
+    array"""
+    if 'table' not in _dirint_coefficients:
+        table = numpy.loadtxt(get_path('dirint_coefficients.txt'))
+        _dirint_coefficients['table'] = table.reshape(6, 6, 7, 5)
+    return _dirint_coefficients['table']
+
+
+def _bins(x, edges, closed=True):
+    """ 1-based bin numbers of x (0 outside edges). The last bin includes its
+    upper edge if closed"""
+    x = numpy.asarray(x, dtype=float)
+    bins = numpy.digitize(x, edges)
+    if closed:
+        bins = numpy.where(x == edges[-1], len(edges) - 1, bins)
+    return numpy.where(numpy.isnan(x) | (bins >= len(edges)), 0, bins)
+
+
+def dirint(ghi, zenith, dni_extra, pressure=101325., temp_dew=None,
+           use_delta_kt_prime=True, min_cos_zenith=0.065, max_zenith=87,
+           **kwds):
+    """ DIRINT decomposition model
+
+    DISC model corrected as a function of the stability of clearness index
+    between successive time steps (if use_delta_kt_prime) and of dew point
+    temperature (if temp_dew is given). Reference implementations use
+    extraterrestrial radiation computed with a solar constant of 1370 W.m-2.
+
+    Details:
+        Perez, R., P. Ineichen, E. Maxwell, R. Seals and A. Zelenka, (1992).
+        Dynamic Global-to-Direct Irradiance Conversion Models.
+        ASHRAE Transactions-Research Series, pp. 354-369
+    """
+    ghi = numpy.asarray(ghi, dtype=float)
+    zenith = numpy.asarray(zenith, dtype=float)
+    dni, kt, am = _disc(ghi, zenith, dni_extra, pressure, min_cos_zenith,
+                        max_zenith)
+    kt_prime = numpy.clip(
+        kt / (1.031 * numpy.exp(-1.4 / (0.9 + 9.4 / am)) + 0.1), 0, 1)
+
+    if use_delta_kt_prime:
+        if kt_prime.size > 1:
+            previous = numpy.concatenate((kt_prime[1:2], kt_prime[:-1]))
+            following = numpy.concatenate((kt_prime[1:], kt_prime[-2:-1]))
+            # a missing neighbour (eg at night) counts for zero
+            to_following = numpy.abs(kt_prime - following)
+            to_previous = numpy.abs(kt_prime - previous)
+            delta_kt_prime = 0.5 * numpy.where(
+                numpy.isnan(to_following), to_previous,
+                numpy.where(numpy.isnan(to_previous), to_following,
+                            to_following + to_previous))
+        else:
+            delta_kt_prime = numpy.full(kt_prime.shape, numpy.nan)
+        delta_bin = _bins(delta_kt_prime,
+                          [0, 0.015, 0.035, 0.07, 0.15, 0.3, 1])
+    else:
+        delta_bin = numpy.full(kt_prime.shape, 7)
+    if temp_dew is not None:
+        w = numpy.exp(0.07 * numpy.asarray(temp_dew, dtype=float) - 0.075)
+        w_bin = _bins(w, [0, 1, 2, 3, numpy.inf], closed=False)
+    else:
+        w_bin = numpy.full(kt_prime.shape, 5)
+    kt_bin = _bins(kt_prime, [0, 0.24, 0.4, 0.56, 0.7, 0.8, 1])
+    zenith_bin = _bins(zenith, [0, 25, 40, 55, 70, 80, numpy.inf],
+                       closed=False)
+
+    coefficients = dirint_coefficients()[kt_bin - 1, zenith_bin - 1,
+                                         delta_bin - 1, w_bin - 1]
+    unassigned = (kt_bin == 0) | (zenith_bin == 0) | (delta_bin == 0) | (
+        w_bin == 0)
+    dni = dni * numpy.where(unassigned, numpy.nan, coefficients)
+    return dni, ghi - dni * numpy.cos(numpy.radians(zenith))
+
+
+def solar_constant(model):
+    """ solar constant (W.m-2) used by the reference implementation of a
+    model for computing extraterrestrial radiation"""
+    return 1370. if model in ('disc', 'dirint') else 1366.1
+
+
+decomposition_models = {'spitters': spitters, 'erbs': erbs,
+                        'orgill_hollands': orgill_hollands, 'disc': disc,
+                        'dirint': dirint}
+
+# models using the neighbouring time steps of the series
+time_series_models = ('dirint',)
+
+
+def is_pointwise(model):
+    """ is the decomposition at a time step independent of the other time
+    steps of the series ?"""
+    return model not in time_series_models
+
+
+def decompose(ghi, zenith, dni_extra, model='spitters', **kwds):
+    """ Estimate direct normal and diffuse horizontal irradiance from global
+    horizontal irradiance
+
+    Args:
+        ghi: (array-like) global horizontal irradiance (W.m-2)
+        zenith: (array-like) sun zenith (degrees)
+        dni_extra: (array-like) extraterrestrial radiation (W.m-2)
+        model: (str) one of 'spitters', 'erbs', 'orgill_hollands', 'disc' or
+         'dirint'
+        **kwds: extra arguments passed to the model (eg pressure, temp_dew,
+         use_delta_kt_prime)
+
+    Returns:
+        direct normal irradiance and diffuse horizontal irradiance arrays
+    """
+    if model not in decomposition_models:
+        raise ValueError('unknown decomposition model: ' + model)
+    return decomposition_models[model](ghi, zenith, dni_extra, **kwds)
@@ -0,0 +1,204 @@
+# -*- python -*-
+#
+#       Copyright 2016 INRIA - CIRAD - INRA
+#
+#       Distributed under the Cecill-C License.
+#       See accompanying file LICENSE.txt or copy at
+#           http://www.cecill.info/licences/Licence_CeCILL-C_V1-en.html
+#
+#       WebSite : https://github.com/openalea-incubator/astk
+#
+#       File author(s): Christian Fournier <Christian.Fournier@supagro.inra.fr>
+#
+# ==============================================================================
+
+""" Opt-in bounded LRU memoization of sky irradiance functions
+
+Memoized functions are called normally until caching is enabled with
+enable_cache. Results are keyed by a hash of the (localised) date index and
+of the other arguments. Functions flagged as pointwise (each output row only
+depends on its own date, possibly for some arguments only) can also serve a
+sub-range of dates from a cached result covering them, provided no array-like
+argument (eg ghi, dhi) is given.
+"""
+
+import collections
+import functools
+import hashlib
+import inspect
+
+import numpy
+import pandas
+
+CacheInfo = collections.namedtuple('CacheInfo',
+                                   ['hits', 'subrange_hits', 'misses',
+                                    'maxsize', 'currsize'])
+
+_settings = {'enabled': False, 'maxsize': 128}
+_caches = {}
+
+
+class LRUCache(object):
+    """ A bounded least-recently-used store of pandas results"""
+
+    def __init__(self, pointwise=False):
+        self.pointwise = pointwise
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.subrange_hits = 0
+        self.misses = 0
+
+    def get(self, key, ns, subrange=False):
+        """ cached result for key, or None
+
+        Args:
+            key: a (parameters, dates) key
+            ns: (array) the dates requested (UTC ns)
+            subrange: (bool) should results of longer date ranges with same
+             parameters be searched ?
+        """
+        if key in self.entries:
+            result = self.entries.pop(key)
+            self.entries[key] = result
+            self.hits += 1
+            return result[1]
+        if subrange and len(ns) > 0:
+            lo, hi = ns.min(), ns.max()
+            for k in reversed(self.entries):
+                if k[0] != key[0]:
+                    continue
+                cached_ns, result = self.entries[k]
+                if len(cached_ns) < 1 or cached_ns[0] > lo or \
+                                cached_ns[-1] < hi:
+                    continue
+                if numpy.in1d(ns, cached_ns).all():
+                    self.entries[k] = self.entries.pop(k)
+                    self.subrange_hits += 1
+                    return result.loc[numpy.in1d(result.index.asi8, ns)]
+        self.misses += 1
+        return None
+
+    def put(self, key, ns, result, maxsize):
+        self.entries[key] = (numpy.sort(ns), result)
+        while len(self.entries) > maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.subrange_hits = self.misses = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.subrange_hits, self.misses,
+                         _settings['maxsize'], len(self.entries))
+
+
+def _dates(args):
+    """ localised date index of the call"""
+    dates = args.get('dates')
+    if dates is None:
+        dates = pandas.date_range(args['daydate'], periods=24, freq='H')
+    if dates.tz is None:
+        dates = dates.tz_localize(args['timezone'])
+    return dates
+
+
+def _array_key(values):
+    """ a hashable key of an array, identifying its content with a sha1
+    digest (hash collisions would silently return another input's results)"""
+    values = numpy.ascontiguousarray(values)
+    return values.dtype.str, values.shape, hashlib.sha1(values).hexdigest()
+
+
+def _key(value):
+    """ hashable key of an argument (TypeError is raised if it can not be
+    hashed)"""
+    if isinstance(value, pandas.Series):
+        return ('series', _array_key(value.index.asi8),
+                _array_key(value.values))
+    if isinstance(value, (numpy.ndarray, list, tuple)):
+        return ('array', _array_key(value))
+    hash(value)
+    return value
+
+
+def memoized(pointwise=False):
+    """ Decorator making a sky irradiance function memoizable
+
+    Args:
+        pointwise: (bool) is each output row only dependent on its own date ?
+         If True, sub-ranges of cached dates are served from the cache. A
+         function of the dict of call arguments returning a bool can also be
+         given, for functions that are pointwise for some arguments only.
+    """
+
+    def decorator(func):
+        cache = LRUCache(pointwise)
+        _caches[func.__module__ + '.' + func.__name__] = cache
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwds):
+            if not _settings['enabled']:
+                return func(*args, **kwds)
+            call = inspect.getcallargs(func, *args, **kwds)
+            dates = _dates(call)
+            try:
+                params = tuple((name, _key(call[name])) for name in
+                               sorted(call) if name not in (
+                                   'dates', 'daydate', 'timezone'))
+            except TypeError:
+                return func(*args, **kwds)
+            scalar = not any(isinstance(k, tuple) and k[0] in (
+                'array', 'series') for _, k in params)
+            params += (str(dates.tz),)
+            ns = dates.asi8
+            key = (params, _array_key(ns))
+            if callable(pointwise):
+                subrange = scalar and pointwise(call)
+            else:
+                subrange = scalar and pointwise
+            result = cache.get(key, ns, subrange=subrange)
+            if result is None:
+                call['dates'] = dates
+                result = func(**call)
+                cache.put(key, ns, result, _settings['maxsize'])
+            return result.copy()
+
+        wrapper.cache_info = cache.info
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
+
+
+def enable_cache(maxsize=128):
+    """ Enable memoization of sky irradiance functions
+
+    Args:
+        maxsize: (int) maximal number of results kept per function
+    """
+    _settings['enabled'] = True
+    _settings['maxsize'] = maxsize
+    for cache in _caches.values():
+        while len(cache.entries) > maxsize:
+            cache.entries.popitem(last=False)
+
+
+def disable_cache():
+    """ Disable memoization and free cached results"""
+    _settings['enabled'] = False
+    clear_cache()
+
+
+def clear_cache():
+    """ Free cached results and reset statistics"""
+    for cache in _caches.values():
+        cache.clear()
+
+
+def cache_info():
+    """ hits/misses statistics of memoized functions
+
+    Returns:
+        a dict of CacheInfo namedtuples indexed by function names
+    """
+    return dict((name, cache.info()) for name, cache in _caches.items())
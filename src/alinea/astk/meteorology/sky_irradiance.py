@@ -19,18 +19,20 @@ condition or estimate them from meteorological data
 This module is mainly a collection of syntactic sugar to pvlib clearsky and
 irradiances packages.
 """
+import calendar
+
 import numpy
 import pandas
+from alinea.astk.lazy_import import lazy_import
+from alinea.astk.meteorology.decomposition import decompose, solar_constant
+from alinea.astk.meteorology.memoize import memoized
 from alinea.astk.meteorology.sun_position import sun_position, \
     sun_extraradiation
 
-try:
-    import pvlib
-except ImportError as e:
-    raise ImportError(
-        '{0}\npvlib not found on your system, you may use sun_position_astk '
-        'instead OR install ephem and use sun_position_ephem OR install pvlib '
-        '(recommended)'.format(e))
+_pvlib_message = ('pvlib not found on your system, you may use '
+                  'sun_position_astk instead OR install ephem and use '
+                  'sun_position_ephem OR install pvlib (recommended)')
+pvlib = lazy_import('pvlib', _pvlib_message)
 
 # default location and dates
 _daydate = '2000-06-21'
@@ -39,6 +41,22 @@ _longitude = 3.52
 _latitude = 43.36
 _altitude = 56
 
+# monthly Linke turbidities of sites, read once per process
+_linke_turbidities = {}
+
+
+def _month_middles(leap):
+    """ day of year of the middle of months, padded with December of the
+    previous year and January of the next year"""
+    mdays = numpy.array(calendar.mdays[1:], dtype=float)
+    if leap:
+        mdays[1] += 1
+    middles = numpy.cumsum(mdays) - mdays / 2.
+    return numpy.concatenate([[-15.5], middles, [mdays.sum() + 15.5]])
+
+
+_middles = {False: _month_middles(False), True: _month_middles(True)}
+
 
 def horizontal_irradiance(normal_irradiance, elevation):
     """ irradiance measured on an horizontal surface from a source
@@ -97,6 +115,60 @@ def brightness(air_mass, dhi, dni_extra):
     return air_mass * dhi / dni_extra
 
 
+def monthly_linke_turbidity(latitude=_latitude, longitude=_longitude,
+                            filepath=None):
+    """ Monthly Linke turbidity of a site, from pvlib climatology
+
+    The pvlib data file is read only once per site and process.
+
+    Args:
+        latitude: (float) in degrees
+        longitude: (float) in degrees
+        filepath: (str) path to the turbidity data file. If None (default),
+         the file supplied with pvlib is used.
+
+    Returns:
+        an array of the 12 monthly Linke turbidities
+    """
+    key = (latitude, longitude, filepath)
+    if key not in _linke_turbidities:
+        months = pandas.date_range('2001-01-01', periods=12, freq='MS')
+        lts = pvlib.clearsky.lookup_linke_turbidity(months, latitude,
+                                                    longitude,
+                                                    filepath=filepath,
+                                                    interp_turbidity=False)
+        _linke_turbidities[key] = numpy.asarray(lts, dtype=float)
+    return _linke_turbidities[key]
+
+
+def linke_turbidity(dates, latitude=_latitude, longitude=_longitude,
+                    filepath=None):
+    """ Linke turbidity of a site interpolated at dates
+
+    Monthly values are attributed to the middle of months and linearly
+    interpolated to the day of year, as pvlib.clearsky.lookup_linke_turbidity
+    does, but from cached monthly values (see monthly_linke_turbidity)
+
+    Args:
+        dates: A pandas datetime index
+        latitude: (float) in degrees
+        longitude: (float) in degrees
+        filepath: (str) path to the turbidity data file. If None (default),
+         the file supplied with pvlib is used.
+
+    Returns:
+        a pandas series of Linke turbidity indexed by dates
+    """
+    lts = monthly_linke_turbidity(latitude, longitude, filepath)
+    lts = numpy.concatenate([lts[-1:], lts, lts[:1]])
+    dayofyear = numpy.asarray(dates.dayofyear)
+    leap = numpy.asarray(dates.is_leap_year)
+    tl = numpy.where(leap, numpy.interp(dayofyear, _middles[True], lts),
+                     numpy.interp(dayofyear, _middles[False], lts))
+    return pandas.Series(tl, index=dates)
+
+
+@memoized(pointwise=True)
 def clear_sky_irradiances(dates=None, daydate=_daydate, longitude=_longitude,
                           latitude=_latitude, altitude=_altitude,
                           timezone=_timezone):
@@ -125,8 +197,7 @@ def clear_sky_irradiances(dates=None, daydate=_daydate, longitude=_longitude,
                       longitude=longitude, altitude=altitude,
                       timezone=timezone)
 
-    tl = pvlib.clearsky.lookup_linke_turbidity(df.index, latitude,
-                                               longitude)
+    tl = linke_turbidity(df.index, latitude, longitude)
     am = air_mass(df['zenith'], altitude)
     dni_extra = sun_extraradiation(df.index)
     clearsky = pvlib.clearsky.ineichen(df['zenith'], am, tl,
@@ -137,11 +208,12 @@ def clear_sky_irradiances(dates=None, daydate=_daydate, longitude=_longitude,
     return clearsky.loc[:, ['ghi', 'dni', 'dhi']]
 
 
+@memoized(pointwise=False)
 def actual_sky_irradiances(dates=None, daydate=_daydate, ghi=None,
                            attenuation=None,
                            pressure=101325, temp_dew=None, longitude=_longitude,
                            latitude=_latitude, altitude=_altitude,
-                           timezone=_timezone):
+                           timezone=_timezone, model='dirint'):
     """ Estimate component of sky irradiances from measured actual global
     horizontal irradiance or attenuated clearsky conditions.
 
@@ -153,12 +225,14 @@ def actual_sky_irradiances(dates=None, daydate=_daydate, ghi=None,
          (default) clear_sky irradiance are used
         attenuation: (float) a attenuation factor for ghi (actual_ghi =
          attenuation * ghi). If None (default), no attenuation is applied
-        pressure: the site pressure (Pa) (for dirint model)
+        pressure: the site pressure (Pa) (for disc and dirint models)
         temp_dew: the dew point temperature (dirint model)
         longitude: (float) in degrees
         latitude: (float) in degrees
         altitude: (float) in meter
         timezone:(str) the time zone (not used if dates are already localised)
+        model: (str) the decomposition model (see decomposition.decompose).
+         Default is dirint model.
 
     Returns:
         a pandas dataframe with global horizontal irradiance, direct normal
@@ -185,18 +259,23 @@ def actual_sky_irradiances(dates=None, daydate=_daydate, ghi=None,
     if attenuation is not None:
         df.ghi *= attenuation
 
-    df['dni'] = pvlib.irradiance.dirint(df.ghi, 90 - df.elevation, df.index,
-                                        pressure=pressure, temp_dew=temp_dew)
-    df['dhi'] = df.ghi - horizontal_irradiance(df.dni, df.elevation)
+    dni_extra = sun_extraradiation(df.index,
+                                   solar_constant=solar_constant(model))
+    dni, dhi = decompose(df.ghi.values, 90 - df.elevation.values,
+                         numpy.asarray(dni_extra), model=model,
+                         pressure=pressure, temp_dew=temp_dew)
+    df['dni'] = pandas.Series(dni, index=df.index)
+    df['dhi'] = pandas.Series(dhi, index=df.index)
 
     return df.loc[:, ('ghi', 'dhi', 'dni')]
 
 
+@memoized(pointwise=False)
 def sky_irradiances(dates=None, daydate=_daydate, ghi=None, dhi=None,
                            attenuation=None,
                            pressure=101325, temp_dew=None, longitude=_longitude,
                            latitude=_latitude, altitude=_altitude,
-                           timezone=_timezone):
+                           timezone=_timezone, model='dirint'):
     """ Estimate variables related to sky irradiance.
 
     Args:
@@ -209,12 +288,13 @@ def sky_irradiances(dates=None, daydate=_daydate, ghi=None, dhi=None,
         attenuation: (float) a attenuation factor for ghi (actual_ghi =
          attenuation * ghi). If None (default), no attenuation is applied. If
          dhi is not None, this parameter is not taken into account.
-        pressure: the site pressure (Pa) (for dirint model)
+        pressure: the site pressure (Pa) (for disc and dirint models)
         temp_dew: the dew point temperature (dirint model)
         longitude: (float) in degrees
         latitude: (float) in degrees
         altitude: (float) in meter
         timezone:(str) the time zone (not used if dates are already localised)
+        model: (str) the decomposition model (see decomposition.decompose)
 
     Returns:
         a pandas dataframe with azimuth, zenital and elevation angle of the sun,
@@ -231,7 +311,7 @@ def sky_irradiances(dates=None, daydate=_daydate, ghi=None, dhi=None,
                                      attenuation=attenuation, pressure=pressure,
                                      temp_dew=temp_dew, latitude=latitude,
                                      longitude=longitude, altitude=altitude,
-                                     timezone=timezone)
+                                     timezone=timezone, model=model)
         df = pandas.concat([df, irr], axis=1)
     else:
         df['ghi'] = ghi
@@ -21,8 +21,12 @@ sky_irradiance module
 
 import numpy
 import pandas
+from alinea.astk.meteorology.decomposition import decompose, \
+    solar_constant, is_pointwise
+from alinea.astk.meteorology.memoize import memoized
 from alinea.astk.meteorology.sun_position_astk import sun_position, \
-    sun_extraradiation, sinel_integral
+    sun_extraradiation, sinel_integral, sun_position_sites, sun_position_raw, \
+    sun_extraradiation_raw, daylength, declination, hour_angle, _utc_terms
 
 # default location and dates
 _daydate = '2000-06-21'
@@ -98,6 +102,7 @@ def f_clear(clearness_index):
     return min(1, (clearness_index - 1) / (1.41 - 1))
 
 
+@memoized(pointwise=True)
 def clear_sky_irradiances(dates=None, daydate=_daydate, longitude=_longitude,
                           latitude=_latitude, altitude=_altitude,
                           timezone=_timezone):
@@ -141,11 +146,12 @@ def clear_sky_irradiances(dates=None, daydate=_daydate, longitude=_longitude,
     return clearsky.loc[:, ['ghi', 'dni', 'dhi']]
 
 
+@memoized(pointwise=lambda call: is_pointwise(call['model']))
 def actual_sky_irradiances(dates=None, daydate=_daydate, ghi=None,
                            attenuation=None,
                            pressure=101325, temp_dew=None, longitude=_longitude,
                            latitude=_latitude, altitude=_altitude,
-                           timezone=_timezone):
+                           timezone=_timezone, model='spitters'):
     """ Estimate component of sky irradiances from measured actual global
     horizontal irradiance or attenuated clearsky conditions.
 
@@ -157,12 +163,14 @@ def actual_sky_irradiances(dates=None, daydate=_daydate, ghi=None,
          (default) clear_sky irradiance are used
         attenuation: (float) a attenuation factor for ghi (actual_ghi =
          attenuation * ghi). If None (default), no attenuation is applied
-        pressure: the site pressure (Pa) (for dirint model)
+        pressure: the site pressure (Pa) (for disc and dirint models)
         temp_dew: the dew point temperature (dirint model)
         longitude: (float) in degrees
         latitude: (float) in degrees
         altitude: (float) in meter
         timezone:(str) the time zone (not used if dates are already localised)
+        model: (str) the decomposition model (see decomposition.decompose).
+         Default is Spitters model.
 
     Returns:
         a pandas dataframe with global horizontal irradiance, direct normal
@@ -191,29 +199,23 @@ def actual_sky_irradiances(dates=None, daydate=_daydate, ghi=None,
     if attenuation is not None:
         df.ghi *= attenuation
 
-    Io = sun_extraradiation(df.index)
-    costheta = numpy.sin(numpy.radians(df.elevation))
-    So = Io * costheta
-    RsRso = df.ghi / So
-    R = 0.847 - 1.61 * costheta + 1.04 * costheta * costheta
-    K = (1.47 - R) / 1.66
-    RdRs = numpy.where(RsRso <= 0.22, 1,
-                       numpy.where(RsRso <= 0.35,
-                                   1 - 6.4 * (RsRso - 0.22) ** 2,
-                                   numpy.where(RsRso <= K,
-                                               1.47 - 1.66 * RsRso,
-                                               R)))
-    df['dhi'] = df.ghi * RdRs
-    df['dni'] = normal_irradiance(df['ghi'] - df['dhi'], df['elevation'])
+    dni_extra = sun_extraradiation(df.index,
+                                   solar_constant=solar_constant(model))
+    dni, dhi = decompose(df.ghi.values, df.zenith.values,
+                         numpy.asarray(dni_extra), model=model,
+                         pressure=pressure, temp_dew=temp_dew)
+    df['dni'] = pandas.Series(dni, index=df.index)
+    df['dhi'] = pandas.Series(dhi, index=df.index)
 
     return df.loc[:,('ghi', 'dhi', 'dni')]
 
 
+@memoized(pointwise=lambda call: is_pointwise(call['model']))
 def sky_irradiances(dates=None, daydate=_daydate, ghi=None, dhi=None,
                     attenuation=None,
                     pressure=101325, temp_dew=None, longitude=_longitude,
                     latitude=_latitude, altitude=_altitude,
-                    timezone=_timezone):
+                    timezone=_timezone, model='spitters'):
     """ Estimate variables related to sky irradiance.
 
     Args:
@@ -226,12 +228,13 @@ def sky_irradiances(dates=None, daydate=_daydate, ghi=None, dhi=None,
         attenuation: (float) a attenuation factor for ghi (actual_ghi =
          attenuation * ghi). If None (default), no attenuation is applied. If
          dhi is not None, this parameter is not taken into account.
-        pressure: the site pressure (Pa) (for dirint model)
+        pressure: the site pressure (Pa) (for disc and dirint models)
         temp_dew: the dew point temperature (dirint model)
         longitude: (float) in degrees
         latitude: (float) in degrees
         altitude: (float) in meter
         timezone:(str) the time zone (not used if dates are already localised)
+        model: (str) the decomposition model (see decomposition.decompose)
 
     Returns:
         a pandas dataframe with azimuth, zenital and elevation angle of the sun,
@@ -253,13 +256,12 @@ def sky_irradiances(dates=None, daydate=_daydate, ghi=None, dhi=None,
                                      attenuation=attenuation, pressure=pressure,
                                      temp_dew=temp_dew, latitude=latitude,
                                      longitude=longitude, altitude=altitude,
-                                     timezone=timezone)
+                                     timezone=timezone, model=model)
         df = pandas.concat([df, irr], axis=1)
     else:
         df['ghi'] = ghi
         df['dhi'] = dhi
-        df['dni'] = normal_irradiance(numpy.array(ghi) - numpy.array(dhi),
-                                      df.elevation)
+        df['dni'] = normal_irradiance(df['ghi'] - df['dhi'], df.elevation)
 
     am = air_mass(df['zenith'], altitude)
     dni_extra = sun_extraradiation(df.index)
@@ -271,12 +273,298 @@ def sky_irradiances(dates=None, daydate=_daydate, ghi=None, dhi=None,
 
 
 
-def daily_diffuse_fraction(ghi, times, latitude):
-    """ estimate the diffuse fraction using daily averages of global horizontal irradiance"""
+def clear_sky_irradiances_sites(dates=None, daydate=_daydate,
+                                longitude=_longitude, latitude=_latitude,
+                                altitude=_altitude, timezone=_timezone):
+    """ Estimate components of sky irradiance for clear sky conditions at
+    several sites
+
+    Args:
+        dates: A pandas datetime index (as generated by pandas.date_range). If
+            None, daydate is used.
+        daydate: (str) yyyy-mm-dd (not used if dates is not None).
+        longitude: (float or array-like) longitude of sites (degrees)
+        latitude: (float or array-like) latitude of sites (degrees)
+        altitude: (float or array-like) altitude of sites (m)
+        timezone:(str) the time zone (not used if dates are already localised)
+
+    Returns:
+        a dict with localised dates and (n_sites, n_times) arrays of global
+        horizontal irradiance, direct normal irradiance and diffuse horizontal
+        irradiance (null at night)
+    """
+    sun = sun_position_sites(dates=dates, daydate=daydate, latitude=latitude,
+                             longitude=longitude, altitude=altitude,
+                             timezone=timezone)
+    day = sun['elevation'] > 0
+    cosz = numpy.where(day, numpy.cos(numpy.radians(sun['zenith'])), 1)
+    dni_extra = numpy.asarray(sun_extraradiation(sun['dates']))
+    ghi = numpy.where(day, 1098 * cosz * numpy.exp(-0.057 / cosz), 0)
+    dni = numpy.where(day, dni_extra * numpy.power(
+        0.7, numpy.power(1. / cosz, 0.678)), 0)
+    dhi = ghi - horizontal_irradiance(dni, sun['elevation'])
+
+    return {'dates': sun['dates'], 'ghi': ghi, 'dni': dni, 'dhi': dhi}
+
+
+def _selected(kwds, index):
+    """ scalar arguments and selected items of array arguments"""
+    return dict((k, v if numpy.ndim(v) == 0 else v[index]) for k, v in
+                kwds.items())
+
+
+def actual_sky_irradiances_sites(dates=None, daydate=_daydate, ghi=None,
+                                 attenuation=None, pressure=101325,
+                                 temp_dew=None, longitude=_longitude,
+                                 latitude=_latitude, altitude=_altitude,
+                                 timezone=_timezone, model='spitters'):
+    """ Estimate component of sky irradiances from measured actual global
+    horizontal irradiance or attenuated clearsky conditions at several sites
+
+    Args:
+        dates: A pandas datetime index (as generated by pandas.date_range). If
+            None, daydate is used.
+        daydate: (str) yyyy-mm-dd (not used if dates is not None).
+        ghi: (array_like) : global horizontal irradiance (W. m-2), broadcastable
+         to (n_sites, n_times). If None (default) clear_sky irradiance are used
+        attenuation: (float or array-like) a attenuation factor for ghi
+         (actual_ghi = attenuation * ghi), broadcastable to (n_sites,
+         n_times). If None (default), no attenuation is applied
+        pressure: (float or array-like) the site pressure (Pa) (for disc and
+         dirint models), broadcastable to (n_sites, n_times)
+        temp_dew: (float or array-like) the dew point temperature (dirint
+         model), broadcastable to (n_sites, n_times)
+        longitude: (float or array-like) longitude of sites (degrees)
+        latitude: (float or array-like) latitude of sites (degrees)
+        altitude: (float or array-like) altitude of sites (m)
+        timezone:(str) the time zone (not used if dates are already localised)
+        model: (str) the decomposition model (see decomposition.decompose).
+         The time series dirint correction is evaluated along times.
+
+    Returns:
+        a dict with localised dates and (n_sites, n_times) arrays of global
+        horizontal irradiance, direct normal irradiance and diffuse horizontal
+        irradiance. When the sun is below the horizon, all irradiance is
+        diffuse.
+    """
+    sun = sun_position_sites(dates=dates, daydate=daydate, latitude=latitude,
+                             longitude=longitude, altitude=altitude,
+                             timezone=timezone)
+    if ghi is None:
+        ghi = clear_sky_irradiances_sites(dates=sun['dates'],
+                                          longitude=longitude,
+                                          latitude=latitude,
+                                          altitude=altitude)['ghi']
+    ghi = numpy.array(numpy.broadcast_to(ghi, sun['elevation'].shape),
+                      dtype=float)
+    if attenuation is not None:
+        ghi *= attenuation
+
+    day = sun['elevation'] > 0
+    Io = numpy.asarray(sun_extraradiation(sun['dates'],
+                                          solar_constant=solar_constant(model)))
+    dni = numpy.zeros(ghi.shape)
+    dhi = ghi.copy()
+    kwds = dict((k, v if numpy.ndim(v) == 0 else
+                 numpy.broadcast_to(v, ghi.shape)) for k, v in
+                (('pressure', pressure), ('temp_dew', temp_dew)))
+    if is_pointwise(model):
+        # decompose daylight dates of all sites at once
+        Io = numpy.broadcast_to(Io, ghi.shape)
+        dni[day], dhi[day] = decompose(ghi[day], sun['zenith'][day], Io[day],
+                                       model=model, **_selected(kwds, day))
+    else:
+        # time series models need the series of each site
+        for i in range(ghi.shape[0]):
+            d = day[i]
+            dni[i, d], dhi[i, d] = decompose(
+                ghi[i, d], sun['zenith'][i, d], Io[d], model=model,
+                **_selected(kwds, (i, d)))
+
+    return {'dates': sun['dates'], 'ghi': ghi, 'dni': dni, 'dhi': dhi}
+
+
+def sky_irradiances_sites(dates=None, daydate=_daydate, ghi=None, dhi=None,
+                          attenuation=None, pressure=101325, temp_dew=None,
+                          longitude=_longitude, latitude=_latitude,
+                          altitude=_altitude, timezone=_timezone,
+                          model='spitters'):
+    """ Estimate variables related to sky irradiance at several sites.
+
+    Args:
+        dates: A pandas datetime index (as generated by pandas.date_range). If
+            None, daydate is used.
+        daydate: (str) yyyy-mm-dd (not used if dates is not None).
+        ghi: (array_like) : global horizontal irradiance (W. m-2), broadcastable
+         to (n_sites, n_times). If None (default) clear_sky irradiance are used
+        dhi: (array-like): diffuse horizontal irradiance, broadcastable to
+         (n_sites, n_times)
+        attenuation: (float or array-like) a attenuation factor for ghi
+         (actual_ghi = attenuation * ghi). If None (default), no attenuation
+         is applied. If dhi is not None, this parameter is not taken into
+         account.
+        pressure: the site pressure (Pa) (for disc and dirint models)
+        temp_dew: the dew point temperature (dirint model)
+        longitude: (float or array-like) longitude of sites (degrees)
+        latitude: (float or array-like) latitude of sites (degrees)
+        altitude: (float or array-like) altitude of sites (m)
+        timezone:(str) the time zone (not used if dates are already localised)
+        model: (str) the decomposition model (see decomposition.decompose)
+
+    Returns:
+        a dict with localised dates and (n_sites, n_times) arrays of azimuth,
+        zenital and elevation angle of the sun, clearness and brightness
+        indices (nan at night), global horizontal irradiance, direct normal
+        irradiance and diffuse horizontal irradiance of the sky.
+    """
+    sun = sun_position_sites(dates=dates, daydate=daydate, latitude=latitude,
+                             longitude=longitude, altitude=altitude,
+                             timezone=timezone)
+    day = sun['elevation'] > 0
+    if ghi is None:
+        irr = clear_sky_irradiances_sites(dates=sun['dates'],
+                                          longitude=longitude,
+                                          latitude=latitude,
+                                          altitude=altitude)
+    elif dhi is None:
+        irr = actual_sky_irradiances_sites(dates=sun['dates'], ghi=ghi,
+                                           attenuation=attenuation,
+                                           pressure=pressure,
+                                           temp_dew=temp_dew,
+                                           longitude=longitude,
+                                           latitude=latitude,
+                                           altitude=altitude, model=model)
+    else:
+        shape = sun['elevation'].shape
+        irr = {'ghi': numpy.array(numpy.broadcast_to(ghi, shape), dtype=float),
+               'dhi': numpy.array(numpy.broadcast_to(dhi, shape), dtype=float)}
+        sinel = numpy.where(day, numpy.sin(numpy.radians(sun['elevation'])),
+                            1)
+        irr['dni'] = numpy.where(day, (irr['ghi'] - irr['dhi']) / sinel, 0)
+
+    res = dict(sun)
+    res.update(dict((k, irr[k]) for k in ('ghi', 'dni', 'dhi')))
+    zenith = numpy.where(day, sun['zenith'], numpy.nan)
+    dni_extra = numpy.asarray(sun_extraradiation(sun['dates']))
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        res['brightness'] = brightness(air_mass(zenith), res['dhi'],
+                                       dni_extra)
+        res['clearness'] = clearness(res['dni'], res['dhi'], zenith)
+    return res
+
+
+def clear_sky_irradiances_raw(times, longitude=_longitude, latitude=_latitude,
+                              altitude=_altitude):
+    """ Estimate components of sky irradiance for clear sky conditions at
+    dates given as raw numbers, without pandas overhead
 
-    Io = sun_extraradiation(times)
-    dayofyear = times.tz_convert('UTC').dayofyear
-    year = times.tz_convert('UTC').year
+    Args:
+        times: (array of int64) UTC dates as nanoseconds since epoch (eg
+         DatetimeIndex.asi8)
+        longitude: (float) in degrees
+        latitude: (float) in degrees
+        altitude: (float) in meter
+
+    Returns:
+        a dict of arrays with (daylight) times, sun elevation, zenith and
+        azimuth, global horizontal irradiance, direct normal irradiance and
+        diffuse horizontal irradiance.
+    """
+    sky = sun_position_raw(times, latitude=latitude, longitude=longitude,
+                           altitude=altitude)
+    return _clear_sky_raw(sky, sun_extraradiation_raw(sky['times']))
+
+
+def _clear_sky_raw(sky, dni_extra):
+    """ add clear sky irradiances to a dict of daylight sun positions"""
+    cosz = numpy.cos(numpy.radians(sky['zenith']))
+    sky['ghi'] = 1098 * cosz * numpy.exp(-0.057 / cosz)
+    sky['dni'] = dni_extra * numpy.power(0.7, numpy.power(1. / cosz, 0.678))
+    sky['dhi'] = sky['ghi'] - horizontal_irradiance(sky['dni'],
+                                                    sky['elevation'])
+    return sky
+
+
+def sky_irradiances_raw(times, ghi=None, dhi=None, attenuation=None,
+                        pressure=101325, temp_dew=None, longitude=_longitude,
+                        latitude=_latitude, altitude=_altitude,
+                        model='spitters', filter_night=True):
+    """ Estimate variables related to sky irradiance at dates given as raw
+    numbers, without pandas overhead
+
+    Args:
+        times: (array of int64) UTC dates as nanoseconds since epoch (eg
+         DatetimeIndex.asi8)
+        ghi: (array_like) : global horizontal irradiance (W. m-2) at times.If
+         None (default) clear_sky irradiance are used
+        dhi: (array-like): diffuse horizontal irradiance at times
+        attenuation: (float) a attenuation factor for ghi (actual_ghi =
+         attenuation * ghi). If None (default), no attenuation is applied. If
+         dhi is not None, this parameter is not taken into account.
+        pressure: the site pressure (Pa) (for disc and dirint models), a
+         scalar or an array with one value per time
+        temp_dew: the dew point temperature (dirint model), a scalar or an
+         array with one value per time
+        longitude: (float) in degrees
+        latitude: (float) in degrees
+        altitude: (float) in meter
+        model: (str) the decomposition model (see decomposition.decompose)
+        filter_night (bool) : Should night dates be filtered ? If False,
+         irradiances are 0 and indices are nan at night.
+
+    Returns:
+        a dict of arrays with (daylight) times, azimuth, zenital and elevation
+        angle of the sun, clearness and brightness indices, global horizontal
+        irradiance, direct normal irradiance and diffuse horizontal irradiance
+    """
+    sun = sun_position_raw(times, latitude=latitude, longitude=longitude,
+                           altitude=altitude, filter_night=False)
+    day = sun['elevation'] > 0
+    sky = dict((k, v[day]) for k, v in sun.items())
+    dni_extra = sun_extraradiation_raw(sky['times'])
+    if ghi is None:
+        _clear_sky_raw(sky, dni_extra)
+    else:
+        sky['ghi'] = numpy.asarray(ghi, dtype=float)[day]
+        if dhi is None:
+            if attenuation is not None:
+                sky['ghi'] = sky['ghi'] * attenuation
+            Io = sun_extraradiation_raw(sky['times'],
+                                        solar_constant=solar_constant(model))
+            if numpy.ndim(pressure) > 0:
+                pressure = numpy.asarray(pressure, dtype=float)[day]
+            if numpy.ndim(temp_dew) > 0:
+                temp_dew = numpy.asarray(temp_dew, dtype=float)[day]
+            sky['dni'], sky['dhi'] = decompose(sky['ghi'], sky['zenith'], Io,
+                                               model=model, pressure=pressure,
+                                               temp_dew=temp_dew)
+        else:
+            sky['dhi'] = numpy.asarray(dhi, dtype=float)[day]
+            sky['dni'] = normal_irradiance(sky['ghi'] - sky['dhi'],
+                                           sky['elevation'])
+    am = air_mass(sky['zenith'], altitude)
+    sky['brightness'] = brightness(am, sky['dhi'], dni_extra)
+    sky['clearness'] = clearness(sky['dni'], sky['dhi'], sky['zenith'])
+    if not filter_night:
+        for k, fill in (('ghi', 0), ('dni', 0), ('dhi', 0),
+                        ('brightness', numpy.nan), ('clearness', numpy.nan)):
+            values = numpy.full(len(day), fill, dtype=float)
+            values[day] = sky[k]
+            sun[k] = values
+        return sun
+    return sky
+
+
+def daily_diffuse_fraction(ghi, times, latitude):
+    """ estimate the diffuse fraction using daily integrals of global
+    horizontal irradiance (J.m-2). Days are those of times converted to UTC,
+    or of local calendar days if times are not localised."""
+
+    if times.tz is not None:
+        times = times.tz_convert('UTC')
+    dayofyear = times.dayofyear
+    year = times.year
+    Io = sun_extraradiation(dayofyear=dayofyear)
     So = Io * sinel_integral(dayofyear, year, latitude)
     RsRso = ghi / So
 
@@ -285,23 +573,96 @@ def daily_diffuse_fraction(ghi, times, latitude):
                                numpy.where(RsRso <= 0.75, 1.33 - 1.46 * RsRso,
                                            0.23)))
 
-# def RgH (Rg,hTU,DOY,latitude) :
-# """ compute hourly value of Rg at hour hTU for a given day at a given latitude
-# Rg is in J.m-2.day-1
-# latidude in degrees
-# output is J.m-2.h-1
-# """
-
-# dec = DecliSun(DOY)
-# lat = radians(latitude)
-# pi = 3.14116
-# a = sin(lat) * sin(dec)
-# b = cos(lat) * cos(dec)
-# Psi = numpy.pi * Rg / 86400 / (a * acos(-a / b) + b * sqrt(1 - (a / b)^2))
-# A = -b * Psi
-# B = a * Psi
-# RgH = A * cos (2 * pi * hTU / 24) + B
-# Note that this formula works for h beteween hsunset eand hsunrise
-# hsunrise = 12 - 12/pi * acos(-a / b)
-# hsunset = 12 + 12/pi * acos (-a / b)
-# return RgH
+
+def _sinel_arc(lo, hi, a, b, ws):
+    """ integral of elevation sine between hour angles lo and hi (radians),
+    restricted to the daylight arc [-ws, ws]. Intervals crossing midnight
+    (+/- pi) are wrapped"""
+    arc = 0
+    for shift in (-2 * numpy.pi, 0, 2 * numpy.pi):
+        x0 = numpy.clip(lo + shift, -ws, ws)
+        x1 = numpy.clip(hi + shift, -ws, ws)
+        arc = arc + a * (x1 - x0) + b * (numpy.sin(x1) - numpy.sin(x0))
+    return arc
+
+
+def daily_to_hourly(ghi, days=None, dhi=None, latitude=_latitude,
+                    longitude=_longitude, timezone=_timezone):
+    """ Disaggregate daily global (and diffuse) horizontal irradiation into
+    hourly irradiances
+
+    Hourly global irradiance is proportional to the integral of sun elevation
+    sine over the hour (see sinel_integral for the daily integral), scaled so
+    that daily totals are conserved. Hourly diffuse irradiance is estimated
+    with the daily diffuse fraction.
+
+    Args:
+        ghi: (array-like) daily global horizontal irradiation (J.m-2). If ghi
+         is a pandas.Series, its index is used for days.
+        days: a pandas.DatetimeIndex of days (not used if ghi is a
+         pandas.Series)
+        dhi: (array-like) daily diffuse horizontal irradiation (J.m-2). If None
+         (default), it is estimated with daily_diffuse_fraction.
+        latitude: (float) in degrees
+        longitude: (float) in degrees
+        timezone: a string identifying the timezone to be associated to days
+         if days are not already localised.
+
+    Returns:
+        a pandas dataframe with global and diffuse horizontal irradiances
+        (W.m-2, averaged over the following hour) indexed by hourly localised
+        dates. Irradiances are 0 during polar nights. It can be passed
+        directly to sky_irradiances (ghi and dhi arguments) or Weather
+        pipelines.
+    """
+    if isinstance(ghi, pandas.Series):
+        days = ghi.index
+    if days is None:
+        raise ValueError('days should be given if ghi is not a pandas.Series')
+    days = pandas.DatetimeIndex(days).normalize()
+    if days.tz is None:
+        days = days.tz_localize(timezone)
+    ghi = numpy.asarray(ghi, dtype=float)
+
+    # hourly dates of (possibly 23 or 25 hours) local days
+    naive = days.tz_localize(None)
+    starts = days.asi8
+    ends = (naive + pandas.Timedelta(1, 'D')).tz_localize(days.tz).asi8
+    nhours = ((ends - starts) // 3600000000000).astype(int)
+    day = numpy.repeat(numpy.arange(len(days)), nhours)
+    offset = numpy.arange(len(day)) - numpy.repeat(numpy.cumsum(nhours) -
+                                                   nhours, nhours)
+    times = starts[day] + offset * 3600000000000
+
+    # daily terms at local calendar days
+    dayofyear, year = naive.dayofyear.values, naive.year.values
+    lat = numpy.radians(latitude)
+    dec = declination(12, dayofyear, year)
+    a = numpy.sin(lat) * numpy.sin(dec)
+    b = numpy.cos(lat) * numpy.cos(dec)
+    ws = daylength(dayofyear, year, latitude) * numpy.pi / 24
+    hUTC, hdayofyear, hyear = _utc_terms(times + 1800000000000)
+    ha = hour_angle(hUTC, hdayofyear, hyear, longitude) * numpy.pi / 12
+    arc = _sinel_arc(ha - numpy.pi / 24, ha + numpy.pi / 24, a[day], b[day],
+                     ws[day])
+    # normalise over the hours actually covered by the day (23 or 25 hours
+    # on daylight saving days)
+    total = numpy.bincount(day, weights=arc, minlength=len(days))
+    scale = numpy.where(total > 0, ghi / 3600. / numpy.where(total > 0,
+                                                             total, 1), 0)
+    hourly_ghi = scale[day] * arc
+
+    if dhi is None:
+        # local calendar days, as for the hourly distribution
+        noons = naive + pandas.Timedelta(12, 'h')
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            fraction = daily_diffuse_fraction(ghi, noons, latitude)
+    else:
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            fraction = numpy.asarray(dhi, dtype=float) / ghi
+    fraction = numpy.where(numpy.isfinite(fraction), fraction, 1)
+
+    index = pandas.DatetimeIndex(times).tz_localize('UTC').tz_convert(days.tz)
+    return pandas.DataFrame({'ghi': hourly_ghi,
+                             'dhi': fraction[day] * hourly_ghi},
+                            index=index, columns=['ghi', 'dhi'])
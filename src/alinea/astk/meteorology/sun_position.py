@@ -15,16 +15,17 @@
 
 """ Sun position using pvlib lib
 """
+import numpy
 import pandas
 
-try:
-    from pvlib.solarposition import get_solarposition
-    from pvlib.irradiance import get_extra_radiation
-except ImportError as e:
-    raise ImportError(
-        '{0}\npvlib not found on your system, you may use sun_position_astk '
-        'instead OR install ephem and use sun_position_ephem OR install pvlib '
-        '(recommended)'.format(e))
+from alinea.astk.lazy_import import lazy_import
+from alinea.astk.meteorology.sun_position_astk import daylight
+
+_pvlib_message = ('pvlib not found on your system, you may use '
+                  'sun_position_astk instead OR install ephem and use '
+                  'sun_position_ephem OR install pvlib (recommended)')
+solarposition = lazy_import('pvlib.solarposition', _pvlib_message)
+irradiance = lazy_import('pvlib.irradiance', _pvlib_message)
 
 
 # default location and dates
@@ -65,7 +66,14 @@ def sun_position(dates=None, daydate=_day, latitude=_latitude,
     else:
         times = dates
 
-    df = get_solarposition(times, latitude, longitude, altitude)
+    if filter_night and isinstance(times, pandas.DatetimeIndex):
+        # astronomical prefilter avoids computing night positions
+        times = times[daylight(times, latitude=latitude, longitude=longitude)]
+        if len(times) < 1:
+            return pandas.DataFrame({'elevation': [], 'azimuth': [],
+                                     'zenith': []}, index=times)
+
+    df = solarposition.get_solarposition(times, latitude, longitude, altitude)
     sunpos = pandas.DataFrame(
         {'elevation': df['apparent_elevation'], 'azimuth': df['azimuth'],
          'zenith': df['apparent_zenith']}, index=df.index)
@@ -76,8 +84,31 @@ def sun_position(dates=None, daydate=_day, latitude=_latitude,
     return sunpos
 
 
+_extraradiation_tables = {}
+
+
+def extraradiation_table(solar_constant=1366.1, method='spencer'):
+    """ Extraterrestrial radiation (W.m2) of days of year 1 to 366, for pvlib
+    methods that only depend on day of year ('spencer' and 'asce')
+
+        Tables are computed once per (solar_constant, method) and kept in
+        memory.
+
+        Returns:
+            a (366,) array, with value of day of year n at index n - 1
+    """
+    key = (float(solar_constant), method)
+    if key not in _extraradiation_tables:
+        table = numpy.asarray(irradiance.get_extra_radiation(
+            numpy.arange(1, 367), solar_constant=solar_constant,
+            method=method), dtype=float)
+        table.setflags(write=False)
+        _extraradiation_tables[key] = table
+    return _extraradiation_tables[key]
+
+
 def sun_extraradiation(dates=None, daydate=_day, solar_constant=1366.1,
-                       method='spencer', timezone=_timezone):
+                       method='spencer', timezone=_timezone, dayofyear=None):
     """ Extraterrestrial radiation (W.m2) at the top of the earth atmosphere
 
         Args:
@@ -88,7 +119,16 @@ def sun_extraradiation(dates=None, daydate=_day, solar_constant=1366.1,
             method: one method provided by pvlib
             timezone: a string identifying the timezone to be associated to dates if
              dates is not already localised.
+            dayofyear: (array-like of int) days of year at which output is
+             required ('spencer' and 'asce' methods only). If not None, dates
+             and daydate are not used and an array is returned.
     """
+    if dayofyear is not None:
+        if method not in ('spencer', 'asce'):
+            raise ValueError('unknown day of year method: ' + method)
+        table = extraradiation_table(solar_constant, method)
+        return table[numpy.asarray(dayofyear, dtype=int) - 1]
+
     if dates is None:
         dates = pandas.date_range(daydate, periods=24, freq='H')
 
@@ -97,4 +137,9 @@ def sun_extraradiation(dates=None, daydate=_day, solar_constant=1366.1,
     else:
         times = dates
 
-    return get_extra_radiation(times, solar_constant=solar_constant, method=method)
+    if method in ('spencer', 'asce'):
+        # pvlib uses local day of year
+        table = extraradiation_table(solar_constant, method)
+        return pandas.Series(table[times.dayofyear - 1], index=times)
+    return irradiance.get_extra_radiation(times, solar_constant=solar_constant,
+                                          method=method)
@@ -12,6 +12,17 @@ _latitude = 43.36
 _altitude = 56
 
 
+def _utc_terms(ns):
+    """ fractional hour, day of year and year of UTC dates given as int64
+    nanoseconds since epoch"""
+    d = numpy.asarray(ns, dtype='int64').astype('datetime64[ns]')
+    day = d.astype('datetime64[D]')
+    year = d.astype('datetime64[Y]')
+    hUTC = (d - day).astype('int64') / 3600e9
+    dayofyear = (day - year.astype('datetime64[D]')).astype('int64') + 1
+    return hUTC, dayofyear, year.astype('int64') + 1970
+
+
 def julian_date(hUTC, dayofyear, year):
     """ Julian calendar date
 
@@ -198,14 +209,14 @@ def sun_azimuth(hUTC, dayofyear, year, latitude, longitude):
     dec = declination(hUTC, dayofyear, year)
     lat = numpy.radians(latitude)
     ha = numpy.radians(hour_angle(hUTC, dayofyear, year, longitude) * 15)
-    el = numpy.radians(sun_elevation(hUTC, dayofyear, year, latitude, longitude))
-    sinaz = -numpy.cos(dec) * numpy.sin(ha) / numpy.cos(el)
-    # use method of Michalsky to get az from sinaz
-    elc = numpy.arcsin(numpy.sin(dec) / numpy.sin(lat))
-    az = numpy.degrees(numpy.arcsin(sinaz))
-    az = numpy.where(el >= elc, 180 - az, numpy.where(ha > 0, 360 + az, az))
+    # arctan2 form is valid on both hemispheres and between the tropics,
+    # where Michalsky quadrant rule fails
+    az = numpy.degrees(numpy.arctan2(
+        -numpy.cos(dec) * numpy.sin(ha),
+        numpy.sin(dec) * numpy.cos(lat) - numpy.cos(dec) * numpy.sin(
+            lat) * numpy.cos(ha)))
 
-    return az
+    return numpy.mod(az, 360)
 
 
 def eot(hUTC, dayofyear, year):
@@ -233,12 +244,78 @@ def eot(hUTC, dayofyear, year):
     return (L - ra) / 15.
 
 
-def daylength(dayofyear, year, latitude):
-    """ estimate of daylength"""
+def sun_ephemeris(hUTC, dayofyear, year, latitude, longitude):
+    """ Sun ephemeris computed in a single pass
+
+    Equivalent to calling julian_date, declination, right_ascension,
+    hour_angle, sun_elevation, sun_azimuth and eot, but intermediate
+    quantities are evaluated only once.
+
+    Args:
+        hUTC: fractional hour (UTC time)
+        dayofyear (int):
+        year (int):
+        latitude (float): the location latitude (degrees)
+        longitude (float): the location longitude (degrees)
+
+    Returns:
+        a dict with julian date, declination (radians), right ascension
+        (degrees), hour angle (hour), elevation (degrees), azimuth (degrees,
+        from North, positive clockwise) and equation of time (hour)
+    """
+    jd = julian_date(hUTC, dayofyear, year)
+    n = jd - 2451545
+    # mean longitude and mean anomaly (deg)
+    L = numpy.mod(280.46 + 0.9856474 * n, 360)
+    g = numpy.radians(numpy.mod(357.528 + 0.9856003 * n, 360))
+    l = numpy.radians(L + 1.915 * numpy.sin(g) + 0.02 * numpy.sin(2 * g))
+    obliquity = numpy.radians(23.439 - 0.0000004 * n)
+    cosl = numpy.cos(l)
+    sinl = numpy.sin(l)
+    dec = numpy.arcsin(numpy.sin(obliquity) * sinl)
+    ra = numpy.degrees(numpy.arctan(numpy.cos(obliquity) * sinl / cosl))
+    ra += numpy.where(cosl >= 0, 0, 180)
+    gmst = numpy.mod(6.697375 + 0.0657098242 * n + hUTC, 24)
+    lmst = numpy.mod(gmst + longitude / 15., 24)
+    ha = numpy.mod(lmst - ra / 15. + 12, 24) - 12
+    lat = numpy.radians(latitude)
+    sindec = numpy.sin(dec)
+    cosdec = numpy.cos(dec)
+    rha = numpy.radians(ha * 15)
+    sinlat = numpy.sin(lat)
+    coslat = numpy.cos(lat)
+    cosha = numpy.cos(rha)
+    el = numpy.arcsin(sindec * sinlat + cosdec * coslat * cosha)
+    az = numpy.degrees(numpy.arctan2(-cosdec * numpy.sin(rha),
+                                     sindec * coslat - cosdec * sinlat * cosha))
+    az = numpy.mod(az, 360)
+
+    return {'julian_date': jd, 'declination': dec, 'right_ascension': ra,
+            'hour_angle': ha, 'elevation': numpy.degrees(el), 'azimuth': az,
+            'eot': (L - ra) / 15.}
+
+
+def daylength(dayofyear, year, latitude, elevation=0):
+    """ estimate of daylength
+
+    Args:
+        dayofyear (int):
+        year (int):
+        latitude (float): the location latitude (degrees)
+        elevation (float): the sun elevation (degrees) defining sunrise and
+         sunset (default 0, ie geometric sunrise). Use -0.833 to account
+         for refraction and apparent sun radius.
+
+    Returns:
+        (float) the time (hour) during which sun is above elevation, 0 for
+        polar nights and 24 for polar days
+    """
 
     lat = numpy.radians(latitude)
     dec = declination(12, dayofyear, year)
-    return 12 + 24 / numpy.pi * numpy.arcsin(numpy.tan(lat) - numpy.tan(dec))
+    cosh0 = (numpy.sin(numpy.radians(elevation)) - numpy.sin(lat) * numpy.sin(
+        dec)) / (numpy.cos(lat) * numpy.cos(dec))
+    return 24 / numpy.pi * numpy.arccos(numpy.clip(cosh0, -1, 1))
 
 
 def sinel_integral(dayofyear, year, latitude):
@@ -248,8 +325,105 @@ def sinel_integral(dayofyear, year, latitude):
     dec = declination(12, dayofyear, year)
     d = daylength(dayofyear, year, latitude)
     return 3600 * (d * numpy.sin(lat) * numpy.sin(dec) + 24. /
-                   numpy.pi * numpy.cos(lat) * numpy.cos(dec) * numpy.sqrt(
-                       1 - numpy.tan(lat) ** 2 * numpy.tan(dec) ** 2))
+                   numpy.pi * numpy.cos(lat) * numpy.cos(dec) * numpy.sin(
+                       d * numpy.pi / 24))
+
+
+def sun_times(dates=None, daydate=_day, latitude=_latitude,
+              longitude=_longitude, altitude=_altitude, timezone=_timezone,
+              elevation=0):
+    """ Sunrise, sunset, solar noon and daylength of days
+
+    Args:
+        dates: a pandas.DatetimeIndex. One row is returned for each (local)
+         day spanned by dates. If None, daydate is used.
+        daydate: (str) yyyy-mm-dd (not used if dates is not None).
+        latitude: float
+        longitude: float
+        altitude: (float) altitude in m (not used)
+        timezone: a string identifying the timezone to be associated to dates if
+        dates is not already localised.
+        elevation (float): the sun elevation (degrees) defining sunrise and
+         sunset (see daylength)
+
+    Returns:
+        a pandas dataframe indexed by localised days with localised solar noon,
+        sunrise and sunset (NaT for polar days or nights) and daylength (hour)
+    """
+
+    if dates is None:
+        dates = pandas.date_range(daydate, periods=1, freq='D')
+
+    if dates.tz is None:
+        times = dates.tz_localize(timezone)
+    else:
+        times = dates
+
+    days = times.normalize().unique()
+    naive = days.tz_localize(None)
+    dayofyear = numpy.asarray(naive.dayofyear)
+    year = numpy.asarray(naive.year)
+    # solar noon (UTC hour of the local calendar day) is found by cancelling
+    # the hour angle
+    noon = 12 - longitude / 15. + numpy.zeros(len(days))
+    for _ in range(2):
+        ephem = sun_ephemeris(noon, dayofyear, year, latitude, longitude)
+        noon = noon - ephem['hour_angle']
+    lat = numpy.radians(latitude)
+
+    def _half_day(dec):
+        cosh0 = (numpy.sin(numpy.radians(elevation)) - numpy.sin(
+            lat) * numpy.sin(dec)) / (numpy.cos(lat) * numpy.cos(dec))
+        return numpy.degrees(numpy.arccos(numpy.clip(cosh0, -1, 1))) / 15., \
+               numpy.abs(cosh0) >= 1
+
+    half, polar = _half_day(ephem['declination'])
+    # sunrise and sunset are refined with declination at their own time
+    events = []
+    for sign in (-1, 1):
+        event = noon + sign * half
+        for _ in range(2):
+            ephem = sun_ephemeris(event, dayofyear, year, latitude, longitude)
+            event_half, _ = _half_day(ephem['declination'])
+            event = event + sign * event_half - ephem['hour_angle']
+        events.append(numpy.where(polar, numpy.nan, event))
+
+    def _local(hours):
+        utc = naive.tz_localize('UTC') + pandas.to_timedelta(hours, unit='h')
+        return utc.tz_convert(times.tz)
+
+    return pandas.DataFrame({'solar_noon': _local(noon),
+                             'sunrise': _local(events[0]),
+                             'sunset': _local(events[1]),
+                             'daylength': numpy.where(
+                                 polar, 2 * half, events[1] - events[0])},
+                            index=days,
+                            columns=['sunrise', 'solar_noon', 'sunset',
+                                     'daylength'])
+
+
+def daylight(dates, latitude=_latitude, longitude=_longitude,
+             timezone=_timezone, margin=2):
+    """ Daylight mask of dates, for skipping night dates before calling more
+    expensive sun position models
+
+    Args:
+        dates: a pandas.DatetimeIndex
+        latitude: float
+        longitude: float
+        timezone: a string identifying the timezone to be associated to dates if
+        dates is not already localised.
+        margin: (float) sun elevation (degrees) below the horizon still
+         considered as daylight, for tolerating discrepancies with other sun
+         position models
+
+    Returns:
+        a boolean array, True for dates where sun elevation is above -margin
+    """
+    if dates.tz is None:
+        dates = dates.tz_localize(timezone)
+    ephem = sun_ephemeris(*(_utc_terms(dates.asi8) + (latitude, longitude)))
+    return ephem['elevation'] > -margin
 
 
 def sun_position(dates=None, daydate=_day, latitude=_latitude,
@@ -283,13 +457,14 @@ def sun_position(dates=None, daydate=_day, latitude=_latitude,
         times = dates
 
     d = times.tz_convert('UTC')
-    hUTC = d.hour + d.minute / 60.
+    hUTC = d.hour + d.minute / 60. + d.second / 3600.
     dayofyear = d.dayofyear
     year = d.year
-    el = sun_elevation(hUTC, dayofyear, year, latitude, longitude)
-    az = sun_azimuth(hUTC, dayofyear, year, latitude, longitude)
+    ephem = sun_ephemeris(hUTC, dayofyear, year, latitude, longitude)
+    el = ephem['elevation']
     sunpos = pandas.DataFrame(
-        {'elevation': el, 'zenith': 90 - el, 'azimuth': az}, index=times)
+        {'elevation': el, 'zenith': 90 - el, 'azimuth': ephem['azimuth']},
+        index=times)
 
     if filter_night and sunpos is not None:
         sunpos = sunpos.loc[sunpos['elevation'] > 0, :]
@@ -297,19 +472,49 @@ def sun_position(dates=None, daydate=_day, latitude=_latitude,
     return sunpos
 
 
-def sun_extraradiation(dates=None, daydate=_day, solar_constant=1366.1,
-                       method='spencer', timezone=_timezone):
-    """ Extraterrestrial radiation (W.m2) at the top of the earth atmosphere
+def site_arrays(latitude, longitude, *args):
+    """ Broadcast site parameters to column arrays
 
-        Args:
-            dates: a pandas.DatetimeIndex specifying the dates at which output
-            is required.If None, daydate is used and one position per hour is generated
-            daydate: (str) yyyy-mm-dd (not used if dates is not None).
-            solar_constant: (float)
-            method: one method provided by pvlib
-            timezone: a string identifying the timezone to be associated to dates if
-             dates is not already localised.
+    Args:
+        latitude: (float or array-like) latitude of sites (degrees)
+        longitude: (float or array-like) longitude of sites (degrees)
+        *args: other site parameters (float or array-like)
+
+    Returns:
+        a list of (n_sites, 1) arrays, that broadcast against time arrays to
+        (n_sites, n_times) arrays
     """
+    params = numpy.broadcast_arrays(
+        *[numpy.atleast_1d(numpy.asarray(x, dtype=float)) for x in
+          (latitude, longitude) + args])
+    return [x.ravel()[:, numpy.newaxis] for x in params]
+
+
+def sun_position_sites(dates=None, daydate=_day, latitude=_latitude,
+                       longitude=_longitude, altitude=_altitude,
+                       timezone=_timezone):
+    """ Sun position at several sites
+
+    Site-independent terms (declination, right ascension, sidereal time) are
+    computed once for all sites.
+
+    Args:
+        dates: a pandas.DatetimeIndex specifying the dates at which sun position
+        is required.If None, daydate is used and one position per hour is generated
+        daydate: (str) yyyy-mm-dd (not used if dates is not None).
+        latitude: (float or array-like) latitude of sites
+        longitude: (float or array-like) longitude of sites
+        altitude: (float or array-like) altitude of sites (m), not used (here
+         for compatibility with sun_position)
+        timezone: a string identifying the timezone to be associated to dates if
+        dates is not already localised.
+
+    Returns:
+        a dict with localised dates and (n_sites, n_times) arrays of sun
+        elevation, zenith and azimuth (degrees, from North, positive
+        clockwise). Night positions are not filtered.
+    """
+
     if dates is None:
         dates = pandas.date_range(daydate, periods=24, freq='H')
 
@@ -318,8 +523,45 @@ def sun_extraradiation(dates=None, daydate=_day, solar_constant=1366.1,
     else:
         times = dates
 
-    Io = None
-    dayofyear = times.tz_convert('UTC').dayofyear
+    latitude, longitude = site_arrays(latitude, longitude)
+    hUTC, dayofyear, year = _utc_terms(times.asi8)
+    ephem = sun_ephemeris(hUTC, dayofyear, year, latitude, longitude)
+    el = ephem['elevation']
+
+    return {'dates': times, 'elevation': el, 'zenith': 90 - el,
+            'azimuth': ephem['azimuth']}
+
+
+def sun_position_raw(times, latitude=_latitude, longitude=_longitude,
+                     altitude=_altitude, filter_night=True):
+    """ Sun position for dates given as raw numbers, without pandas overhead
+
+    Args:
+        times: (array of int64) UTC dates as nanoseconds since epoch (eg
+         DatetimeIndex.asi8)
+        latitude: float
+        longitude: float
+        altitude: (float) altitude in m (not used)
+        filter_night (bool) : Should positions of sun during night be filtered ?
+
+    Returns:
+        a dict of arrays with times, sun elevation, zenith and azimuth (from
+        North, positive clockwise)
+    """
+    times = numpy.asarray(times, dtype='int64')
+    ephem = sun_ephemeris(*(_utc_terms(times) + (latitude, longitude)))
+    el = ephem['elevation']
+    sunpos = {'times': times, 'elevation': el, 'zenith': 90 - el,
+              'azimuth': ephem['azimuth']}
+    if filter_night:
+        day = el > 0
+        sunpos = dict((k, v[day]) for k, v in sunpos.items())
+    return sunpos
+
+
+def _extraradiation_formula(dayofyear, solar_constant=1366.1,
+                            method='spencer'):
+    """ Extraterrestrial radiation (W.m2) for days of year"""
     B = 2 * numpy.pi * (dayofyear - 1) / 365.
     if method == 'asce':
         # R. G. Allen, Environmental, and E. Water Resources institute .
@@ -333,8 +575,81 @@ def sun_extraradiation(dates=None, daydate=_day, solar_constant=1366.1,
         # Search, vol. 2, p. 172, 1971
         Io = solar_constant * (
         1.00011 + 0.034221 * numpy.cos(B) + 0.00128 * numpy.sin(
-            B) - 0.000719 * numpy.cos(2 * B) + 0.000077 * numpy.sin(2 * B))
+            B) + 0.000719 * numpy.cos(2 * B) + 0.000077 * numpy.sin(2 * B))
     else:
         raise ValueError('unrecognised method: ' + method)
 
     return Io
+
+
+_extraradiation_tables = {}
+
+
+def extraradiation_table(solar_constant=1366.1, method='spencer'):
+    """ Extraterrestrial radiation (W.m2) of days of year 1 to 366
+
+        Tables are computed once per (solar_constant, method) and kept in
+        memory.
+
+        Args:
+            solar_constant: (float)
+            method: one of 'spencer' or 'asce'
+
+        Returns:
+            a (366,) array, with value of day of year n at index n - 1
+    """
+    key = (float(solar_constant), method)
+    if key not in _extraradiation_tables:
+        table = _extraradiation_formula(numpy.arange(1, 367), solar_constant,
+                                        method)
+        table.setflags(write=False)
+        _extraradiation_tables[key] = table
+    return _extraradiation_tables[key]
+
+
+def _extraradiation(dayofyear, solar_constant=1366.1, method='spencer'):
+    """ Extraterrestrial radiation (W.m2) for days of year"""
+    table = extraradiation_table(solar_constant, method)
+    return table[numpy.asarray(dayofyear, dtype=int) - 1]
+
+
+def sun_extraradiation_raw(times, solar_constant=1366.1, method='spencer'):
+    """ Extraterrestrial radiation (W.m2) for dates given as raw numbers
+
+        Args:
+            times: (array of int64) UTC dates as nanoseconds since epoch
+            solar_constant: (float)
+            method: one of 'spencer' or 'asce'
+    """
+    _, dayofyear, _ = _utc_terms(times)
+    return _extraradiation(dayofyear, solar_constant, method)
+
+
+def sun_extraradiation(dates=None, daydate=_day, solar_constant=1366.1,
+                       method='spencer', timezone=_timezone, dayofyear=None):
+    """ Extraterrestrial radiation (W.m2) at the top of the earth atmosphere
+
+        Args:
+            dates: a pandas.DatetimeIndex specifying the dates at which output
+            is required.If None, daydate is used and one position per hour is generated
+            daydate: (str) yyyy-mm-dd (not used if dates is not None).
+            solar_constant: (float)
+            method: one of 'spencer' or 'asce'
+            timezone: a string identifying the timezone to be associated to dates if
+             dates is not already localised.
+            dayofyear: (array-like of int) days of year (UTC) at which output
+             is required. If not None, dates and daydate are not used.
+    """
+    if dayofyear is not None:
+        return _extraradiation(dayofyear, solar_constant, method)
+
+    if dates is None:
+        dates = pandas.date_range(daydate, periods=24, freq='H')
+
+    if dates.tz is None:
+        times = dates.tz_localize(timezone)
+    else:
+        times = dates
+
+    dayofyear = times.tz_convert('UTC').dayofyear
+    return _extraradiation(dayofyear, solar_constant, method)
@@ -0,0 +1,250 @@
+# -*- python -*-
+#
+#       Copyright 2016 INRIA - CIRAD - INRA
+#
+#       Distributed under the Cecill-C License.
+#       See accompanying file LICENSE.txt or copy at
+#           http://www.cecill.info/licences/Licence_CeCILL-C_V1-en.html
+#
+#       WebSite : https://github.com/openalea-incubator/astk
+#
+#       File author(s): Christian Fournier <Christian.Fournier@supagro.inra.fr>
+#
+# ==============================================================================
+
+""" Dispatcher between the interchangeable sun position modules
+
+Backends are registered with their nominal accuracy (maximal angular error,
+degrees) and relative evaluation cost. The backend used by sun_position is,
+by order of precedence, the one given in the call, the one set for the process
+with set_backend, the one named by the ASTK_SUN_POSITION_BACKEND environment
+variable, or the cheapest available backend fulfilling the requested accuracy
+(the most accurate one if no accuracy is requested).
+"""
+
+import importlib
+import os
+import timeit
+
+import numpy
+import pandas
+
+# default location and dates
+_day = '2000-06-21'
+_timezone = 'Europe/Paris'
+_longitude = 3.52
+_latitude = 43.36
+_altitude = 56
+
+_environment_variable = 'ASTK_SUN_POSITION_BACKEND'
+
+_backends = {}
+_available = {}
+_process_backend = [None]
+
+
+def register_backend(name, module, accuracy, cost, requires=()):
+    """ Register a sun position backend
+
+    Args:
+        name: (str) the name of the backend
+        module: (str) the name of a module providing a sun_position function
+         with the same signature as alinea.astk.meteorology.sun_position
+        accuracy: (float) nominal maximal angular error (degrees)
+        cost: (float) relative evaluation cost
+        requires: (tuple of str) names of third-party modules needed by the
+         backend
+    """
+    _backends[name] = {'module': module, 'accuracy': accuracy, 'cost': cost,
+                       'requires': tuple(requires)}
+    _available.pop(name, None)
+
+
+register_backend('pvlib', 'alinea.astk.meteorology.sun_position',
+                 accuracy=0.001, cost=20, requires=('pvlib',))
+register_backend('ephem', 'alinea.astk.meteorology.sun_position_ephem',
+                 accuracy=0.01, cost=50, requires=('ephem',))
+register_backend('astk', 'alinea.astk.meteorology.sun_position_astk',
+                 accuracy=1., cost=2)
+register_backend('table', 'alinea.astk.meteorology.sun_position_table',
+                 accuracy=1., cost=1)
+
+
+def backends():
+    """ names of registered backends"""
+    return sorted(_backends)
+
+
+def is_available(name):
+    """ Test if the third-party modules needed by a backend are installed"""
+    if name not in _backends:
+        raise ValueError('unknown sun position backend: ' + name)
+    if name not in _available:
+        try:
+            for module in _backends[name]['requires']:
+                importlib.import_module(module)
+            _available[name] = True
+        except ImportError:
+            _available[name] = False
+    return _available[name]
+
+
+def set_backend(name=None):
+    """ Set the backend used by default in the current process. If name is
+    None, automatic selection is restored"""
+    if name is not None and name not in _backends:
+        raise ValueError('unknown sun position backend: ' + name)
+    _process_backend[0] = name
+
+
+def select_backend(backend=None, accuracy=None):
+    """ Name of the backend to be used
+
+    Args:
+        backend: (str) the name of a backend. If None, the process or
+         environment default is used, if any.
+        accuracy: (float) requested maximal angular error (degrees), used for
+         automatic selection
+
+    Returns:
+        the name of the backend
+    """
+    if backend is None:
+        backend = _process_backend[0]
+    if backend is None:
+        backend = os.environ.get(_environment_variable)
+    if backend is not None:
+        if not is_available(backend):
+            raise ImportError(
+                'sun position backend {0} requires {1}'.format(
+                    backend, ', '.join(_backends[backend]['requires'])))
+        return backend
+
+    candidates = [name for name in _backends if is_available(name)]
+    if accuracy is None:
+        key = lambda name: (_backends[name]['accuracy'],
+                            _backends[name]['cost'])
+    else:
+        candidates = [name for name in candidates if
+                      _backends[name]['accuracy'] <= accuracy]
+        key = lambda name: (_backends[name]['cost'],
+                            _backends[name]['accuracy'])
+    if len(candidates) < 1:
+        raise ValueError(
+            'no sun position backend available with accuracy {0}'.format(
+                accuracy))
+    return sorted(candidates, key=key)[0]
+
+
+def get_backend(backend=None, accuracy=None):
+    """ The module of the selected backend (see select_backend)"""
+    name = select_backend(backend, accuracy)
+    return importlib.import_module(_backends[name]['module'])
+
+
+def sun_position(dates=None, daydate=_day, latitude=_latitude,
+                 longitude=_longitude, altitude=_altitude, timezone=_timezone,
+                 filter_night=True, backend=None, accuracy=None, **kwds):
+    """ Sun position
+
+    Args:
+        dates: a pandas.DatetimeIndex specifying the dates at which sun position
+        is required.If None, daydate is used and one position per hour is generated
+        daydate: (str) yyyy-mm-dd (not used if dates is not None).
+        latitude: float
+        longitude: float
+        altitude: (float) altitude in m
+        timezone: a string identifying the timezone to be associated to dates if
+        dates is not already localised.
+        This args is not used if dates are already localised
+        filter_night (bool) : Should positions of sun during night be filtered ?
+        backend: (str) the name of the backend to use (see select_backend)
+        accuracy: (float) requested maximal angular error (degrees)
+        **kwds: extra arguments passed to the backend
+
+    Returns:
+        a pandas dataframe with sun position at requested dates indexed by
+        localised dates. Sun azimtuth is given from North, positive clockwise.
+    """
+    module = get_backend(backend, accuracy)
+    return module.sun_position(dates=dates, daydate=daydate,
+                               latitude=latitude, longitude=longitude,
+                               altitude=altitude, timezone=timezone,
+                               filter_night=filter_night, **kwds)
+
+
+def angular_distance(elevation1, azimuth1, elevation2, azimuth2):
+    """ angle (degrees) between directions given by their elevation and
+    azimuth (degrees)"""
+    el1, az1, el2, az2 = [numpy.radians(x) for x in
+                          (elevation1, azimuth1, elevation2, azimuth2)]
+    cosangle = numpy.sin(el1) * numpy.sin(el2) + numpy.cos(el1) * numpy.cos(
+        el2) * numpy.cos(az1 - az2)
+    return numpy.degrees(numpy.arccos(numpy.clip(cosangle, -1, 1)))
+
+
+def benchmark_backends(names=None, reference='pvlib', sites=None, years=None,
+                       freq='H', repeat=3):
+    """ Throughput and accuracy of sun position backends
+
+    Args:
+        names: (list of str) the backends to benchmark. If None, all available
+         backends are used
+        reference: (str) the backend used as reference for accuracy
+        sites: (list of tuples) (latitude, longitude) of sites. If None, a
+         set of sites spanning latitudes is used
+        years: (list of int) years to evaluate. If None, 1990, 2005 and 2020
+         are used
+        freq: (str) frequency of dates within each year
+        repeat: (int) number of repetitions for timing
+
+    Returns:
+        a pandas dataframe indexed by backend with number of positions
+        evaluated per second and maximal angular error (degrees) relative
+        to the reference, for daylight positions
+    """
+    if names is None:
+        names = [name for name in backends() if is_available(name)]
+    if sites is None:
+        sites = [(-60, -70), (-33.9, 18.4), (0, 36.8), (21.3, 55.5),
+                 (43.36, 3.52), (64.1, -21.9)]
+    if years is None:
+        years = [1990, 2005, 2020]
+    ref = get_backend(reference)
+
+    results = {}
+    for name in names:
+        module = get_backend(name)
+        duration = 0
+        count = 0
+        error = 0
+        for latitude, longitude in sites:
+            for year in years:
+                dates = pandas.date_range(str(year), str(year + 1), freq=freq,
+                                          closed='left', tz='UTC')
+
+                def _evaluate():
+                    return module.sun_position(dates, latitude=latitude,
+                                               longitude=longitude,
+                                               filter_night=False)
+
+                # first evaluation also warms up caches
+                sun = _evaluate()
+                duration += min(timeit.repeat(_evaluate, number=1,
+                                              repeat=repeat))
+                count += len(dates)
+                expected = ref.sun_position(dates, latitude=latitude,
+                                            longitude=longitude,
+                                            filter_night=False)
+                day = expected['elevation'].values > 0
+                dist = angular_distance(sun['elevation'].values[day],
+                                        sun['azimuth'].values[day],
+                                        expected['elevation'].values[day],
+                                        expected['azimuth'].values[day])
+                if len(dist) > 0:
+                    error = max(error, numpy.nanmax(dist))
+        results[name] = {'positions_per_second': count / duration,
+                         'max_angular_error': error}
+
+    return pandas.DataFrame(results).T.loc[names, ['positions_per_second',
+                                                   'max_angular_error']]
@@ -4,11 +4,13 @@
 import pandas
 import numpy
 import datetime
-try:
-    import ephem
-except ImportError:
-    print('ephem not found on your system, you may use sun_position_astk'
-          'instead OR install pvlib and use sun_position OR install ephem')
+import multiprocessing
+
+from alinea.astk.lazy_import import lazy_import
+
+ephem = lazy_import('ephem', 'ephem not found on your system, you may use '
+                             'sun_position_astk instead OR install pvlib and '
+                             'use sun_position OR install ephem')
 
 
 # default location and dates
@@ -21,8 +23,8 @@ _altitude = 56
 
 def ephem_sun_position(hUTC, dayofyear, year, latitude, longitude):
     observer = ephem.Observer()
-    observer.date = datetime.datetime.strptime(
-        '%d %d %d' % (year, dayofyear, hUTC), '%Y %j %H')
+    observer.date = datetime.datetime(int(year), 1, 1) + datetime.timedelta(
+        days=int(dayofyear) - 1, hours=float(hUTC))
     observer.lat = numpy.radians(latitude)
     observer.lon = numpy.radians(longitude)
     sun = ephem.Sun(observer)
@@ -30,8 +32,48 @@ def ephem_sun_position(hUTC, dayofyear, year, latitude, longitude):
     return numpy.degrees(sun.alt), numpy.degrees(sun.az)
 
 
+def dublin_julian_days(times):
+    """ Dublin julian days (the date representation of ephem) of localised
+    dates"""
+    # 1970-01-01 00:00 UTC is 25567.5 in ephem date scale
+    return times.asi8 / 86400e9 + 25567.5
+
+
+def ephem_sun_positions(djd, latitude, longitude):
+    """ Sun elevation and azimuth (degrees) at a series of dates
+
+    A single ephem Observer and Sun are reused for all dates.
+
+    Args:
+        djd: (array-like) the dates, as dublin julian days
+        latitude: float
+        longitude: float
+
+    Returns:
+        arrays of sun elevation and sun azimuth (degrees, from North, positive
+        clockwise)
+    """
+    observer = ephem.Observer()
+    observer.lat = numpy.radians(latitude)
+    observer.lon = numpy.radians(longitude)
+    sun = ephem.Sun()
+    alt = numpy.empty(len(djd))
+    az = numpy.empty(len(djd))
+    for i, d in enumerate(djd):
+        observer.date = d
+        sun.compute(observer)
+        alt[i] = sun.alt
+        az[i] = sun.az
+    return numpy.degrees(alt), numpy.degrees(az)
+
+
+def _ephem_sun_positions(args):
+    return ephem_sun_positions(*args)
+
+
 def sun_position(dates=None, daydate=_day, latitude=_latitude, longitude=_longitude,
-                 altitude=_altitude, timezone=_timezone, filter_night=True):
+                 altitude=_altitude, timezone=_timezone, filter_night=True,
+                 processes=None):
     """ Sun position
 
     Args:
@@ -45,6 +87,8 @@ def sun_position(dates=None, daydate=_day, latitude=_latitude, longitude=_longit
         dates is not already localised.
         This args is not used if dates are already localised
         filter_night (bool) : Should positions of sun during night be filtered ?
+        processes: (int) if not None, dates are split across a pool of
+        processes
 
     Returns:
         a pandas dataframe with sun position at requested dates indexed by
@@ -59,15 +103,21 @@ def sun_position(dates=None, daydate=_day, latitude=_latitude, longitude=_longit
     else:
         times = dates
 
-    d = times.tz_convert('UTC')
-    hUTC = d.hour + d.minute / 60.
-    dayofyear = d.dayofyear
-    year = d.year
-    fun = numpy.frompyfunc(ephem_sun_position, 5, 2)
-    alt, az = fun(hUTC, dayofyear, year, latitude, longitude)
-    sunpos = pandas.DataFrame(
-        {'elevation': alt.astype(float), 'azimuth': az.astype(float)},
-        index=times)
+    djd = dublin_julian_days(times)
+    if processes is None or processes < 2:
+        alt, az = ephem_sun_positions(djd, latitude, longitude)
+    else:
+        chunks = numpy.array_split(djd, processes)
+        pool = multiprocessing.Pool(processes)
+        try:
+            res = pool.map(_ephem_sun_positions,
+                           [(c, latitude, longitude) for c in chunks])
+        finally:
+            pool.close()
+            pool.join()
+        alt = numpy.concatenate([r[0] for r in res])
+        az = numpy.concatenate([r[1] for r in res])
+    sunpos = pandas.DataFrame({'elevation': alt, 'azimuth': az}, index=times)
     sunpos['zenith'] = 90 - sunpos['elevation']
 
     if filter_night and sunpos is not None:
@@ -0,0 +1,226 @@
+# -*- python -*-
+#
+#       Copyright 2016 INRIA - CIRAD - INRA
+#
+#       Distributed under the Cecill-C License.
+#       See accompanying file LICENSE.txt or copy at
+#           http://www.cecill.info/licences/Licence_CeCILL-C_V1-en.html
+#
+#       WebSite : https://github.com/openalea-incubator/astk
+#
+#       File author(s): Christian Fournier <Christian.Fournier@supagro.inra.fr>
+#
+# ==============================================================================
+
+""" Sun position interpolated from precomputed ephemeris tables
+
+Sun directions of a site are tabulated once per year at a fixed time step
+(5 minutes by default) and linearly interpolated afterward. Tables are kept in
+memory and can be persisted as memory-mappable numpy files.
+"""
+
+import json
+import os
+
+import numpy
+import pandas
+
+from alinea.astk.meteorology import sun_position_astk
+
+# default location and dates
+_day = '2000-06-21'
+_timezone = 'Europe/Paris'
+_longitude = 3.52
+_latitude = 43.36
+_altitude = 56
+
+_tables = {}
+
+
+def _directions(elevation, azimuth):
+    """ unit vectors of directions given by their elevation and azimuth
+    (degrees, from North, positive clockwise)"""
+    el = numpy.radians(elevation)
+    az = numpy.radians(azimuth)
+    return numpy.stack((numpy.cos(el) * numpy.sin(az),
+                        numpy.cos(el) * numpy.cos(az),
+                        numpy.sin(el)), axis=-1)
+
+
+class EphemerisTable(object):
+    """ Sun directions of a site tabulated at a regular time step over a year
+    """
+
+    def __init__(self, start, step, vectors, max_error=None):
+        """ Create a table
+
+        Args:
+            start: (int) the date of the first entry (ns, UTC)
+            step: (int) the time step of the table (ns)
+            vectors: a (n, 3) array of unit vectors pointing to the sun
+            max_error: (float) maximal angular error (degrees) of the
+             interpolation
+        """
+        self.start = start
+        self.step = step
+        self.vectors = vectors
+        self.max_error = max_error
+
+    @staticmethod
+    def build(year, latitude=_latitude, longitude=_longitude,
+              altitude=_altitude, step=5, source=sun_position_astk):
+        """ Tabulate sun directions over a year
+
+        Args:
+            year: (int) the year
+            latitude: float
+            longitude: float
+            altitude: (float) altitude in m
+            step: (float) the time step of the table (minutes)
+            source: the sun position module used for tabulating (default to
+             sun_position_astk)
+
+        Returns:
+            an EphemerisTable
+        """
+        start = pandas.Timestamp('{0}-01-01'.format(year), tz='UTC')
+        end = pandas.Timestamp('{0}-01-01'.format(year + 1), tz='UTC')
+        freq = pandas.Timedelta(minutes=step)
+        dates = pandas.date_range(start, end + freq, freq=freq)
+
+        def _evaluate(times):
+            sun = source.sun_position(dates=times, latitude=latitude,
+                                      longitude=longitude, altitude=altitude,
+                                      filter_night=False)
+            return _directions(sun['elevation'].values, sun['azimuth'].values)
+
+        table = EphemerisTable(start.value, freq.value, _evaluate(dates))
+        # interpolation error is estimated at middle of time steps
+        middles = dates[:-1] + freq / 2
+        exact = _evaluate(middles)
+        interpolated = table.interpolate(middles.asi8)
+        cosangle = numpy.clip((exact * interpolated).sum(axis=1), -1, 1)
+        table.max_error = float(numpy.degrees(numpy.arccos(cosangle)).max())
+        return table
+
+    def save(self, path):
+        """ save the table to path.npy (memory-mappable vectors) and path.json
+        (metadata)"""
+        numpy.save(path + '.npy', self.vectors)
+        with open(path + '.json', 'w') as f:
+            json.dump({'start': int(self.start), 'step': int(self.step),
+                       'max_error': self.max_error}, f)
+
+    @staticmethod
+    def load(path, mmap_mode='r'):
+        """ load a table saved with EphemerisTable.save"""
+        with open(path + '.json') as f:
+            meta = json.load(f)
+        vectors = numpy.load(path + '.npy', mmap_mode=mmap_mode)
+        return EphemerisTable(meta['start'], meta['step'], vectors,
+                              meta['max_error'])
+
+    def interpolate(self, ns):
+        """ unit vectors pointing to the sun at UTC dates (ns)"""
+        position = (numpy.asarray(ns) - self.start) / float(self.step)
+        i = numpy.floor(position).astype(int)
+        if len(i) > 0 and (i.min() < 0 or i.max() >= len(self.vectors) - 1):
+            raise ValueError('dates out of the range of the table')
+        w = (position - i)[:, numpy.newaxis]
+        v = (1 - w) * self.vectors[i] + w * self.vectors[i + 1]
+        return v / numpy.sqrt((v ** 2).sum(axis=1))[:, numpy.newaxis]
+
+
+def ephemeris_table(year, latitude=_latitude, longitude=_longitude,
+                    altitude=_altitude, step=5, cache_dir=None):
+    """ Get the ephemeris table of a site for a year
+
+    Tables are cached in memory. If cache_dir is not None, tables are also
+    searched in / saved to this directory.
+
+    Args:
+        year: (int) the year
+        latitude: float
+        longitude: float
+        altitude: (float) altitude in m
+        step: (float) the time step of the table (minutes)
+        cache_dir: (str) a directory for persisting tables. If None (default)
+         tables are only cached in memory.
+
+    Returns:
+        an EphemerisTable
+    """
+    key = (year, latitude, longitude, altitude, step)
+    if key not in _tables:
+        path = None
+        if cache_dir is not None:
+            name = 'sun_{0}_{1:.4f}_{2:.4f}_{3:g}_{4:g}min'.format(*key)
+            path = os.path.join(cache_dir, name)
+        if path is not None and os.path.exists(path + '.npy'):
+            table = EphemerisTable.load(path)
+        else:
+            table = EphemerisTable.build(year, latitude=latitude,
+                                         longitude=longitude,
+                                         altitude=altitude, step=step)
+            if path is not None:
+                if not os.path.exists(cache_dir):
+                    os.makedirs(cache_dir)
+                table.save(path)
+        _tables[key] = table
+    return _tables[key]
+
+
+def sun_position(dates=None, daydate=_day, latitude=_latitude,
+                 longitude=_longitude, altitude=_altitude, timezone=_timezone,
+                 filter_night=True, step=5, cache_dir=None):
+    """ Sun position
+
+    Args:
+        dates: a pandas.DatetimeIndex specifying the dates at which sun position
+        is required.If None, daydate is used and one position per hour is generated
+        daydate: (str) yyyy-mm-dd (not used if dates is not None).
+        latitude: float
+        longitude: float
+        altitude: (float) altitude in m
+        timezone: a string identifying the timezone to be associated to dates if
+        dates is not already localised.
+        This args is not used if dates are already localised
+        filter_night (bool) : Should positions of sun during night be filtered ?
+        step: (float) time step (minutes) of the ephemeris tables. With
+         the default 5 minutes, interpolation error is lower than 0.01 degree
+         (see EphemerisTable.max_error)
+        cache_dir: (str) a directory for persisting ephemeris tables.
+
+    Returns:
+        a pandas dataframe with sun position at requested dates indexed by
+        localised dates. Sun azimtuth is given from North, positive clockwise.
+    """
+
+    if dates is None:
+        dates = pandas.date_range(daydate, periods=24, freq='H')
+
+    if dates.tz is None:
+        times = dates.tz_localize(timezone)
+    else:
+        times = dates
+
+    ns = times.asi8
+    years = times.tz_convert('UTC').year
+    vectors = numpy.zeros((len(times), 3))
+    for year in numpy.unique(years):
+        table = ephemeris_table(int(year), latitude=latitude,
+                                longitude=longitude, altitude=altitude,
+                                step=step, cache_dir=cache_dir)
+        in_year = numpy.asarray(years == year)
+        vectors[in_year] = table.interpolate(ns[in_year])
+
+    el = numpy.degrees(numpy.arcsin(numpy.clip(vectors[:, 2], -1, 1)))
+    az = numpy.mod(numpy.degrees(numpy.arctan2(vectors[:, 0], vectors[:, 1])),
+                   360)
+    sunpos = pandas.DataFrame(
+        {'elevation': el, 'zenith': 90 - el, 'azimuth': az}, index=times)
+
+    if filter_night and sunpos is not None:
+        sunpos = sunpos.loc[sunpos['elevation'] > 0, :]
+
+    return sunpos
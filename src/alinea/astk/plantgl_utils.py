@@ -1,4 +1,6 @@
-from openalea.plantgl import all as pgl
+from alinea.astk.lazy_import import lazy_import
+
+pgl = lazy_import('openalea.plantgl.all')
 
 def _is_iterable(x):
     try:
@@ -17,9 +17,12 @@ irradiance
 
 import numpy
 import pandas
+from collections import deque
 from alinea.astk.meteorology.sky_irradiance import sky_irradiances, \
     clear_sky_irradiances, horizontal_irradiance
-from alinea.astk.meteorology.sun_position import sun_position
+from alinea.astk.meteorology.sky_irradiance_astk import \
+    clear_sky_irradiances_raw
+from alinea.astk.meteorology.sun_position_backends import sun_position
 
 # default location and dates
 _daydate = '2000-06-21'
@@ -76,31 +79,181 @@ def cie_scattering_indicatrix(sun_azimuth, sun_elevation, sky_azimuth,
     return f_ksi / f_zs
 
 
+# (a, b, c, d, e) coefficients of the 15 CIE standard general skies
+# CIE, 2003, Spatial distribution of daylight - CIE standard general sky,
+# CIE S 011/E:2003, CIE Central Bureau, Vienna
+cie_standard_skies = {1: (4, -0.7, 0, -1, 0),
+                      2: (4, -0.7, 2, -1.5, 0.15),
+                      3: (1.1, -0.8, 0, -1, 0),
+                      4: (1.1, -0.8, 2, -1.5, 0.15),
+                      5: (0, -1, 0, -1, 0),
+                      6: (0, -1, 2, -1.5, 0.15),
+                      7: (0, -1, 5, -2.5, 0.3),
+                      8: (0, -1, 10, -3, 0.45),
+                      9: (-1, -0.55, 2, -1.5, 0.15),
+                      10: (-1, -0.55, 5, -2.5, 0.3),
+                      11: (-1, -0.55, 10, -3, 0.45),
+                      12: (-1, -0.32, 10, -3, 0.45),
+                      13: (-1, -0.32, 16, -3, 0.3),
+                      14: (-1, -0.15, 16, -3, 0.3),
+                      15: (-1, -0.15, 24, -2.8, 0.15)}
+
+# named sky types
+_cie_sky_names = {'soc': 1, 'uoc': 5, 'clear_sky': 12}
+
+
+def cie_sky_parameters(sky_type):
+    """ (a, b, c, d, e) coefficients of a cie sky type
+
+    sky_type is one of 'soc' (standard overcast sky), 'uoc' (uniform radiance),
+    'clear_sky' (standard clear sky low turbidity), the number (1 to 15) of a
+    CIE standard general sky or a (a, b, c, d, e) tuple
+    """
+    if isinstance(sky_type, tuple):
+        if len(sky_type) != 5:
+            raise ValueError('sky type coefficients should be (a, b, c, d, e)')
+        return sky_type
+    sky_type = _cie_sky_names.get(sky_type, sky_type)
+    try:
+        return cie_standard_skies[sky_type]
+    except (KeyError, TypeError):
+        raise ValueError('Unknown sky type')
+
+
+def _uniform_indicatrix(c, e):
+    # indicatrix is constant if it does not depend on angular distance to sun
+    return c == 0 and e == 0
+
+
 def cie_relative_luminance(sky_elevation, sky_azimuth=None, sun_elevation=None,
                            sun_azimuth=None, type='soc'):
     """ cie relative luminance of a sky element relative to the luminance
     at zenith
     
     angle in radians
-    type is one of 'soc' (standard overcast sky), 'uoc' (uniform radiance)
-    or 'clear_sky' (standard clear sky low turbidity)
+    type is one of 'soc' (standard overcast sky), 'uoc' (uniform radiance),
+    'clear_sky' (standard clear sky low turbidity), the number (1 to 15) of a
+    CIE standard general sky or a (a, b, c, d, e) tuple of coefficients
     """
 
-    if type == 'clear_sky' and (
-                sun_elevation is None or sun_azimuth is None or sky_azimuth is None):
-        raise ValueError, 'Clear sky requires sun position'
-
-    if type == 'soc':
-        return cie_luminance_gradation(sky_elevation, 4, -0.7)
-    elif type == 'uoc':
-        return cie_luminance_gradation(sky_elevation, 0, -1)
-    elif type == 'clear_sky':
-        return cie_luminance_gradation(sky_elevation, -1,
-                                       -0.32) * cie_scattering_indicatrix(
-            sun_azimuth, sun_elevation, sky_azimuth, sky_elevation, 10, -3,
-            0.45)
-    else:
-        raise ValueError, 'Unknown sky type'
+    a, b, c, d, e = cie_sky_parameters(type)
+    gradation = cie_luminance_gradation(sky_elevation, a, b)
+    if _uniform_indicatrix(c, e):
+        return gradation
+
+    if sun_elevation is None or sun_azimuth is None or sky_azimuth is None:
+        raise ValueError('Sky type requires sun position')
+
+    return gradation * cie_scattering_indicatrix(sun_azimuth, sun_elevation,
+                                                 sky_azimuth, sky_elevation,
+                                                 c, d, e)
+
+
+class CieSkyTable(object):
+    """ Tabulated cie relative luminances of the directions of a sky
+    discretisation
+
+    Gradations, that do not depend on sun position, are cached per sky type.
+    Scattering indicatrices are tabulated over a regular grid of sun
+    positions and bilinearly interpolated, so that changing the sky type or
+    the sun position costs a table lookup.
+    """
+
+    def __init__(self, sky_elevation, sky_azimuth, sky_fraction=None,
+                 resolution=2.):
+        """ Tabulate a sky discretisation
+
+        Args:
+            sky_elevation: (list of float) elevation (degrees) of directions
+                sampling the sky hemisphere
+            sky_azimuth: (list of float) azimuth (degrees, from North, positive
+                clockwise) of directions sampling the sky hemisphere
+            sky_fraction: (list of float) fraction of sky associated to
+                directions. If None, directions are considered evenly
+                distributed.
+            resolution: (float) angular resolution (degrees) of the grid of
+                sun positions
+        """
+        self.sky_elevation = numpy.array(sky_elevation, dtype=float)
+        self.sky_azimuth = numpy.array(sky_azimuth, dtype=float)
+        if sky_fraction is None:
+            sky_fraction = numpy.ones(len(self.sky_elevation))
+        self.sky_fraction = numpy.array(sky_fraction, dtype=float)
+        self.resolution = resolution
+        self.sun_elevation = numpy.arange(0, 90 + resolution, resolution)
+        self.sun_azimuth = numpy.arange(0, 360 + resolution, resolution)
+        self._gradation = {}
+        self._indicatrix = {}
+
+    def gradation(self, sky_type):
+        """ luminance gradation of the sky directions for a sky type"""
+        a, b, _, _, _ = cie_sky_parameters(sky_type)
+        if (a, b) not in self._gradation:
+            self._gradation[(a, b)] = cie_luminance_gradation(
+                numpy.radians(self.sky_elevation), a, b)
+        return self._gradation[(a, b)]
+
+    def indicatrix_table(self, sky_type):
+        """ (sun elevations x sun azimuths x sky directions) table of the
+        scattering indicatrix of a sky type"""
+        _, _, c, d, e = cie_sky_parameters(sky_type)
+        if (c, d, e) not in self._indicatrix:
+            sun_el = numpy.radians(self.sun_elevation)[:, numpy.newaxis,
+                                                       numpy.newaxis]
+            sun_az = numpy.radians(self.sun_azimuth)[numpy.newaxis, :,
+                                                     numpy.newaxis]
+            self._indicatrix[(c, d, e)] = cie_scattering_indicatrix(
+                sun_az, sun_el, numpy.radians(self.sky_azimuth),
+                numpy.radians(self.sky_elevation), c, d, e)
+        return self._indicatrix[(c, d, e)]
+
+    def indicatrix(self, sky_type, sun_elevation, sun_azimuth):
+        """ interpolated scattering indicatrix of the sky directions for one
+        or several sun positions (degrees)"""
+        table = self.indicatrix_table(sky_type)
+        i = numpy.clip(numpy.array(sun_elevation, dtype=float), 0,
+                       90) / self.resolution
+        j = numpy.mod(sun_azimuth, 360) / self.resolution
+        i0 = numpy.minimum(numpy.floor(i).astype(int), len(table) - 2)
+        j0 = numpy.minimum(numpy.floor(j).astype(int), table.shape[1] - 2)
+        wi = (i - i0)[..., numpy.newaxis]
+        wj = (j - j0)[..., numpy.newaxis]
+        return (1 - wi) * ((1 - wj) * table[i0, j0] + wj * table[i0, j0 + 1]) \
+            + wi * ((1 - wj) * table[i0 + 1, j0] + wj * table[i0 + 1, j0 + 1])
+
+    def relative_luminance(self, sky_type='soc', sun_elevation=None,
+                           sun_azimuth=None):
+        """ cie relative luminance of the sky directions
+
+        Args:
+            sky_type: a cie sky type (see cie_sky_parameters)
+            sun_elevation: (float or list of float) sun elevation (degrees).
+                Not needed for skies with uniform indicatrix
+            sun_azimuth: (float or list of float) sun azimuth (degrees, from
+                North, positive clockwise).
+
+        Returns:
+            the relative luminance of the sky directions, or a (sun positions
+            x sky directions) array if several sun positions are given
+        """
+        gradation = self.gradation(sky_type)
+        _, _, c, _, e = cie_sky_parameters(sky_type)
+        if _uniform_indicatrix(c, e):
+            if sun_elevation is not None and numpy.ndim(sun_elevation) > 0:
+                return numpy.tile(gradation, (len(sun_elevation), 1))
+            return gradation
+        if sun_elevation is None or sun_azimuth is None:
+            raise ValueError('Sky type requires sun position')
+        return gradation * self.indicatrix(sky_type, sun_elevation,
+                                           sun_azimuth)
+
+    def radiance_distribution(self, sky_type='soc', sun_elevation=None,
+                              sun_azimuth=None):
+        """ Normalised sky radiance distribution of the sky directions (see
+        sky_radiance_distribution)"""
+        rad_dist = self.relative_luminance(sky_type, sun_elevation,
+                                           sun_azimuth) * self.sky_fraction
+        return rad_dist / rad_dist.sum(axis=-1, keepdims=True)
 
 
 def sky_discretisation(type='turtle46', nb_az=None, nb_el=None):
@@ -119,6 +272,102 @@ def sky_discretisation(type='turtle46', nb_az=None, nb_el=None):
     return elevations46, azimuths46, sky_fraction
 
 
+def _dome_patches(refine_level):
+    """ elevation (degrees), azimuth (degrees), sky fraction and angular radius
+    (degrees) of the patches of an icosphere turtle dome"""
+    from alinea.astk.icosphere import turtle_dome, sample_faces, solid_angle
+
+    vertices, faces = turtle_dome(refine_level)
+    vertices = numpy.array(vertices)
+    centers, _ = sample_faces(vertices, faces, iter=None, flat=True)
+    centers /= numpy.linalg.norm(centers, axis=1)[:, numpy.newaxis]
+    flat = [p for face in faces for p in face]
+    owner = numpy.repeat(numpy.arange(len(faces)), [len(f) for f in faces])
+    cosangle = numpy.sum(vertices[flat] * centers[owner], axis=1)
+    radius = numpy.degrees(numpy.arccos(numpy.clip(cosangle.min(), -1, 1)))
+    elevation = 90 - numpy.degrees(numpy.arccos(centers[:, 2]))
+    # from North (y), positive clockwise (towards East, x)
+    azimuth = numpy.mod(numpy.degrees(numpy.arctan2(centers[:, 0],
+                                                    centers[:, 1])), 360)
+    steradians = solid_angle(vertices, faces)
+    sky_fraction = steradians / steradians.sum()
+    return elevation, azimuth, sky_fraction, radius
+
+
+def sky_dome(discretisation='turtle46', tolerance=None, max_level=20):
+    """ Directions and sky fractions of the patches of a sky discretisation
+
+    Args:
+        discretisation: (str) one of 'turtle46' (the 46 directions of the
+         turtle sky, default) or 'icosphere' (the faces of a dual icosphere
+         hemispherical dome)
+        tolerance: (float) maximal angular distance (degrees) between a
+         direction of the sky and the centre of the patch it belongs to. It
+         is used to select the refinement level of the icosphere
+         discretisation. If None (default), the 46 faces dome is used. Not
+         used for turtle46.
+        max_level: (int) the maximal refinement level explored to fulfill the
+         tolerance.
+
+    Returns:
+        elevation (degrees), azimuth (degrees, from North, positive clockwise)
+        and sky fraction of the patches
+    """
+    if discretisation == 'turtle46':
+        return sky_discretisation()
+    elif discretisation == 'icosphere':
+        if tolerance is None:
+            el, az, fraction, _ = _dome_patches(3)
+            return el, az, fraction
+        for level in range(max_level + 1):
+            el, az, fraction, radius = _dome_patches(level)
+            if radius <= tolerance:
+                return el, az, fraction
+        raise ValueError(
+            'tolerance of {0} degrees can not be achieved with refinement '
+            'levels lower than {1}'.format(tolerance, max_level))
+    else:
+        raise ValueError(
+            'unknown discretisation: ' + discretisation +
+            ' (should be one of turtle46, icosphere)')
+
+
+def _unit_vectors(elevation, azimuth):
+    """ cartesian coordinates of directions given by their elevation and
+    azimuth (degrees)"""
+    el = numpy.radians(elevation)
+    az = numpy.radians(azimuth)
+    return numpy.stack((numpy.cos(el) * numpy.sin(az),
+                        numpy.cos(el) * numpy.cos(az),
+                        numpy.sin(el)), axis=-1)
+
+
+def bin_sources(elevation, azimuth, irradiance, sky_elevation, sky_azimuth):
+    """ Accumulate the horizontal irradiance of a set of sources into the
+    closest directions of a sky discretisation
+
+    Args:
+        elevation: (array-like) elevation (degrees) of the sources
+        azimuth: (array-like) azimuth (degrees, from North, positive
+         clockwise) of the sources
+        irradiance: (array-like) horizontal irradiance of the sources
+        sky_elevation: (array-like) elevation (degrees) of the sky directions
+        sky_azimuth: (array-like) azimuth (degrees, from North, positive
+         clockwise) of the sky directions
+
+    Returns:
+        the horizontal irradiance accumulated in each sky direction
+    """
+    binned = numpy.zeros(len(sky_elevation))
+    if len(elevation) > 0:
+        cosangle = numpy.dot(_unit_vectors(elevation, azimuth),
+                             _unit_vectors(sky_elevation, sky_azimuth).T)
+        closest = numpy.argmax(cosangle, axis=1)
+        binned += numpy.bincount(closest, weights=irradiance,
+                                 minlength=len(sky_elevation))
+    return binned
+
+
 def sky_radiance_distribution(sky_elevation, sky_azimuth, sky_fraction,
                               sky_type='soc', sun_elevation=None,
                               sun_azimuth=None, avoid_sun=True):
@@ -135,14 +384,18 @@ def sky_radiance_distribution(sky_elevation, sky_azimuth, sky_fraction,
         sky_type: (str) one of  'soc' (standard overcast sky),
                                 'uoc' (uniform luminance)
                                 'clear_sky' (standard clear sky low turbidity)
-        sun_elevation: sun elevation (degrees). Only needed for clear_sky
+            or any other cie sky type accepted by cie_sky_parameters
+        sun_elevation: sun elevation (degrees). Only needed for clear_sky.
+            If a list of sun elevations is given, one distribution per sun
+            position is returned.
         sun_azimuth: sun azimuth (degrees, from North, positive clockwise).
             Only needed for clear_sky
         avoid_sun (bool): avoid sampling radiance distribution toward directions
         directly pointing to solar disc
 
     Returns:
-        the relative radiance(s) associated to the sky directions
+        the relative radiance(s) associated to the sky directions, or a (sun
+        positions x sky directions) array if several sun positions are given
     """
 
     el = numpy.radians(sky_elevation)
@@ -151,24 +404,43 @@ def sky_radiance_distribution(sky_elevation, sky_azimuth, sky_fraction,
 
     if sun_elevation is not None:
         sun_elevation = numpy.radians(sun_elevation)
+        if numpy.ndim(sun_elevation) == 1:
+            sun_elevation = sun_elevation[:, numpy.newaxis]
     if sun_azimuth is not None:
         sun_azimuth = numpy.radians(sun_azimuth)
+        if numpy.ndim(sun_azimuth) == 1:
+            sun_azimuth = sun_azimuth[:, numpy.newaxis]
 
-    if avoid_sun and sky_type == 'clear_sky':
+    _, _, c, _, e = cie_sky_parameters(sky_type)
+    if avoid_sun and not _uniform_indicatrix(c, e):
         delta_el = abs(el - sun_elevation)
         delta_az = abs(az - sun_azimuth)
         sun_disc = numpy.radians(0.553)
-        az += numpy.where((delta_az < sun_disc) & (delta_el < sun_disc), sun_disc,
-                          0)
+        az = az + numpy.where((delta_az < sun_disc) & (delta_el < sun_disc),
+                              sun_disc, 0)
 
     lum = cie_relative_luminance(el, az, sun_elevation, sun_azimuth,
                                  type=sky_type)
     rad_dist = lum * sky_fraction
-    rad_dist /= sum(rad_dist)
+    rad_dist /= rad_dist.sum(axis=-1, keepdims=True)
 
     return rad_dist
 
 
+def _clear_sky_at(sun, longitude, latitude, altitude):
+    """ clear sky irradiances at the dates of sun positions (as returned by
+    sun_position), joined to them
+
+    The sun position backend and the irradiance model may disagree on night
+    dates near sunrise and sunset: irradiances are null at the daylight dates
+    of sun that the irradiance model considers as night.
+    """
+    c_sky = clear_sky_irradiances(dates=sun.index, longitude=longitude,
+                                  latitude=latitude, altitude=altitude)
+    c_sky = c_sky.reindex(sun.index).fillna(0)
+    return pandas.concat([sun, c_sky], axis=1)
+
+
 def sun_sources(irradiance=1, dates=None, daydate=_daydate,
                 longitude=_longitude, latitude=_latitude, altitude=_altitude,
                 timezone=_timezone):
@@ -192,9 +464,10 @@ def sun_sources(irradiance=1, dates=None, daydate=_daydate,
         and horizontal irradiance of sources
     """
 
-    c_sky = clear_sky_irradiances(dates=dates, daydate=daydate,
-                                  longitude=longitude, latitude=latitude,
-                                  altitude=altitude, timezone=timezone)
+    sun = sun_position(dates=dates, daydate=daydate, latitude=latitude,
+                       longitude=longitude, altitude=altitude,
+                       timezone=timezone)
+    c_sky = _clear_sky_at(sun, longitude, latitude, altitude)
 
     sun_irradiance = c_sky['ghi'] - c_sky['dhi']
 
@@ -204,21 +477,161 @@ def sun_sources(irradiance=1, dates=None, daydate=_daydate,
 
     # Sr = (1 -cos(cone half angle)) * 2 * pi, frac = Sr / 2 / pi
     # fsun = 1 - numpy.cos(numpy.radians(.53 / 2))
-    sun = sun_position(dates=dates, daydate=daydate, latitude=latitude,
-                       longitude=longitude, altitude=altitude,
-                       timezone=timezone)
     return sun['elevation'].values, sun['azimuth'].values, sun_irradiance.values
 
 
+def sun_sources_raw(times, irradiance=1, longitude=_longitude,
+                    latitude=_latitude, altitude=_altitude):
+    """ Light sources representing the sun under clear sky conditions, for
+    dates given as raw numbers, without pandas overhead
+
+    Clear sky irradiances are estimated with the pure numpy models of
+    sky_irradiance_astk (see clear_sky_irradiances_raw).
+
+    Args:
+        times: (array of int64) UTC dates as nanoseconds since epoch (eg
+         DatetimeIndex.asi8)
+        irradiance: (float) sum of horizontal irradiance of sources.
+            Using irradiance=1 (default) yields relative contribution of sources.
+            If None, clear sky sun horizontal irradiance is used.
+        longitude: (float) in degrees
+        latitude: (float) in degrees
+        altitude: (float) in meter
+
+    Returns:
+        elevation (degrees), azimuth (degrees, from North positive clockwise)
+        and horizontal irradiance of sources
+    """
+    c_sky = clear_sky_irradiances_raw(times, longitude=longitude,
+                                      latitude=latitude, altitude=altitude)
+    sun_irradiance = c_sky['ghi'] - c_sky['dhi']
+    if irradiance is not None:
+        sun_irradiance *= irradiance / sun_irradiance.sum()
+    return c_sky['elevation'], c_sky['azimuth'], sun_irradiance
+
+
+def _clear_sun_samples(times, longitude, latitude, altitude):
+    """ clear sky horizontal irradiance of the sun and sun direction vector
+    at localised times (irradiance is null during night)"""
+    sun = sun_position(dates=times, latitude=latitude, longitude=longitude,
+                       altitude=altitude)
+    values = numpy.zeros((len(times), 4))
+    if len(sun) > 0:
+        c_sky = _clear_sky_at(sun, longitude, latitude, altitude)
+        c_sky = c_sky.reindex(times)
+        day = numpy.isfinite(c_sky['elevation'].values)
+        irr = (c_sky['ghi'] - c_sky['dhi']).values[day]
+        values[day, 0] = irr
+        values[day, 1:] = irr[:, numpy.newaxis] * _unit_vectors(
+            c_sky['elevation'].values[day], c_sky['azimuth'].values[day])
+    return values
+
+
+def integrated_sun_sources(irradiance=1, bounds=None, daydate=_daydate,
+                           tolerance=1., max_depth=10, longitude=_longitude,
+                           latitude=_latitude, altitude=_altitude,
+                           timezone=_timezone):
+    """ Light sources representing the sun under clear sky conditions,
+    integrated over time intervals
+
+    Irradiance and irradiance-weighted sun direction are integrated with an
+    adaptive Simpson quadrature, that only subdivides intervals where the sun
+    path curves sharply or crosses sunrise / sunset.
+
+    Args:
+        irradiance: (float) sum of horizontal irradiance of sources.
+            Using irradiance=1 (default) yields relative contribution of sources.
+            If None, mean clear sky sun horizontal irradiance over each
+            interval is used.
+        bounds: A pandas datetime index (as generated by pandas.date_range)
+            giving the boundaries of the time intervals. If None, hourly
+            intervals of daydate are used.
+        daydate: (str) yyyy-mm-dd (not used if bounds is not None).
+        tolerance: (float) absolute tolerance (W.m-2) on the mean horizontal
+            irradiance over an interval
+        max_depth: (int) maximal number of bisection of an interval
+        longitude: (float) in degrees
+        latitude: (float) in degrees
+        altitude: (float) in meter
+        timezone:(str) the time zone (not used if bounds are already localised)
+
+    Returns:
+        elevation (degrees), azimuth (degrees, from North positive clockwise)
+        and horizontal irradiance of sources, one per interval with sun
+    """
+    if bounds is None:
+        bounds = pandas.date_range(daydate, periods=25, freq='H')
+    if bounds.tz is None:
+        bounds = bounds.tz_localize(timezone)
+    ns = bounds.asi8
+    origin = ns[0]
+    edges = (ns - origin) / 1e9
+
+    def _evaluate(t):
+        times = pandas.to_datetime((t * 1e9).astype('int64') + origin, utc=True)
+        return _clear_sun_samples(times, longitude, latitude, altitude)
+
+    def _simpson(fa, fm, fb, width):
+        return width / 6. * (fa + 4 * fm + fb)
+
+    n = len(edges) - 1
+    integral = numpy.zeros((n, 4))
+    f_edges = _evaluate(edges)
+    a = edges[:-1]
+    b = edges[1:]
+    m = (a + b) / 2.
+    fa, fb = f_edges[:-1], f_edges[1:]
+    fm = _evaluate(m)
+    whole = _simpson(fa, fm, fb, (b - a)[:, numpy.newaxis])
+    interval = numpy.arange(n)
+    depth = 0
+    while len(a) > 0:
+        f_mid = _evaluate(numpy.concatenate(((a + m) / 2., (m + b) / 2.)))
+        flm, frm = f_mid[:len(a)], f_mid[len(a):]
+        left = _simpson(fa, flm, fm, (m - a)[:, numpy.newaxis])
+        right = _simpson(fm, frm, fb, (b - m)[:, numpy.newaxis])
+        delta = left + right - whole
+        error = numpy.abs(delta).max(axis=1)
+        done = (error <= 15 * tolerance * (b - a)) | (depth >= max_depth)
+        numpy.add.at(integral, interval[done],
+                     (left + right + delta / 15.)[done])
+        split = ~done
+        a, m, b = (numpy.concatenate((a[split], m[split])),
+                   numpy.concatenate(((a + m)[split] / 2., (m + b)[split] / 2.)),
+                   numpy.concatenate((m[split], b[split])))
+        fa, fm, fb = (numpy.concatenate((fa[split], fm[split])),
+                      numpy.concatenate((flm[split], frm[split])),
+                      numpy.concatenate((fm[split], fb[split])))
+        whole = numpy.concatenate((left[split], right[split]))
+        interval = numpy.concatenate((interval[split], interval[split]))
+        depth += 1
+
+    sunny = integral[:, 0] > 0
+    integral = integral[sunny]
+    vector = integral[:, 1:] / numpy.sqrt(
+        (integral[:, 1:] ** 2).sum(axis=1))[:, numpy.newaxis]
+    elevation = numpy.degrees(numpy.arcsin(vector[:, 2]))
+    azimuth = numpy.mod(numpy.degrees(numpy.arctan2(vector[:, 0],
+                                                    vector[:, 1])), 360)
+    sun_irradiance = integral[:, 0] / numpy.diff(edges)[sunny]
+    if irradiance is not None:
+        sun_irradiance /= sum(sun_irradiance)
+        sun_irradiance *= irradiance
+
+    return elevation, azimuth, sun_irradiance
+
+
 def sky_sources(sky_type='soc', irradiance=1, dates=None, daydate=_daydate,
                 longitude=_longitude, latitude=_latitude,
-                altitude=_altitude, timezone=_timezone):
+                altitude=_altitude, timezone=_timezone, directions=None,
+                sky_table=None):
     """ Light sources representing standard cie sky types in 46 directions
     Args:
         sky_type:(str) type of sky luminance model. One of :
                            'soc' (standard overcast sky),
                            'uoc' (uniform overcast sky)
                            'clear_sky' (standard clear sky)
+         or any other cie sky type accepted by cie_sky_parameters
         irradiance: (float) sum of horizontal irradiance of all sources. If None
          diffuse horizontal clear_sky irradiance are used for clear_sky type and
           20% attenuated clear_sky global horizontal irradiances are used for
@@ -230,60 +643,109 @@ def sky_sources(sky_type='soc', irradiance=1, dates=None, daydate=_daydate,
         latitude: (float) in degrees
         altitude: (float) in meter
         timezone:(str) the time zone (not used if dates are already localised)
+        directions: (tuple) elevation, azimuth and sky fraction of the
+         directions sampling the sky, as returned by sky_dome. If None
+         (default), the 46 directions of sky_discretisation are used.
+        sky_table: (CieSkyTable) tabulated luminances of the sky directions.
+         If not None, directions are taken from the table and radiances are
+         looked up rather than evaluated (see CieSkyTable).
 
     Returns:
         elevation (degrees), azimuth (degrees, from North positive clockwise),
         and horizontal irradiance of sources
     """
 
-    source_elevation, source_azimuth, source_fraction = sky_discretisation()
-
-    if sky_type == 'soc' or sky_type == 'uoc':
-        radiance = sky_radiance_distribution(source_elevation, source_azimuth,
-                                             source_fraction,
-                                             sky_type=sky_type)
-        source_irradiance = horizontal_irradiance(radiance, source_elevation)
-        if irradiance is None:
-            sky_irradiance = clear_sky_irradiances(dates=dates, daydate=daydate,
-                                               longitude=longitude,
-                                               latitude=latitude,
-                                               altitude=altitude,
-                                               timezone=timezone)
-            irradiance = sum(sky_irradiance['ghi']) * 0.2
-
-    elif sky_type == 'clear_sky':
+    def _clear_sky():
         sun = sun_position(dates=dates, daydate=daydate, latitude=latitude,
                            longitude=longitude, altitude=altitude,
                            timezone=timezone)
-        c_sky = clear_sky_irradiances(dates=dates, daydate=daydate,
-                                      longitude=longitude, latitude=latitude,
-                                      altitude=altitude, timezone=timezone)
-        c_sky = pandas.concat([sun, c_sky], axis=1)
+        c_sky = _clear_sky_at(sun, longitude, latitude, altitude)
+        return dict((k, c_sky[k].values) for k in c_sky.columns)
+
+    return _sky_sources(sky_type, irradiance, directions, _clear_sky,
+                        sky_table)
+
+
+def _sky_sources(sky_type, irradiance, directions, clear_sky, sky_table=None):
+    """ sky_sources from a function returning a dict of arrays of clear sky
+    sun elevation, azimuth, ghi and dhi"""
+    if sky_table is not None:
+        directions = (sky_table.sky_elevation, sky_table.sky_azimuth,
+                      sky_table.sky_fraction)
+    elif directions is None:
+        directions = sky_discretisation()
+    source_elevation, source_azimuth, source_fraction = directions
+
+    def _radiance(sun_elevation=None, sun_azimuth=None):
+        if sky_table is not None:
+            return sky_table.radiance_distribution(sky_type, sun_elevation,
+                                                   sun_azimuth)
+        return sky_radiance_distribution(source_elevation, source_azimuth,
+                                         source_fraction, sky_type=sky_type,
+                                         sun_elevation=sun_elevation,
+                                         sun_azimuth=sun_azimuth,
+                                         avoid_sun=True)
+
+    _, _, c, _, e = cie_sky_parameters(sky_type)
+    if _uniform_indicatrix(c, e):
+        source_irradiance = horizontal_irradiance(_radiance(),
+                                                  source_elevation)
+        if irradiance is None:
+            irradiance = sum(clear_sky()['ghi']) * 0.2
+    else:
+        c_sky = clear_sky()
         if irradiance is None:
             irradiance = sum(c_sky['dhi'])
 
         # temporal weigths : use dhi (diffuse horizontal irradiance)
-        c_sky['wsky'] = c_sky['dhi'] / sum(c_sky['dhi'])
-        source_irradiance = numpy.zeros_like(source_fraction)
-        for i, row in c_sky.iterrows():
-            rad = sky_radiance_distribution(source_elevation, source_azimuth,
-                                            source_fraction,
-                                            sky_type='clear_sky',
-                                            sun_elevation=row['elevation'],
-                                            sun_azimuth=row['azimuth'],
-                                            avoid_sun=True)
-            source_irradiance += (
-            horizontal_irradiance(rad, source_elevation) * row['wsky'])
-    else:
-        raise ValueError(
-            'unknown type: ' + sky_type +
-            ' (should be one of uoc, soc, clear_sky')
+        wsky = c_sky['dhi'] / sum(c_sky['dhi'])
+        rad = _radiance(c_sky['elevation'], c_sky['azimuth'])
+        source_irradiance = numpy.dot(wsky,
+                                      horizontal_irradiance(rad,
+                                                            source_elevation))
 
     source_irradiance /= sum(source_irradiance)
     source_irradiance *= irradiance
     return source_elevation, source_azimuth, source_irradiance
 
 
+def sky_sources_raw(times, sky_type='soc', irradiance=1, longitude=_longitude,
+                    latitude=_latitude, altitude=_altitude, directions=None,
+                    sky_table=None):
+    """ Light sources representing standard cie sky types, for dates given as
+    raw numbers, without pandas overhead
+
+    Clear sky irradiances are estimated with the pure numpy models of
+    sky_irradiance_astk (see clear_sky_irradiances_raw).
+
+    Args:
+        times: (array of int64) UTC dates as nanoseconds since epoch (eg
+         DatetimeIndex.asi8)
+        sky_type:(str) type of sky luminance model (see sky_sources)
+        irradiance: (float) sum of horizontal irradiance of all sources (see
+         sky_sources)
+        longitude: (float) in degrees
+        latitude: (float) in degrees
+        altitude: (float) in meter
+        directions: (tuple) elevation, azimuth and sky fraction of the
+         directions sampling the sky, as returned by sky_dome. If None
+         (default), the 46 directions of sky_discretisation are used.
+        sky_table: (CieSkyTable) tabulated luminances of the sky directions
+         (see sky_sources)
+
+    Returns:
+        elevation (degrees), azimuth (degrees, from North positive clockwise),
+        and horizontal irradiance of sources
+    """
+
+    def _clear_sky():
+        return clear_sky_irradiances_raw(times, longitude=longitude,
+                                         latitude=latitude, altitude=altitude)
+
+    return _sky_sources(sky_type, irradiance, directions, _clear_sky,
+                        sky_table)
+
+
 def sun_fraction(sky):
     """Sun fraction of sky irradiance
 
@@ -297,7 +759,7 @@ def sun_fraction(sky):
     return (sky['ghi'] - sky['dhi']).sum() / sky['ghi'].sum()
 
 
-def sky_blend(sky, f_sun=0.):
+def sky_blend(sky, f_sun=0., integrate=True):
     """ Clear-sky / overcast mixing fractions for blended sky irradiance model
 
     ref :  J. Mardaljevic. Daylight Simulation: Validation, Sky Models and
@@ -308,11 +770,17 @@ def sky_blend(sky, f_sun=0.):
     Args:
         sky: (pandas DataFrame): sky irradiances as computed by sky_irradiances
         function
-        f_sun: (float) sun mixing fraction for the sun (default 0)
+        f_sun: (float or array-like) sun mixing fraction for the sun
+         (default 0)
+        integrate: (bool) if True (default), fractions are integrated over
+         the period. Otherwise, one couple of fractions per time step is
+         returned.
     """
-    def _f_clear(clearness_index):
-        return min(1, (clearness_index - 1) / (1.41 - 1))
-    f_clear = numpy.array(map(_f_clear, sky['clearness']))
+    clearness = numpy.array(sky['clearness'], dtype=float)
+    f_clear = numpy.fmin(1, (clearness - 1) / (1.41 - 1))
+    if not integrate:
+        f_sun = numpy.array(f_sun)
+        return f_clear * (1 - f_sun), (1 - f_clear) * (1 - f_sun)
     # temporal integration
     fclear = (f_clear * sky['ghi']).sum() / sky['ghi'].sum()
     f_clear_sky = fclear * (1 - f_sun)
@@ -324,7 +792,8 @@ def sky_blend(sky, f_sun=0.):
 def sun_sky_sources(ghi=None, dhi=None, attenuation=None, model='blended',
                     dates=None, daydate=_daydate, pressure=101325,
                     temp_dew=None, longitude=_longitude, latitude=_latitude,
-                    altitude=_altitude, timezone=_timezone, normalisation=None):
+                    altitude=_altitude, timezone=_timezone, normalisation=None,
+                    directions=None, sky_table=None):
     """ Light sources representing the sun and the sky for actual irradiances
 
     Args:
@@ -347,6 +816,11 @@ def sun_sky_sources(ghi=None, dhi=None, attenuation=None, model='blended',
         timezone:(str) the time zone (not used if dates are already localised)
         normalisation: (float) If not None, sun and sky sources are normalised
          so that sum of sun + sky irradiance equals this value.
+        directions: (tuple) elevation, azimuth and sky fraction of the
+         directions sampling the sky, as returned by sky_dome. If None
+         (default), the 46 directions of sky_discretisation are used.
+        sky_table: (CieSkyTable) tabulated luminances of the sky directions
+         (see sky_sources)
 
     Returns:
         elevation (degrees), azimuth (degrees, from North positive clockwise),
@@ -376,17 +850,21 @@ def sun_sky_sources(ghi=None, dhi=None, attenuation=None, model='blended',
     if model == 'blended' and f_sun > 0:
         f_clear_sky, f_soc = sky_blend(sky_irr, f_sun)
         irradiance = f_soc * normalisation
-        sky_el, sky_az, soc = sky_sources(sky_type='soc', irradiance=irradiance)
+        sky_el, sky_az, soc = sky_sources(sky_type='soc', irradiance=irradiance,
+                                          directions=directions,
+                                          sky_table=sky_table)
         irradiance = f_clear_sky * normalisation
         _, _, csky = sky_sources(sky_type='clear_sky',
                                  irradiance=irradiance, dates=dates,
                                  daydate=daydate, latitude=latitude,
                                  longitude=longitude, altitude=altitude,
-                                 timezone=timezone)
+                                 timezone=timezone, directions=directions,
+                                 sky_table=sky_table)
         sky = sky_el, sky_az, soc + csky
     elif model == 'sun_soc' or f_sun == 0:
         irradiance = (1 - f_sun) * normalisation
-        sky = sky_sources(sky_type='soc', irradiance=irradiance)
+        sky = sky_sources(sky_type='soc', irradiance=irradiance,
+                          directions=directions, sky_table=sky_table)
     else:
         raise ValueError(
             'unknown model: ' + model +
@@ -394,5 +872,335 @@ def sun_sky_sources(ghi=None, dhi=None, attenuation=None, model='blended',
     return sun, sky
 
 
+def sun_sky_source_matrices(ghi=None, dhi=None, attenuation=None,
+                            model='blended', dates=None, daydate=_daydate,
+                            pressure=101325, temp_dew=None,
+                            longitude=_longitude, latitude=_latitude,
+                            altitude=_altitude, timezone=_timezone,
+                            directions=None):
+    """ Per time step light sources representing the sun and the sky for
+    actual irradiances
+
+    Unlike sun_sky_sources, the period is not integrated: sun and sky sources
+    are returned for each time step, so that downstream models can use
+    daylight-coefficient like matrix products.
+
+    Args:
+        ghi: (array_like): global horizontal irradiance (W. m-2). If None(
+         default) clear sky irradiances are used
+        dhi: (array-like, optional): actual diffuse horizontal irradiance.
+        attenuation: (float) attenuation factor for ghi (actual_ghi =
+         attenuation * ghi). If None (default), no attenuation is applied.
+        model:(str) sky luminance model. One of :
+                'sun_soc' sun/soc mix as a function of dni / dhi
+                'blended' sun/soc/clear_sky blend after Mardaljevic, 2000
+        dates: A pandas datetime index (as generated by pandas.date_range). If
+            None, hourly values for daydate are used.
+        daydate: (str) yyyy-mm-dd (not used if dates is not None).
+        pressure: the site pressure (Pa)
+        temp_dew: the dew point temperature
+        longitude: (float) in degrees
+        latitude: (float) in degrees
+        altitude: (float) in meter
+        timezone:(str) the time zone (not used if dates are already localised)
+        directions: (tuple) elevation, azimuth and sky fraction of the
+         directions sampling the sky, as returned by sky_dome. If None
+         (default), the 46 directions of sky_discretisation are used.
+
+    Returns:
+        the localised dates of the time steps, elevation (degrees), azimuth
+        (degrees, from North positive clockwise) and horizontal irradiance of
+        the sun at each time step, and elevation, azimuth of the sky
+        directions together with a (time steps x directions) array of
+        horizontal irradiance of the sky sources
+    """
+    sky_irr = sky_irradiances(dates=dates, daydate=daydate, ghi=ghi, dhi=dhi,
+                              attenuation=attenuation, pressure=pressure,
+                              temp_dew=temp_dew, longitude=longitude,
+                              latitude=latitude, altitude=altitude,
+                              timezone=timezone)
+    if directions is None:
+        directions = sky_discretisation()
+    sky_el, sky_az, sky_fraction = directions
+
+    sun_elevation = sky_irr['elevation'].values
+    sun_azimuth = sky_irr['azimuth'].values
+    sky_ghi = sky_irr['ghi'].values.astype(float)
+    sky_dhi = sky_irr['dhi'].values.astype(float)
+    sun_irradiance = sky_ghi - sky_dhi
+    f_sun = numpy.where(sky_ghi > 0, sun_irradiance / sky_ghi, 0)
+
+    rad = sky_radiance_distribution(sky_el, sky_az, sky_fraction,
+                                    sky_type='soc')
+    soc = horizontal_irradiance(rad, sky_el)
+    soc /= soc.sum()
+
+    if model == 'blended':
+        f_clear_sky, _ = sky_blend(sky_irr, f_sun, integrate=False)
+        f_clear_sky = numpy.where(f_sun > 0, f_clear_sky, 0)
+        f_soc = 1 - f_sun - f_clear_sky
+        rad = sky_radiance_distribution(sky_el, sky_az, sky_fraction,
+                                        sky_type='clear_sky',
+                                        sun_elevation=sun_elevation,
+                                        sun_azimuth=sun_azimuth,
+                                        avoid_sun=True)
+        csky = horizontal_irradiance(rad, sky_el)
+        csky /= csky.sum(axis=1, keepdims=True)
+        sky = (f_soc * sky_ghi)[:, numpy.newaxis] * soc + (
+            f_clear_sky * sky_ghi)[:, numpy.newaxis] * csky
+    elif model == 'sun_soc':
+        sky = ((1 - f_sun) * sky_ghi)[:, numpy.newaxis] * soc
+    else:
+        raise ValueError(
+            'unknown model: ' + model +
+            ' (should be one of: soc_sun, blended)')
+
+    return sky_irr.index, (sun_elevation, sun_azimuth, sun_irradiance), (
+        sky_el, sky_az, sky)
+
+
+class SunSkyAccumulator(object):
+    """ Sliding window accumulator of light sources representing the sun and
+    the sky
+
+    Contributions of time steps (sun irradiance, overcast and clear-sky
+    components of the sky, clear-sky / overcast mixing) are kept as running
+    sums, so that moving the window by one time step only costs the
+    evaluation of the newest step, whatever the window length. Sources
+    returned for a window are the same as those of sun_sky_sources.
+    """
+
+    def __init__(self, window=24, model='blended', pressure=101325,
+                 temp_dew=None, longitude=_longitude, latitude=_latitude,
+                 altitude=_altitude, timezone=_timezone, directions=None):
+        """ Create an empty accumulator
+
+        Args:
+            window: (int) the number of time steps in the window
+            model:(str) sky luminance model. One of :
+                'sun_soc' sun/soc mix as a function of dni / dhi
+                'blended' sun/soc/clear_sky blend after Mardaljevic, 2000
+            pressure: the site pressure (Pa)
+            temp_dew: the dew point temperature
+            longitude: (float) in degrees
+            latitude: (float) in degrees
+            altitude: (float) in meter
+            timezone:(str) the time zone (not used if dates are already
+             localised)
+            directions: (tuple) elevation, azimuth and sky fraction of the
+             directions sampling the sky, as returned by sky_dome. If None
+             (default), the 46 directions of sky_discretisation are used.
+        """
+        if model not in ('blended', 'sun_soc'):
+            raise ValueError(
+                'unknown model: ' + model +
+                ' (should be one of: soc_sun, blended)')
+        self.window = window
+        self.model = model
+        self.site = dict(pressure=pressure, temp_dew=temp_dew,
+                         longitude=longitude, latitude=latitude,
+                         altitude=altitude, timezone=timezone)
+        if directions is None:
+            directions = sky_discretisation()
+        self.directions = directions
+        sky_el, sky_az, sky_fraction = directions
+        rad = sky_radiance_distribution(sky_el, sky_az, sky_fraction,
+                                        sky_type='soc')
+        self._soc = horizontal_irradiance(rad, sky_el)
+        self._soc /= self._soc.sum()
+        self._steps = deque()
+        self._sums = None
+        self._updates = 0
+        self._reset_sums()
+
+    def _reset_sums(self):
+        self._sums = {'ghi': 0., 'sun': 0., 'fclear': 0., 'clear_sun': 0.,
+                      'clear_sky': numpy.zeros(len(self.directions[0]))}
+
+    def _step_contributions(self, dates, ghi=None, dhi=None,
+                            attenuation=None):
+        """ contributions of each time step of dates """
+        site = self.site
+        times = dates
+        if times.tz is None:
+            times = times.tz_localize(site['timezone'])
+        n = len(times)
+        steps = {'elevation': numpy.full(n, numpy.nan),
+                 'azimuth': numpy.full(n, numpy.nan),
+                 'ghi': numpy.zeros(n), 'sun': numpy.zeros(n),
+                 'fclear': numpy.zeros(n), 'clear_sun': numpy.zeros(n),
+                 'clear_sky': numpy.zeros((n, len(self.directions[0])))}
+        sun = sun_position(dates=times, latitude=site['latitude'],
+                           longitude=site['longitude'],
+                           altitude=site['altitude'])
+        if len(sun) < 1 and ghi is None:
+            return times, steps
+
+        sky_irr = sky_irradiances(dates=times, ghi=ghi, dhi=dhi,
+                                  attenuation=attenuation,
+                                  pressure=site['pressure'],
+                                  temp_dew=site['temp_dew'],
+                                  longitude=site['longitude'],
+                                  latitude=site['latitude'],
+                                  altitude=site['altitude'])
+        sky_irr = sky_irr.reindex(times)
+        steps['ghi'] = sky_irr['ghi'].fillna(0).values.astype(float)
+        steps['sun'] = (sky_irr['ghi'] - sky_irr['dhi']).fillna(0).values
+        f_clear_sky, _ = sky_blend(sky_irr, integrate=False)
+        steps['fclear'] = numpy.nan_to_num(f_clear_sky * steps['ghi'])
+
+        if len(sun) > 0:
+            c_sky = _clear_sky_at(sun, site['longitude'], site['latitude'],
+                                  site['altitude']).reindex(times)
+            day = numpy.isfinite(c_sky['elevation'].values)
+            steps['elevation'][day] = c_sky['elevation'].values[day]
+            steps['azimuth'][day] = c_sky['azimuth'].values[day]
+            clear_sun = (c_sky['ghi'] - c_sky['dhi']).values[day]
+            steps['clear_sun'][day] = clear_sun
+            sky_el, sky_az, sky_fraction = self.directions
+            rad = sky_radiance_distribution(sky_el, sky_az, sky_fraction,
+                                            sky_type='clear_sky',
+                                            sun_elevation=steps['elevation'][
+                                                day],
+                                            sun_azimuth=steps['azimuth'][day],
+                                            avoid_sun=True)
+            steps['clear_sky'][day] = horizontal_irradiance(
+                rad, sky_el) * c_sky['dhi'].values[day][:, numpy.newaxis]
+
+        return times, steps
+
+    def _add(self, step):
+        for k in self._sums:
+            self._sums[k] += step[k]
+
+    def _remove(self, step):
+        for k in self._sums:
+            self._sums[k] -= step[k]
+
+    def update(self, dates, ghi=None, dhi=None, attenuation=None):
+        """ Add new time steps to the window, dropping the oldest ones if the
+        window is full
+
+        Args:
+            dates: A pandas datetime index of the new time steps
+            ghi: (array_like): global horizontal irradiance (W. m-2). If None(
+             default) clear sky irradiances are used
+            dhi: (array-like, optional): actual diffuse horizontal irradiance.
+            attenuation: (float) attenuation factor for ghi (actual_ghi =
+             attenuation * ghi). If None (default), no attenuation is applied.
+        """
+        times, steps = self._step_contributions(dates, ghi=ghi, dhi=dhi,
+                                                attenuation=attenuation)
+        for i, t in enumerate(times):
+            step = {k: v[i] for k, v in steps.items()}
+            step['date'] = t
+            self._steps.append(step)
+            self._add(step)
+            if len(self._steps) > self.window:
+                self._remove(self._steps.popleft())
+            self._updates += 1
+            # periodic exact re-summation avoids drift of running sums
+            if self._updates % self.window == 0:
+                self._reset_sums()
+                for old in self._steps:
+                    self._add(old)
+
+    @property
+    def dates(self):
+        """ the dates of the time steps in the window """
+        return pandas.DatetimeIndex([step['date'] for step in self._steps])
+
+    def sources(self, normalisation=None):
+        """ Light sources representing the sun and the sky for the window
+
+        Args:
+            normalisation: (float) If not None, sun and sky sources are
+             normalised so that sum of sun + sky irradiance equals this value.
+
+        Returns:
+            elevation (degrees), azimuth (degrees, from North positive
+            clockwise), and horizontal irradiance of sources representing the
+            sun and same quantities for sources representing the sky
+        """
+        sums = self._sums
+        if normalisation is None:
+            normalisation = sums['ghi']
+        f_sun = sums['sun'] / sums['ghi'] if sums['ghi'] > 0 else 0
+
+        day = [step for step in self._steps if step['clear_sun'] > 0]
+        sun_el = numpy.array([step['elevation'] for step in day])
+        sun_az = numpy.array([step['azimuth'] for step in day])
+        sun_irr = numpy.array([step['clear_sun'] for step in day])
+        if len(day) > 0:
+            sun_irr *= f_sun * normalisation / sums['clear_sun']
+        sun = sun_el, sun_az, sun_irr
+
+        sky_el, sky_az, _ = self.directions
+        if self.model == 'blended' and f_sun > 0:
+            fclear = sums['fclear'] / sums['ghi']
+            f_clear_sky = fclear * (1 - f_sun)
+            f_soc = (1 - fclear) * (1 - f_sun)
+            csky = sums['clear_sky'] / sums['clear_sky'].sum()
+            sky_irr = self._soc * f_soc * normalisation + \
+                csky * f_clear_sky * normalisation
+        else:
+            sky_irr = self._soc * (1 - f_sun) * normalisation
 
+        return sun, (sky_el, sky_az, sky_irr)
 
+
+def cumulative_sky_sources(ghi=None, dhi=None, attenuation=None,
+                           model='blended', dates=None, daydate=_daydate,
+                           pressure=101325, temp_dew=None,
+                           longitude=_longitude, latitude=_latitude,
+                           altitude=_altitude, timezone=_timezone,
+                           normalisation=None, discretisation='turtle46',
+                           tolerance=None):
+    """ Light sources representing the sun and the sky cumulated over a period
+    in the patches of a sky discretisation
+
+    Sun positions are binned into the closest patch of the discretisation, so
+    that the number of sources does not depend on the length of the period.
+    Horizontal irradiance of sun and sky is conserved.
+
+    Args:
+        ghi: (array_like): global horizontal irradiance (W. m-2). If None(
+         default) clear sky irradiances are used
+        dhi: (array-like, optional): actual diffuse horizontal irradiance.
+        attenuation: (float) attenuation factor for ghi (actual_ghi =
+         attenuation * ghi). If None (default), no attenuation is applied.
+        model:(str) sky luminance model. One of :
+                'sun_soc' sun/soc mix as a function of dni / dhi
+                'blended' sun/soc/clear_sky blend after Mardaljevic, 2000
+        dates: A pandas datetime index (as generated by pandas.date_range). If
+            None, hourly values for daydate are used.
+        daydate: (str) yyyy-mm-dd (not used if dates is not None).
+        pressure: the site pressure (Pa)
+        temp_dew: the dew point temperature
+        longitude: (float) in degrees
+        latitude: (float) in degrees
+        altitude: (float) in meter
+        timezone:(str) the time zone (not used if dates are already localised)
+        normalisation: (float) If not None, sources are normalised so that
+         their sum equals this value.
+        discretisation: (str) sky discretisation used for binning (see
+         sky_dome)
+        tolerance: (float) maximal angular distance (degrees) between a sun
+         position and the patch it is binned in (see sky_dome)
+
+    Returns:
+        elevation (degrees), azimuth (degrees, from North positive clockwise),
+        and horizontal irradiance of sources
+    """
+    directions = sky_dome(discretisation, tolerance=tolerance)
+    sun, sky = sun_sky_sources(ghi=ghi, dhi=dhi, attenuation=attenuation,
+                               model=model, dates=dates, daydate=daydate,
+                               pressure=pressure, temp_dew=temp_dew,
+                               longitude=longitude, latitude=latitude,
+                               altitude=altitude, timezone=timezone,
+                               normalisation=normalisation,
+                               directions=directions)
+    sky_el, sky_az, sky_irr = sky
+    sun_el, sun_az, sun_irr = sun
+    irradiance = sky_irr + bin_sources(sun_el, sun_az, sun_irr, sky_el, sky_az)
+    return sky_el, sky_az, irradiance
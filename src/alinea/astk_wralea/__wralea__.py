@@ -22,7 +22,7 @@ __all__ = []
 iter_with_delays = Factory(name="iter with delays", 
                   description="Iteration ", 
                   category="flow control", 
-                  nodemodule="alinea.astk.TimeControl",
+                  nodemodule="alinea.astk_wralea.flow_control",
                   nodeclass="IterWithDelaysNode",
                   inputs = (dict(name="generator", interface=None, value=None),
                             dict(name="delay generator", interface=None, value=None),
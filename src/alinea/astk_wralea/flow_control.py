@@ -0,0 +1,63 @@
+# -*- python -*-
+#
+#       Copyright 2016 INRIA - CIRAD - INRA
+#
+#       Distributed under the Cecill-C License.
+#       See accompanying file LICENSE.txt or copy at
+#           http://www.cecill.info/licences/Licence_CeCILL-C_V1-en.html
+#
+#       WebSite : https://github.com/openalea-incubator/astk
+#
+#       File author(s): Christian Fournier <Christian.Fournier@supagro.inra.fr>
+#
+# ==============================================================================
+
+""" Flow control nodes of the astk visual programming package
+
+These nodes depend on openalea.core, and hence live outside alinea.astk so
+that importing TimeControl does not load it.
+"""
+
+import numpy
+from openalea.core.system.systemnodes import IterNode
+
+
+class IterWithDelaysNode(IterNode):
+    """ Iteration Node """
+
+    def eval(self):
+        """
+        Return True if the node need a reevaluation
+        """
+        try:
+            if self.iterable == "Empty":
+                self.iterable = iter(self.inputs[0])
+                self.iterdelay = iter(self.inputs[1])
+                self.wait = self.inputs[1][-1]
+
+            if(hasattr(self, "nextval")):
+                self.outputs[0] = self.nextval
+            else:
+                self.outputs[0] = self.iterable.next()
+                
+            self.nextval = self.iterable.next()
+            delay = self.iterdelay.next()
+            self.outputs[1] = delay
+            self.outputs[2] = numpy.random.random() #used to trigger lazy nodes every delay
+            return delay
+
+        except TypeError, e:
+            self.outputs[0] = self.inputs[0]
+            self.outputs[1] = self.inputs[1]
+            return False
+
+        except StopIteration, e:
+            if self.wait > 1:
+                self.wait -= 1
+                return True
+            else:
+                self.iterable = "Empty"
+                if(hasattr(self, "nextval")):
+                    del self.nextval
+
+                return False
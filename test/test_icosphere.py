@@ -0,0 +1,172 @@
+from alinea.astk.icosphere import icosahedron, split_triangles, star_split, \
+    dual, icosphere, incidence, sorted_faces, turtle_dome, sample_dome, \
+    sample_faces, clear_mesh_cache, spherical, SectorIndex, dome_index, \
+    solid_angle, normed, norm, rotate, rotation_matrix, inverse_rotation, \
+    direct_rotation, middle_point, centroid
+import math
+import os
+import shutil
+import tempfile
+
+import numpy
+
+
+def test_split_triangles():
+    vertices, faces = icosahedron()
+    tags = range(len(faces))
+    v, f, t = split_triangles(vertices, faces, tags)
+    assert len(v) == 42
+    assert len(f) == 80
+    # children of face j are faces 4j to 4j + 3, middle points are numbered
+    # by order of first occurrence
+    assert f[:4] == [(0, 12, 14), (11, 13, 12), (5, 14, 13), (12, 13, 14)]
+    assert t == [tag for tag in tags for i in range(4)]
+    for j, face in enumerate(faces):
+        children = f[4 * j: 4 * j + 4]
+        assert [c[0] for c in children[:3]] == list(face)
+    numpy.testing.assert_allclose(numpy.linalg.norm(v, axis=1), 1)
+
+    va, fa = split_triangles(numpy.array(vertices), numpy.array(faces))
+    assert isinstance(fa, numpy.ndarray)
+    numpy.testing.assert_array_equal(fa, f)
+    numpy.testing.assert_allclose(va, v)
+    for i in range(4):
+        va, fa = split_triangles(va, fa)
+    assert len(va) == 10 * 4 ** 5 + 2
+    assert len(fa) == 20 * 4 ** 5
+
+
+def test_star_split():
+    vertices, faces = dual(*icosphere(1))
+    tags = range(len(faces))
+    v, f, t = star_split(vertices, faces, tags)
+    assert len(v) == len(vertices) + len(faces)
+    assert len(f) == sum(len(face) for face in faces)
+    i = 0
+    for j, face in enumerate(faces):
+        n = len(face)
+        assert f[i: i + n] == [(face[k], face[(k + 1) % n], len(vertices) + j)
+                               for k in range(n)]
+        assert t[i: i + n] == [j] * n
+        i += n
+    numpy.testing.assert_allclose(numpy.linalg.norm(v, axis=1), 1)
+
+
+def test_dual():
+    vertices, faces = icosphere(1, 1)
+    indptr, indices = incidence(faces)
+    for v in range(len(vertices)):
+        assert list(indices[indptr[v]:indptr[v + 1]]) == [
+            i for i, f in enumerate(faces) if v in f]
+    dual_vertices, dual_faces = dual(vertices, faces)
+    assert len(dual_vertices) == len(faces)
+    assert len(dual_faces) == len(vertices)
+    # dual vertices are numbered by first occurrence while turning around
+    # vertices
+    numbering = {}
+    for v, dual_face in enumerate(dual_faces):
+        ifaces = list(indices[indptr[v]:indptr[v + 1]])
+        expected = sorted_faces(v, ifaces, faces)
+        for iface in expected:
+            numbering.setdefault(iface, len(numbering))
+        assert dual_face == [numbering[i] for i in expected]
+    numpy.testing.assert_allclose(numpy.linalg.norm(dual_vertices, axis=1), 1)
+
+
+def test_cached_turtle_dome():
+    clear_mesh_cache()
+    vertices, faces = turtle_dome(3)
+    assert len(faces) == 46
+    faces[0].append(-1)
+    assert turtle_dome(3) == (vertices, [f[:-1] if i == 0 else f for i, f in
+                                         enumerate(faces)])
+    samples = sample_dome(3, iter=1)
+    expected = sample_faces(vertices, turtle_dome(3)[1], iter=1)
+    assert sorted(samples) == sorted(expected)
+    for k in samples:
+        numpy.testing.assert_allclose(samples[k], expected[k])
+
+    cache_dir = tempfile.mkdtemp()
+    try:
+        clear_mesh_cache()
+        turtle_dome(4, cache_dir=cache_dir)
+        assert os.listdir(cache_dir) == ['turtle_dome_4.npz']
+        clear_mesh_cache()
+        v, f = turtle_dome(4, cache_dir=cache_dir)
+        clear_mesh_cache()
+        assert (v, f) == turtle_dome(4)
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+def test_sector_index():
+    directions = numpy.random.RandomState(0).normal(size=(2000, 3))
+    directions /= numpy.linalg.norm(directions, axis=1)[:, numpy.newaxis]
+    for vertices, faces in (icosphere(2, 1), turtle_dome(10)):
+        index = SectorIndex(vertices, faces)
+        # brute force: the sector the direction is the most inside of
+        score = numpy.einsum('sej,nj->nse', index.sector_normals,
+                             directions).min(axis=2)
+        expected = numpy.where(score.max(axis=1) >= 0, score.argmax(axis=1),
+                               -1)
+        numpy.testing.assert_array_equal(index.locate(directions), expected)
+    # the dome covers the upper hemisphere (up to its polygonal base)
+    assert (expected[directions[:, 2] < -0.05] == -1).all()
+    assert (expected[directions[:, 2] > 0.05] >= 0).all()
+    zenith, azimuth = spherical(directions)
+    numpy.testing.assert_array_equal(
+        dome_index(10).locate_spherical(zenith, azimuth), expected)
+
+
+def test_flat_samples():
+    vertices, faces = turtle_dome(3)
+    samples = sample_faces(vertices, faces, iter=1)
+    points, face_index = sample_faces(vertices, faces, iter=1, flat=True)
+    assert points.shape == (len(face_index), 3)
+    for k in samples:
+        numpy.testing.assert_allclose(points[face_index == k], samples[k])
+    (zenith, azimuth), index = sample_dome(3, iter=1, spheric=True,
+                                           flat=True)
+    numpy.testing.assert_array_equal(index, face_index)
+    numpy.testing.assert_allclose(zenith, spherical(points)[0])
+
+
+def test_solid_angle():
+    octant = solid_angle([(1, 0, 0), (0, 2, 0), (0, 0, 1)], [(0, 1, 2)])
+    numpy.testing.assert_allclose(octant, numpy.pi / 2)
+    numpy.testing.assert_allclose(solid_angle(*icosphere(2, 1)).sum(),
+                                  4 * numpy.pi)
+    steradians = solid_angle(*turtle_dome(3))
+    assert len(steradians) == 46
+    numpy.testing.assert_allclose(steradians.sum(), 2 * numpy.pi)
+
+
+def test_vectorised_helpers():
+    points = numpy.random.RandomState(0).normal(size=(50, 3))
+    as_tuples = [tuple(p) for p in points.tolist()]
+    numpy.testing.assert_allclose(normed(points), [normed(p) for p in
+                                                   as_tuples])
+    numpy.testing.assert_allclose(norm(points), [norm(p) for p in as_tuples])
+    directions = points / numpy.linalg.norm(points, axis=1)[:, numpy.newaxis]
+    zenith, azimuth = spherical(directions)
+    assert not numpy.isnan(zenith).any() and not numpy.isnan(azimuth).any()
+    numpy.testing.assert_allclose(zenith, [math.acos(z) for _, _, z in
+                                           directions.tolist()])
+    numpy.testing.assert_allclose(azimuth, [math.atan2(y, x) for x, y, _ in
+                                            directions.tolist()])
+    numpy.testing.assert_allclose(middle_point(points, points[::-1]),
+                                  [middle_point(p, q) for p, q in
+                                   zip(as_tuples, as_tuples[::-1])])
+    faces = points.reshape(10, 5, 3)
+    numpy.testing.assert_allclose(centroid(faces), [centroid(f) for f in
+                                                    faces.tolist()])
+    rotation = rotation_matrix([1, 2, 3], 0.5)
+    numpy.testing.assert_array_equal(rotate(points, rotation),
+                                     rotate(as_tuples, rotation))
+    # direct rotation brings Z+ to (theta, phi), inverse rotation back
+    zenith, azimuth = spherical(direct_rotation(numpy.array([[0., 0, 1]]),
+                                                0.4, 1.2))
+    numpy.testing.assert_allclose((zenith[0], azimuth[0]), (0.4, 1.2))
+    numpy.testing.assert_allclose(
+        inverse_rotation(direct_rotation(points, 0.4, 1.2), 0.4, 1.2),
+        points)
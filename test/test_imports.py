@@ -0,0 +1,40 @@
+import subprocess
+import sys
+
+# modules whose import should neither load heavy optional dependencies nor
+# exceed the time budget
+_modules = ['alinea.astk.Weather', 'alinea.astk.TimeControl',
+            'alinea.astk.sun_and_sky', 'alinea.astk.icosphere',
+            'alinea.astk.caribu_interface', 'alinea.astk.plantgl_utils',
+            'alinea.astk.meteorology.sky_irradiance',
+            'alinea.astk.meteorology.sun_position_ephem']
+_heavy = ['pvlib', 'ephem', 'openalea.plantgl', 'openalea.core',
+          'alinea.caribu', 'scipy']
+_budget = 1.  # seconds, on top of numpy and pandas
+
+_script = """
+import sys, time
+import numpy, pandas
+t = time.time()
+for name in {modules!r}:
+    __import__(name)
+print(time.time() - t)
+print(' '.join(m for m in sys.modules if sys.modules[m] is not None and
+               any(m == h or m.startswith(h + '.') for h in {heavy!r})))
+"""
+
+
+def test_import_budget():
+    script = _script.format(modules=_modules, heavy=_heavy)
+    out = subprocess.check_output([sys.executable, '-c', script])
+    lines = out.decode().splitlines()
+    duration, loaded = float(lines[0]), lines[1].split() if len(
+        lines) > 1 else []
+    assert loaded == []
+    assert duration < _budget
+
+
+def test_lazy_reexports():
+    # nodes moved out of alinea.astk are still importable from there
+    from alinea.astk.TimeControl import IterWithDelaysNode
+    assert callable(IterWithDelaysNode)
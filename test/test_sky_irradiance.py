@@ -1,10 +1,19 @@
 import numpy
+import pandas
+import pvlib
+from alinea.astk.meteorology import memoize, chunked
+from alinea.astk.meteorology.decomposition import decompose, \
+    decomposition_models, solar_constant
 from alinea.astk.meteorology.sky_irradiance import clear_sky_irradiances, \
-    actual_sky_irradiances, sky_irradiances
+    actual_sky_irradiances, sky_irradiances, linke_turbidity
 from alinea.astk.meteorology.sky_irradiance_astk import \
     clear_sky_irradiances as clear_sky_irradiances_astk, \
     actual_sky_irradiances as actual_sky_irradiances_astk, \
-    sky_irradiances as sky_irradiances_astk
+    sky_irradiances as sky_irradiances_astk, \
+    actual_sky_irradiances_sites as actual_sky_irradiances_sites_astk, \
+    sky_irradiances_sites as sky_irradiances_sites_astk, \
+    sky_irradiances_raw as sky_irradiances_raw_astk, daily_to_hourly, \
+    daily_diffuse_fraction
 
 
 def test_clear_sky_irradiances():
@@ -15,6 +24,14 @@ def test_clear_sky_irradiances():
     numpy.testing.assert_allclose(df.ghi, df2.ghi, atol=55)
 
 
+def test_linke_turbidity():
+    dates = pandas.date_range('2000-01-01', '2001-12-31', freq='D')
+    for lat, lon in ((43.36, 3.52), (-33.9, 18.4)):
+        expected = pvlib.clearsky.lookup_linke_turbidity(dates, lat, lon)
+        tl = linke_turbidity(dates, lat, lon)
+        numpy.testing.assert_allclose(tl, expected)
+
+
 def test_actual_sky_irradiance():
     df = actual_sky_irradiances()
     assert len(df) == 15
@@ -37,4 +54,204 @@ def test_sky_irradiances():
     df = sky_irradiances(attenuation=0.2)
     assert df.dhi.sum() / df.ghi.sum() > 0.99
     df2 = sky_irradiances_astk()
-    assert len(df2) == 15
\ No newline at end of file
+    assert len(df2) == 15
+
+def test_memoized_irradiances():
+    dates = pandas.date_range('2000-06-21', '2000-06-23', freq='H')
+    expected = clear_sky_irradiances_astk(dates=dates)
+    expected_sub = clear_sky_irradiances_astk(dates=dates[5:30])
+    memoize.enable_cache(maxsize=4)
+    try:
+        clear_sky_irradiances_astk(dates=dates)
+        df = clear_sky_irradiances_astk(dates=dates)
+        numpy.testing.assert_allclose(df.ghi, expected.ghi)
+        sub = clear_sky_irradiances_astk(dates=dates[5:30])
+        assert sub.index.equals(expected_sub.index)
+        numpy.testing.assert_allclose(sub.ghi, expected_sub.ghi)
+        info = clear_sky_irradiances_astk.cache_info()
+        assert (info.hits, info.subrange_hits, info.misses) == (1, 1, 1)
+        # array arguments are keyed but not served from sub-ranges
+        ghi = pandas.Series(100., index=dates.tz_localize('Europe/Paris'))
+        actual_sky_irradiances_astk(dates=dates, ghi=ghi)
+        actual_sky_irradiances_astk(dates=dates, ghi=ghi)
+        actual_sky_irradiances_astk(dates=dates, ghi=ghi + 1)
+        info = actual_sky_irradiances_astk.cache_info()
+        assert (info.hits, info.misses) == (1, 2)
+    finally:
+        memoize.disable_cache()
+
+
+def test_array_key():
+    values = numpy.arange(10.)
+    assert memoize._array_key(values) == memoize._array_key(values.copy())
+    assert memoize._array_key(values) != memoize._array_key(values + 1e-12)
+    assert memoize._array_key(values) != memoize._array_key(
+        values.reshape(2, 5))
+
+
+def test_memoized_dirint_subrange():
+    dates = pandas.date_range('2000-06-21', '2000-06-23 23:00', freq='H')
+    sub = pandas.date_range('2000-06-21 07:00', '2000-06-21 20:00', freq='H')
+    for func in (actual_sky_irradiances_astk, sky_irradiances_astk):
+        expected = func(dates=sub, attenuation=0.6, model='dirint')
+        memoize.enable_cache()
+        try:
+            func(dates=dates, attenuation=0.6, model='dirint')
+            df = func(dates=sub, attenuation=0.6, model='dirint')
+            assert func.cache_info().subrange_hits == 0
+            numpy.testing.assert_allclose(df.dni, expected.dni)
+            # pointwise models are still served from sub-ranges
+            func(dates=dates, attenuation=0.6, model='erbs')
+            func(dates=sub, attenuation=0.6, model='erbs')
+            assert func.cache_info().subrange_hits == 1
+        finally:
+            memoize.disable_cache()
+
+
+def test_sky_irradiances_sites():
+    dates = pandas.date_range('2000-06-21', periods=24, freq='H')
+    lats = numpy.array([43.36, -33.9, 0.])
+    lons = numpy.array([3.52, 18.4, 36.8])
+    res = sky_irradiances_sites_astk(dates=dates, latitude=lats,
+                                     longitude=lons)
+    assert res['ghi'].shape == (3, 24)
+    for i in range(3):
+        df = sky_irradiances_astk(dates=dates, latitude=lats[i],
+                                  longitude=lons[i])
+        day = res['elevation'][i] > 0
+        assert day.sum() == len(df)
+        for k in ('elevation', 'azimuth', 'ghi', 'dni', 'dhi', 'clearness'):
+            numpy.testing.assert_allclose(res[k][i][day], df[k])
+    actual = actual_sky_irradiances_sites_astk(dates=dates, latitude=lats,
+                                               longitude=lons,
+                                               attenuation=0.2)
+    numpy.testing.assert_allclose(actual['ghi'], 0.2 * res['ghi'])
+    pressure = numpy.array([[101325.], [90000.], [95000.]])
+    for model in ('erbs', 'disc', 'dirint'):
+        actual = actual_sky_irradiances_sites_astk(
+            dates=dates, latitude=lats, longitude=lons, attenuation=0.6,
+            pressure=pressure, model=model)
+        for i in range(3):
+            df = actual_sky_irradiances_astk(
+                dates=dates, latitude=lats[i], longitude=lons[i],
+                attenuation=0.6, pressure=pressure[i, 0], model=model)
+            day = res['elevation'][i] > 0
+            numpy.testing.assert_allclose(actual['dni'][i][day], df.dni)
+            numpy.testing.assert_allclose(actual['dhi'][i][day], df.dhi)
+
+
+def test_sky_irradiances_raw():
+    dates = pandas.date_range('2000-06-21', periods=48, freq='H',
+                              tz='Europe/Paris')
+    df = sky_irradiances_astk(dates=dates)
+    raw = sky_irradiances_raw_astk(dates.asi8)
+    numpy.testing.assert_array_equal(raw['times'], df.index.asi8)
+    for k in df.columns:
+        numpy.testing.assert_allclose(raw[k], df[k])
+    ghi = numpy.linspace(0, 500, 48)
+    raw = sky_irradiances_raw_astk(dates.asi8, ghi=ghi)
+    df = sky_irradiances_astk(dates=dates, ghi=pandas.Series(ghi, index=dates))
+    numpy.testing.assert_allclose(raw['dhi'], df['dhi'])
+
+
+
+def test_decomposition():
+    dates = pandas.date_range('2000-01-01', '2001-01-01', freq='H',
+                              closed='left', tz='UTC')
+    sun = pvlib.solarposition.get_solarposition(dates, 43.36, 3.52)
+    zenith = sun['zenith'].values
+    ghi = numpy.clip(900 * numpy.cos(numpy.radians(zenith)), 0, None)
+    ghi *= numpy.random.RandomState(0).uniform(0.2, 1, len(ghi))
+    extra = dict((model, pvlib.irradiance.get_extra_radiation(
+        dates, solar_constant=solar_constant(model)).values) for model in
+                 decomposition_models)
+    dni, dhi = decompose(ghi, zenith, extra['erbs'], model='erbs')
+    expected = pvlib.irradiance.erbs(ghi, zenith, dates)
+    numpy.testing.assert_allclose(dni, expected['dni'], atol=1e-6)
+    numpy.testing.assert_allclose(dhi, expected['dhi'], atol=1e-6)
+    dni, _ = decompose(ghi, zenith, extra['disc'], model='disc')
+    expected = pvlib.irradiance.disc(ghi, zenith, dates)
+    numpy.testing.assert_allclose(dni, expected['dni'], atol=1e-6)
+    dni, _ = decompose(ghi, zenith, extra['dirint'], model='dirint')
+    expected = pvlib.irradiance.dirint(ghi, zenith, dates)
+    numpy.testing.assert_allclose(dni, expected, atol=1e-6)
+    for model in ('spitters', 'orgill_hollands'):
+        dni, dhi = decompose(ghi, zenith, extra[model], model=model)
+        assert numpy.all(dhi <= ghi + 1e-9)
+        assert numpy.all(dni >= 0)
+    try:
+        decompose(ghi, zenith, extra['erbs'], model='unknown')
+    except ValueError:
+        pass
+    else:
+        assert False
+
+
+def test_daily_to_hourly():
+    days = pandas.date_range('2000-01-01', '2001-12-31', freq='D')
+    ghi = pandas.Series(numpy.linspace(2e6, 2.5e7, len(days)), index=days)
+    df = daily_to_hourly(ghi)
+    assert str(df.index.tz) == 'Europe/Paris'
+    # daylight saving days have 23 and 25 hours
+    assert len(df) == len(days) * 24
+    total = (df.ghi * 3600).groupby(df.index.date).sum()
+    numpy.testing.assert_allclose(total, ghi)
+    assert (df.dhi <= df.ghi).all()
+    assert (df.ghi.loc['2000-06-21 00:00':'2000-06-21 04:00'] == 0).all()
+    assert df.ghi.loc['2000-06-21'].idxmax().hour in (13, 14)
+    df = daily_to_hourly(ghi.values, days=days, dhi=0.5 * ghi.values,
+                         timezone='UTC')
+    numpy.testing.assert_allclose(df.dhi, 0.5 * df.ghi)
+    sky = sky_irradiances_astk(dates=df.index[:24], ghi=df.ghi[:24],
+                               dhi=df.dhi[:24], timezone='UTC')
+    assert (sky.dni >= 0).all()
+    # diffuse fractions use local calendar days, even far from UTC
+    df = daily_to_hourly(ghi, latitude=1.87, longitude=-157.4,
+                         timezone='Pacific/Kiritimati')
+    fraction = (df.dhi.groupby(df.index.date).sum() /
+                df.ghi.groupby(df.index.date).sum())
+    expected = daily_diffuse_fraction(ghi.values, days + pandas.Timedelta(
+        12, 'h'), 1.87)
+    numpy.testing.assert_allclose(fraction, expected)
+
+
+def test_chunked_sky_irradiances():
+    dates = pandas.date_range('2000-01-01', '2000-03-01', freq='10min',
+                              tz='UTC')
+    ghi = numpy.random.RandomState(0).uniform(0, 800, len(dates))
+    for kwds in ({}, {'ghi': ghi}, {'ghi': ghi, 'dhi': 0.3 * ghi}):
+        expected = sky_irradiances_astk(dates=dates, **dict(
+            (k, pandas.Series(v, index=dates)) for k, v in kwds.items()))
+        df = chunked.sky_irradiances(dates=dates, chunk_size=1000, threads=2,
+                                     **kwds)
+        assert (df.index == expected.index).all()
+        numpy.testing.assert_allclose(df, expected)
+    df = chunked.sky_irradiances(dates=dates, filter_night=False,
+                                 chunk_size=1000, threads=2)
+    assert len(df) == len(dates)
+    assert (df.ghi[df.elevation <= 0] == 0).all()
+    sun = chunked.sun_position(dates=dates, chunk_size=1000, threads=2)
+    numpy.testing.assert_allclose(sun, expected.loc[:, sun.columns])
+
+
+def test_chunked_dirint():
+    dates = pandas.date_range('2000-01-01', '2000-01-15', freq='10min',
+                              tz='UTC')
+    rs = numpy.random.RandomState(0)
+    ghi = rs.uniform(0, 800, len(dates))
+    pressure = rs.uniform(95000, 102000, len(dates))
+    raw = sky_irradiances_raw_astk(dates.asi8, ghi=ghi, pressure=pressure,
+                                   temp_dew=10, model='dirint')
+    for chunk_size in (100, 1000):
+        df = chunked.sky_irradiances(dates=dates, ghi=ghi, pressure=pressure,
+                                     temp_dew=10, model='dirint',
+                                     chunk_size=chunk_size, threads=2)
+        numpy.testing.assert_array_equal(df.index.asi8, raw['times'])
+        for k in df.columns:
+            numpy.testing.assert_allclose(df[k], raw[k])
+    expected = sky_irradiances_astk(dates=dates, model='dirint',
+                                    ghi=pandas.Series(ghi, index=dates),
+                                    pressure=98000)
+    df = chunked.sky_irradiances(dates=dates, ghi=ghi, pressure=98000,
+                                 model='dirint', chunk_size=100, threads=2)
+    numpy.testing.assert_allclose(df, expected)
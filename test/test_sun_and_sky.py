@@ -1,5 +1,11 @@
 from alinea.astk.sun_and_sky import sky_discretisation, \
-    sky_radiance_distribution, sky_sources, sun_sources, sun_sky_sources
+    sky_radiance_distribution, sky_sources, sun_sources, sun_sky_sources, \
+    sky_dome, cumulative_sky_sources, sun_sky_source_matrices, \
+    SunSkyAccumulator, integrated_sun_sources, cie_relative_luminance, \
+    cie_standard_skies, CieSkyTable, sun_sources_raw, sky_sources_raw, \
+    _unit_vectors
+from alinea.astk.icosphere import turtle_dome, sample_faces
+from alinea.astk.meteorology import sun_position_backends
 import numpy
 import pandas
 
@@ -65,3 +71,131 @@ def test_twilight():
     el, az, irr = sky
     numpy.testing.assert_almost_equal(1, irr.sum())
 
+
+def test_cumulative_sky_sources():
+    dates = pandas.date_range('2000-06-01', '2000-06-30 23:00', freq='H')
+    el, az, irr = cumulative_sky_sources(dates=dates, normalisation=1)
+    assert len(az) == len(el) == len(irr) == 46
+    numpy.testing.assert_almost_equal(irr.sum(), 1)
+
+    el, az, fraction = sky_dome('icosphere', tolerance=10)
+    el, az, irr = cumulative_sky_sources(dates=dates, normalisation=1,
+                                         discretisation='icosphere',
+                                         tolerance=10)
+    assert len(el) == len(fraction)
+    numpy.testing.assert_almost_equal(irr.sum(), 1)
+
+
+def test_icosphere_dome_directions():
+    el, az, fraction = sky_dome('icosphere')
+    vertices, faces = turtle_dome(3)
+    centers, _ = sample_faces(vertices, faces, iter=None, flat=True)
+    centers /= numpy.linalg.norm(centers, axis=1)[:, numpy.newaxis]
+    numpy.testing.assert_allclose(_unit_vectors(el, az), centers, atol=1e-9)
+
+
+def test_sun_sky_source_matrices():
+    dates, sun, sky = sun_sky_source_matrices()
+    el, az, irr = sun
+    assert len(el) == len(az) == len(irr) == len(dates)
+    el, az, irr = sky
+    assert irr.shape == (len(dates), 46)
+    # matrices integrate to the same sun and sky irradiances
+    sun_i, sky_i = sun_sky_sources()
+    numpy.testing.assert_almost_equal(sun[2].sum(), sun_i[2].sum())
+    numpy.testing.assert_almost_equal(irr.sum(), sky_i[2].sum())
+
+
+def test_sun_sky_accumulator():
+    acc = SunSkyAccumulator(window=24)
+    dates = pandas.date_range('2000-06-21', periods=24, freq='H')
+    acc.update(dates)
+    sun, sky = acc.sources(normalisation=1)
+    sun_i, sky_i = sun_sky_sources(dates=dates, normalisation=1)
+    numpy.testing.assert_allclose(sun[2], sun_i[2])
+    numpy.testing.assert_allclose(sky[2], sky_i[2])
+
+    # slide the window by six hours, one step at a time
+    for d in pandas.date_range('2000-06-22', periods=6, freq='H'):
+        acc.update(pandas.DatetimeIndex([d]))
+    dates = pandas.date_range('2000-06-21 06:00', periods=24, freq='H')
+    assert len(acc.dates) == 24
+    sun, sky = acc.sources()
+    sun_i, sky_i = sun_sky_sources(dates=dates)
+    numpy.testing.assert_allclose(sun[2], sun_i[2])
+    numpy.testing.assert_allclose(sky[2], sky_i[2])
+
+
+def test_integrated_sun_sources():
+    el, az, irr = integrated_sun_sources()
+    assert len(az) == len(el) == len(irr)
+    numpy.testing.assert_almost_equal(numpy.sum(irr), 1)
+
+    # hourly means are close to the mean of hourly sampled sun sources
+    el, az, irr = integrated_sun_sources(irradiance=None, tolerance=0.1)
+    _, _, irr_h = sun_sources(irradiance=None)
+    numpy.testing.assert_allclose(irr.sum(), irr_h.sum(), rtol=0.01)
+
+
+def test_cie_sky_table():
+    elevation, azimuth, fraction = sky_discretisation()
+    table = CieSkyTable(elevation, azimuth, fraction)
+    sun_el = numpy.array([12.3, 45.6, 71.1])
+    sun_az = numpy.array([95.2, 181.4, 359.5])
+    el = numpy.radians(elevation)
+    az = numpy.radians(azimuth)
+    for sky_type in cie_standard_skies:
+        lum = table.relative_luminance(sky_type, sun_el, sun_az)
+        assert lum.shape == (3, 46)
+        # luminance at zenith is one
+        numpy.testing.assert_allclose(lum[:, -1], 1, rtol=1e-6)
+        expected = [cie_relative_luminance(el, az, numpy.radians(e),
+                                           numpy.radians(a), type=sky_type)
+                    for e, a in zip(sun_el, sun_az)]
+        numpy.testing.assert_allclose(lum, expected, rtol=0.02)
+    numpy.testing.assert_allclose(table.relative_luminance('soc'),
+                                  cie_relative_luminance(el, type='soc'))
+
+    # sources can use any standard sky, looked up in the table
+    for sky_type in (3, 'clear_sky'):
+        _, _, irr = sky_sources(sky_type=sky_type)
+        _, _, irr_t = sky_sources(sky_type=sky_type, sky_table=table)
+        numpy.testing.assert_almost_equal(irr_t.sum(), 1)
+        numpy.testing.assert_allclose(irr_t, irr, atol=0.005)
+    sun, sky = sun_sky_sources(sky_table=table)
+    assert len(sky[0]) == 46
+
+
+def test_raw_sources():
+    dates = pandas.date_range('2000-06-21', periods=24, freq='H',
+                              tz='Europe/Paris')
+    el, az, irr = sun_sources_raw(dates.asi8)
+    expected = sun_sources(dates=dates)
+    assert len(el) == len(expected[0])
+    numpy.testing.assert_allclose(az, expected[1], atol=1)
+    numpy.testing.assert_almost_equal(irr.sum(), 1)
+    el, az, irr = sky_sources_raw(dates.asi8, sky_type='clear_sky')
+    assert len(el) == 46
+    numpy.testing.assert_almost_equal(irr.sum(), 1)
+
+
+
+def test_sources_with_other_backend():
+    # pvlib and astk disagree on the daylight state of one date near sunrise
+    dates = pandas.date_range('2000-01-01', periods=96, freq='15min',
+                              tz='Europe/Paris')
+    sun_position_backends.set_backend('astk')
+    try:
+        el, az, irr = sun_sources(dates=dates, latitude=43.61)
+        assert len(el) == len(az) == len(irr)
+        assert numpy.isfinite(irr).all()
+        numpy.testing.assert_almost_equal(irr.sum(), 1)
+        _, _, irr = sky_sources(sky_type='clear_sky', dates=dates,
+                                latitude=43.61)
+        assert numpy.isfinite(irr).all()
+        accumulator = SunSkyAccumulator(window=24, latitude=43.61)
+        accumulator.update(dates)
+        sun, sky = accumulator.sources()
+        assert numpy.isfinite(sun[2]).all() and numpy.isfinite(sky[2]).all()
+    finally:
+        sun_position_backends.set_backend(None)
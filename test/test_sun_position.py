@@ -1,12 +1,18 @@
 import numpy
+import pandas
+import pvlib
 
 from alinea.astk.meteorology.sun_position import sun_position, \
     sun_extraradiation
 from alinea.astk.meteorology.sun_position_astk import \
     sun_position as sun_position_astk, \
-    sun_extraradiation as sun_extraradiation_astk
+    sun_extraradiation as sun_extraradiation_astk, sun_ephemeris, \
+    sun_elevation, sun_azimuth, eot, sun_times, daylength
 from alinea.astk.meteorology.sun_position_ephem import \
     sun_position as sun_position_ephem
+from alinea.astk.meteorology.sun_position_table import \
+    sun_position as sun_position_table, ephemeris_table
+from alinea.astk.meteorology import sun_position_backends
 
 
 def test_sun_position():
@@ -27,4 +33,91 @@ def test_alternative_sun_position():
 def test_extra_radiation():
     df = sun_extraradiation()
     dfa = sun_extraradiation_astk()
-    numpy.testing.assert_allclose(dfa, df, rtol=0.01)
\ No newline at end of file
+    numpy.testing.assert_allclose(dfa, df, rtol=0.01)
+    dayofyear = numpy.arange(1, 367)
+    for method in ('spencer', 'asce'):
+        dates = pandas.date_range('2001-01-01', '2004-12-31', freq='6H',
+                                  tz='UTC')
+        df = sun_extraradiation(dates, method=method, solar_constant=1370)
+        expected = pvlib.irradiance.get_extra_radiation(
+            dates, method=method, solar_constant=1370)
+        numpy.testing.assert_allclose(df, expected)
+        numpy.testing.assert_allclose(
+            sun_extraradiation(dayofyear=dayofyear, method=method),
+            pvlib.irradiance.get_extra_radiation(dayofyear, method=method))
+    numpy.testing.assert_allclose(
+        sun_extraradiation_astk(dayofyear=dayofyear),
+        sun_extraradiation(dayofyear=dayofyear))
+
+
+def test_sun_ephemeris():
+    hUTC = numpy.arange(24.)
+    e = sun_ephemeris(hUTC, 172, 2000, 43.36, 3.52)
+    numpy.testing.assert_allclose(e['elevation'],
+                                  sun_elevation(hUTC, 172, 2000, 43.36, 3.52))
+    numpy.testing.assert_allclose(e['azimuth'],
+                                  sun_azimuth(hUTC, 172, 2000, 43.36, 3.52))
+    numpy.testing.assert_allclose(e['eot'], eot(hUTC, 172, 2000))
+
+
+def test_sun_position_table():
+    suna = sun_position_astk()
+    sunt = sun_position_table()
+    assert ephemeris_table(2000).max_error < 0.01
+    numpy.testing.assert_allclose(sunt, suna, atol=0.01)
+
+
+def test_sun_position_ephem_sub_hour():
+    dates = pandas.date_range('2000-06-21 06:00', '2000-06-21 18:00',
+                              freq='10min')
+    sun = sun_position(dates)
+    sune = sun_position_ephem(dates)
+    numpy.testing.assert_allclose(sune, sun, atol=0.1)
+    sune = sun_position_ephem(dates, processes=2)
+    numpy.testing.assert_allclose(sune, sun, atol=0.1)
+
+
+def test_sun_position_backends():
+    assert sun_position_backends.select_backend() == 'pvlib'
+    assert sun_position_backends.select_backend(accuracy=2) == 'table'
+    assert sun_position_backends.select_backend('astk') == 'astk'
+    sun_position_backends.set_backend('astk')
+    try:
+        numpy.testing.assert_allclose(sun_position_backends.sun_position(),
+                                      sun_position_astk())
+    finally:
+        sun_position_backends.set_backend(None)
+
+    bench = sun_position_backends.benchmark_backends(
+        ['astk', 'table'], sites=[(-33.9, 18.4), (0, 36.8)], years=[2005],
+        freq='6H', repeat=1)
+    assert (bench['max_angular_error'] < 1).all()
+
+
+def test_sun_times():
+    dates = pandas.date_range('2000-03-01', '2000-03-03', freq='min',
+                              closed='left', tz='Europe/Paris')
+    for lat, lon in ((43.36, 3.52), (-33.9, 18.4), (64.1, -21.9)):
+        sun = sun_position_astk(dates, latitude=lat, longitude=lon,
+                                filter_night=False)
+        day = sun.loc[sun.elevation > 0]
+        times = sun_times(dates, latitude=lat, longitude=lon)
+        assert len(times) == 2
+        first = day.index[day.index < dates[0] + pandas.Timedelta('1D')][0]
+        assert abs((times.sunrise[0] - first).total_seconds()) < 60
+        numpy.testing.assert_allclose(
+            times.daylength, daylength(numpy.array([61, 62]), 2000, lat),
+            atol=0.01)
+        # night prefiltering does not change results
+        filtered = sun_position_astk(dates, latitude=lat, longitude=lon)
+        assert filtered.index.equals(day.index)
+        filtered = sun_position(dates, latitude=lat, longitude=lon)
+        expected = sun_position(dates, latitude=lat, longitude=lon,
+                                filter_night=False)
+        assert filtered.index.equals(
+            expected.index[expected.elevation > 0])
+
+    polar = sun_times(daydate='2000-12-21', latitude=80)
+    assert polar.daylength[0] == 0
+    assert polar.sunrise.isnull().all()
+
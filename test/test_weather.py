@@ -20,3 +20,16 @@ def test_date_range_index():
     index = weather.date_range_index('2000-12-31', '2001-01-02', by=24)
     assert len(index) == 2
     assert len(index[0]) == 24
+
+
+def test_daylength():
+    weather = Weather()
+    seq = weather.date_range_index('2000-06-21', '2000-12-22')
+    dates = seq[0].append(seq[-1])
+    daylength = weather.daylength(dates)
+    # one value per date, indexed as the dates
+    assert daylength.index.equals(dates)
+    assert (daylength[:24] == daylength[0]).all()
+    assert 15 < daylength[0] < 16
+    assert 8.5 < daylength[-1] < 9.5
+